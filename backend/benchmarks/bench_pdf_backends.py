@@ -0,0 +1,110 @@
+"""
+PDF metin katmanı benchmark'ı
+- Dijital PDF: PyPDF2 extract_text ile PDFium (pypdfium2) + normalize_layout sayfa/saniye karşılaştırması
+- Taranmış PDF: eski davranış (tüm sayfaları PyPDF2 ile dolaşıp boş metin bulmak) ile
+  PDFTextExtractor.inspect örnekleme süresinin karşılaştırması
+
+Kullanım (backend klasöründen):
+    python -m benchmarks.bench_pdf_backends [--pages 200] [--runs 3]
+"""
+import argparse
+import io
+import os
+import random
+import tempfile
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from benchmarks.bench_pdf_extract import build_contract_pdf, timed
+from services import pdf_extractor as extractor_module
+from services.pdf_extractor import PDFTextExtractor, normalize_layout
+
+
+def build_scanned_pdf(path: str, pages: int):
+    """Her sayfası tek bir gri tonlamalı görüntüden oluşan (metin katmanı olmayan) PDF üretir."""
+    from PIL import Image
+
+    rng = random.Random(0)
+    image = Image.frombytes("L", (400, 560), bytes(rng.getrandbits(8) for _ in range(400 * 560)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    reader = ImageReader(io.BytesIO(buffer.getvalue()))
+
+    pdf = canvas.Canvas(path, pagesize=A4)
+    width, height = A4
+    for _ in range(pages):
+        pdf.drawImage(reader, 0, 0, width=width, height=height)
+        pdf.showPage()
+    pdf.save()
+
+
+def extract_pypdf2(path: str) -> str:
+    from PyPDF2 import PdfReader
+
+    return "\n".join(page.extract_text() or "" for page in PdfReader(path).pages)
+
+
+def extract_pdfium(path: str, layout: bool) -> str:
+    import pypdfium2 as pdfium
+
+    document = pdfium.PdfDocument(path)
+    texts = []
+    try:
+        for i in range(len(document)):
+            page = document[i]
+            textpage = page.get_textpage()
+            text = textpage.get_text_range()
+            textpage.close()
+            page.close()
+            texts.append(normalize_layout(text) if layout else text)
+    finally:
+        document.close()
+    return "\n\n".join(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    digital_fd, digital = tempfile.mkstemp(suffix=".pdf")
+    scanned_fd, scanned = tempfile.mkstemp(suffix=".pdf")
+    os.close(digital_fd)
+    os.close(scanned_fd)
+    try:
+        build_contract_pdf(digital, args.pages)
+        build_scanned_pdf(scanned, args.pages)
+        print(f"Dijital PDF: {args.pages} sayfa, {os.path.getsize(digital) / 1024:.0f} KB")
+        print(f"Taranmış PDF: {args.pages} sayfa, {os.path.getsize(scanned) / 1024:.0f} KB")
+
+        rows = []
+        t, text = timed(lambda: extract_pypdf2(digital), args.runs)
+        rows.append(("PyPDF2 extract_text", t, len(text), text.count("\n\n")))
+        if extractor_module.pdfium is not None:
+            t, text = timed(lambda: extract_pdfium(digital, layout=False), args.runs)
+            rows.append(("PDFium ham metin", t, len(text), text.count("\n\n")))
+            t, text = timed(lambda: extract_pdfium(digital, layout=True), args.runs)
+            rows.append(("PDFium + normalize_layout", t, len(text), text.count("\n\n")))
+        else:
+            print("pypdfium2 kurulu değil; sadece PyPDF2 ölçüldü")
+
+        print(f"\n{'Dijital PDF':32} {'ms':>9} {'sayfa/sn':>9} {'karakter':>10} {'paragraf':>9}")
+        for name, seconds, chars, paragraphs in rows:
+            print(f"{name:32} {seconds * 1000:9.1f} {args.pages / seconds:9.0f} {chars:10d} {paragraphs:9d}")
+
+        extractor = PDFTextExtractor()
+        t_old, text = timed(lambda: extract_pypdf2(scanned), args.runs)
+        t_new, (_pages, has_text) = timed(lambda: extractor.inspect(scanned), args.runs)
+        print(f"\n{'Taranmış PDF':32} {'ms':>9}")
+        print(f"{'Tüm sayfalar PyPDF2 (eski)':32} {t_old * 1000:9.1f}   boş metin: {not text.strip()}")
+        print(f"{'inspect (örnek sayfalar)':32} {t_new * 1000:9.1f}   metin katmanı: {has_text}")
+    finally:
+        os.remove(digital)
+        os.remove(scanned)
+
+
+if __name__ == "__main__":
+    main()
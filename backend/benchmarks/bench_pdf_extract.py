@@ -0,0 +1,105 @@
+"""
+PDF metin çıkarma benchmark'ı
+300 sayfalık sentetik sözleşme PDF'i üzerinde eski seri PyPDF2 döngüsünü
+services/pdf_extractor.py ile karşılaştırır.
+
+Kullanım (backend klasöründen):
+    python -m benchmarks.bench_pdf_extract [--pages 300] [--runs 3]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.platypus import SimpleDocTemplate, Paragraph, PageBreak
+
+from services.pdf_extractor import PDFTextExtractor
+
+
+MADDE = (
+    "Kiracı, kiralananı sözleşmede belirtilen amaca uygun olarak özenle kullanmakla ve "
+    "komşulara gerekli saygıyı göstermekle yükümlüdür. Kira bedeli her ayın ilk beş günü "
+    "içinde kiraya verenin banka hesabına yatırılacaktır. Ödemenin gecikmesi halinde "
+    "6098 sayılı Türk Borçlar Kanunu'nun ilgili hükümleri uygulanır. "
+)
+
+
+def build_contract_pdf(path: str, pages: int):
+    """Her sayfasında birkaç madde olan sözleşme PDF'i üretir."""
+    styles = getSampleStyleSheet()
+    doc = SimpleDocTemplate(path, pagesize=A4)
+    story = []
+    madde_no = 1
+    for _ in range(pages):
+        for _ in range(4):
+            story.append(Paragraph(f"<b>MADDE {madde_no}</b> - {MADDE * 2}", styles["Normal"]))
+            madde_no += 1
+        story.append(PageBreak())
+    doc.build(story)
+
+
+def extract_serial_baseline(path: str) -> str:
+    """Önceki davranış: tüm dosya belleğe, sayfalar seri, += ile birleştirme."""
+    import io
+    from PyPDF2 import PdfReader
+
+    with open(path, "rb") as f:
+        content = f.read()
+    text = ""
+    for page in PdfReader(io.BytesIO(content)).pages:
+        text += page.extract_text() + "\n"
+    return text
+
+
+def timed(fn, runs: int):
+    best = None
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget", type=int, default=25000)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    try:
+        build_contract_pdf(path, args.pages)
+        size_kb = os.path.getsize(path) / 1024
+        print(f"Sözleşme PDF: {args.pages} sayfa, {size_kb:.0f} KB")
+
+        extractor = PDFTextExtractor()
+        # Havuzu ısıt (spawn maliyeti ölçüme girmesin)
+        extractor.extract(path, char_budget=1)
+
+        rows = []
+        t, text = timed(lambda: extract_serial_baseline(path), args.runs)
+        rows.append(("PyPDF2 seri (eski)", t, len(text), args.pages))
+
+        t, (text, pages) = timed(lambda: extractor.extract(path), args.runs)
+        rows.append((f"Paralel, {extractor.max_workers} worker", t, len(text), pages))
+
+        t, (text, pages) = timed(lambda: extractor.extract(path, char_budget=args.budget), args.runs)
+        rows.append((f"Paralel + bütçe {args.budget}", t, len(text), pages))
+
+        print(f"{'Yöntem':32} {'ms':>9} {'karakter':>10} {'sayfa':>6}")
+        for name, seconds, chars, pages in rows:
+            print(f"{name:32} {seconds * 1000:9.1f} {chars:10d} {pages:6d}")
+
+        extractor.shutdown()
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+PDF üretim benchmark'ı
+Tipik dilekçe ve sözleşme girdileri için belge başına süre (ms) ve boyut (byte) ölçer.
+
+Kullanım (backend klasöründen):
+    python -m benchmarks.bench_pdf_render [--docs 30]
+"""
+import argparse
+import time
+
+from services.pdf_generator import pdf_generator
+
+
+ACIKLAMA = (
+    "Müvekkil, davalı şirkette 01.03.2019 - 15.08.2023 tarihleri arasında satış temsilcisi olarak "
+    "çalışmış, iş sözleşmesi haklı bir neden gösterilmeksizin işverence feshedilmiştir. Fazla mesai "
+    "ücretleri ve yıllık izin alacakları ödenmemiş, arabuluculuk görüşmelerinden sonuç alınamamıştır."
+)
+
+
+def dilekce_input(paragraphs: int) -> dict:
+    return {
+        'mahkeme': 'İstanbul Anadolu 5. İş Mahkemesi Hakimliğine',
+        'davaci_adi': 'Ayşe Yılmaz',
+        'davaci_tc': '12345678901',
+        'davaci_adres': 'Kadıköy / İstanbul',
+        'davali_adi': 'Örnek Ticaret A.Ş.',
+        'davali_adres': 'Ümraniye / İstanbul',
+        'dilekce_turu': 'is_davasi',
+        'konu': 'Kıdem ve İhbar Tazminatı ile Fazla Mesai Ücreti Alacağı Talebi',
+        'aciklamalar': "\n\n".join(ACIKLAMA for _ in range(paragraphs)),
+        'talepler': 'Fazlaya ilişkin haklarımız saklı kalmak kaydıyla davanın kabulüne karar verilmesini '
+                    'saygılarımla arz ve talep ederim.',
+        'tarih': '01/01/2026',
+    }
+
+
+def sozlesme_input(maddeler: int) -> dict:
+    return {
+        'baslik': 'Kira Sözleşmesi',
+        'taraf1': {'adi': 'Mehmet Öztürk', 'unvan': 'Kiraya Veren', 'adres': 'Çankaya / Ankara'},
+        'taraf2': {'adi': 'Şule Çelik', 'unvan': 'Kiracı', 'adres': 'Keçiören / Ankara'},
+        'maddeler': [{'baslik': f'Madde {i}', 'icerik': ACIKLAMA} for i in range(maddeler)],
+        'tarih': '01/01/2026',
+    }
+
+
+CASES = [
+    ("Dilekçe kısa (3 paragraf)", pdf_generator.create_dilekce, dilekce_input(3)),
+    ("Dilekçe tipik (8 paragraf)", pdf_generator.create_dilekce, dilekce_input(8)),
+    ("Dilekçe uzun (40 paragraf)", pdf_generator.create_dilekce, dilekce_input(40)),
+    ("Sözleşme (25 madde)", pdf_generator.create_sozlesme, sozlesme_input(25)),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"{'Belge':32} {'ms/belge':>9} {'byte/belge':>11}")
+    for name, render, data in CASES:
+        render(data)  # ısınma
+        start = time.perf_counter()
+        size = 0
+        for _ in range(args.docs):
+            size += len(render(data))
+        elapsed = time.perf_counter() - start
+        print(f"{name:32} {elapsed * 1000 / args.docs:9.1f} {size // args.docs:11d}")
+
+
+if __name__ == "__main__":
+    main()
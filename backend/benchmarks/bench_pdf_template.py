@@ -0,0 +1,65 @@
+"""
+Derlenmiş dilekçe şablonu benchmark'ı
+Her çağrıda iskeleti sıfırdan kuran yol ile DilekceTemplate önbelleğini karşılaştırır:
+- Farklı dilekçeler: her belgede metinler farklı (sadece sabit öğeler önbellekten gelir)
+- Yoğun gün: aynı mahkeme/konu/açıklama/talep, farklı taraflar (icra takibi, toplu itiraz)
+
+Kullanım (backend klasöründen):
+    python -m benchmarks.bench_pdf_template [--docs 40]
+"""
+import argparse
+import time
+from io import BytesIO
+
+from benchmarks.bench_pdf_render import dilekce_input
+from services.pdf_generator import PDFGenerator, DilekceTemplate
+
+
+def render_uncached(generator: PDFGenerator, data: dict) -> bytes:
+    """Önceki davranış: her belgede tüm flowable'lar yeniden oluşturulup ölçülür."""
+    buffer = BytesIO()
+    doc = generator._new_document(buffer)
+    doc.build(DilekceTemplate(generator.styles).story(data))
+    return buffer.getvalue()
+
+
+def unique_petitions(count: int, paragraphs: int):
+    for i in range(count):
+        data = dilekce_input(paragraphs)
+        data['konu'] = f"{data['konu']} ({i})"
+        data['aciklamalar'] = data['aciklamalar'].replace("Müvekkil", f"Müvekkil {i}")
+        data['davaci_adi'] = f"Davacı {i}"
+        yield data
+
+
+def busy_day_petitions(count: int, paragraphs: int):
+    base = dilekce_input(paragraphs)
+    for i in range(count):
+        yield {**base, 'davaci_adi': f"Borçlu {i}", 'davaci_tc': f"{10000000000 + i}"}
+
+
+def measure(render, inputs) -> float:
+    start = time.perf_counter()
+    for data in inputs:
+        render(data)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=40)
+    parser.add_argument("--paragraphs", type=int, default=12)
+    args = parser.parse_args()
+
+    generator = PDFGenerator()
+    generator.create_dilekce(dilekce_input(2))  # ısınma
+
+    print(f"{'Senaryo':28} {'eski ms/belge':>14} {'şablon ms/belge':>16} {'hızlanma':>9}")
+    for name, make_inputs in (("Farklı dilekçeler", unique_petitions), ("Yoğun gün (aynı metin)", busy_day_petitions)):
+        old = measure(lambda d: render_uncached(generator, d), make_inputs(args.docs, args.paragraphs))
+        new = measure(generator.create_dilekce, make_inputs(args.docs, args.paragraphs))
+        print(f"{name:28} {old * 1000 / args.docs:14.1f} {new * 1000 / args.docs:16.1f} {old / new:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
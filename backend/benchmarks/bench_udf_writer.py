@@ -0,0 +1,101 @@
+"""
+UDF yazıcı benchmark'ı
+Eski yol (ElementTree ağacı kurup tree.write ile serileştirme) ile akışlı XMLGenerator yazıcısını
+belge başına süre ve tepe bellek (tracemalloc) açısından karşılaştırır.
+Her iki yol da aynı eleman dizisini üretir; fark sadece ağaç + tampon kopyalarıdır.
+
+Kullanım (backend klasöründen):
+    python -m benchmarks.bench_udf_writer [--docs 20]
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+from benchmarks.bench_pdf_render import dilekce_input
+from services.udf_generator import udf_generator
+
+
+class TreeHandler:
+    """UDFGenerator._write olaylarıyla ElementTree ağacı kurar (eski create_udf davranışı)."""
+
+    def __init__(self):
+        self.builder = ET.TreeBuilder()
+
+    def startDocument(self):
+        pass
+
+    def endDocument(self):
+        pass
+
+    def startElement(self, name, attrs):
+        self.builder.start(name, dict(attrs))
+
+    def characters(self, text):
+        self.builder.data(text)
+
+    def endElement(self, name):
+        self.builder.end(name)
+
+
+def write_etree(data: dict, path: str):
+    handler = TreeHandler()
+    udf_generator._write(handler, data)
+    ET.ElementTree(handler.builder.close()).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def write_streaming(data: dict, path: str):
+    udf_generator.create_udf(data, path)
+
+
+def petition(maddeler: int, ekler: int) -> dict:
+    data = dilekce_input(maddeler)
+    data['talepler'] = "\n".join(f"{i}. talep: fazlaya ilişkin haklar saklı kalmak kaydıyla" for i in range(1, maddeler // 4 + 2))
+    data['ekler'] = [f"Ek-{i}: Banka dekontu / ihtarname sureti" for i in range(1, ekler + 1)]
+    return data
+
+
+def measure(write, data: dict, path: str, docs: int):
+    write(data, path)  # ısınma
+    start = time.perf_counter()
+    for _ in range(docs):
+        write(data, path)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    write(data, path)
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed * 1000 / docs, peak
+
+
+CASES = [
+    ("Tipik (8 madde)", 8, 2),
+    ("Uzun (200 madde, 50 ek)", 200, 50),
+    ("Çok uzun (2000 madde, 300 ek)", 2000, 300),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=20)
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix=".udf")
+    os.close(fd)
+    try:
+        print(f"{'Belge':32} {'KB':>6} {'ET ms':>8} {'akış ms':>8} {'ET tepe KB':>11} {'akış tepe KB':>13}")
+        for name, maddeler, ekler in CASES:
+            data = petition(maddeler, ekler)
+            old_ms, old_peak = measure(write_etree, data, path, args.docs)
+            new_ms, new_peak = measure(write_streaming, data, path, args.docs)
+            size = os.path.getsize(path)
+            print(f"{name:32} {size / 1024:6.0f} {old_ms:8.2f} {new_ms:8.2f} {old_peak / 1024:11.0f} {new_peak / 1024:13.0f}")
+    finally:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional, List
 import os
+import re
 import uuid
 import io
 from PyPDF2 import PdfReader
@@ -15,6 +16,18 @@ from dotenv import load_dotenv
 # Load environment variables
 load_dotenv()
 
+# Yapılandırılmış (JSON) loglama; kayıtlar kuyruk üzerinden ayrı thread'de yazılır
+import logging
+from services.structured_logging import logging_pipeline, setup_logging, request_id_var, route_var
+
+setup_logging()
+logger = logging.getLogger("justlaw")
+
+# Gecikme histogramları ve sayaçlar (/metrics, Prometheus metin formatı)
+from services.instrumentation import (
+    metrics_registry, timed, record_llm_usage, HTTP_REQUEST_SECONDS, HTTP_IN_FLIGHT
+)
+
 # Initialize Firebase Admin
 import firebase_admin
 from firebase_admin import credentials, firestore
@@ -24,9 +37,9 @@ if not firebase_admin._apps:
     # we can use application default credentials or just initialize empty if only using firestore
     try:
         firebase_admin.initialize_app()
-        print("Firebase Admin initialized with default credentials")
+        logger.info("Firebase Admin initialized with default credentials")
     except Exception as e:
-        print(f"Firebase Admin initialization warning: {e}")
+        logger.warning("Firebase Admin initialization warning: %s", e)
         # Fallback if needed, but initialize_app() usually works on Google Cloud/Firebase envs
         # If on Render, the user might need to set GOOGLE_APPLICATION_CREDENTIALS
 
@@ -35,27 +48,106 @@ from google import genai
 
 # Configure Gemini
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
 if GEMINI_API_KEY:
     client = genai.Client(api_key=GEMINI_API_KEY)
-    print(f"Gemini configured with key: {GEMINI_API_KEY[:10]}...")
+    logger.info("Gemini configured (model: %s)", GEMINI_MODEL)
 else:
     client = None
-    print("WARNING: GEMINI_API_KEY not found!")
+    logger.warning("GEMINI_API_KEY not found!")
+
+# LLM scheduler - tüm Gemini çağrıları öncelik, kullanıcı kotası ve eşzamanlılık sınırından geçer
+from services.llm_scheduler import (
+    llm_scheduler, llm_priority, Priority, LLMRateLimited, LLMDeadlineExceeded
+)
+
+# Kullanıcı planı (users/{id}) önbellekten okunur; LLM kovası plan limitleriyle oluşturulur
+from services.user_profiles import user_profile_cache
+
+
+def plan_llm_limits(user_id: str):
+    profile = user_profile_cache.peek(user_id)
+    limits = profile.limits() if profile else None
+    if not limits:
+        return None
+    return limits["llm_rate_per_minute"], limits["llm_burst"]
+
+
+# Limitler her çağrıda tekrar okunur; plan süresi dolunca kova bir sonraki çağrıda uyarlanır
+llm_scheduler.user_limits = plan_llm_limits
+# Plan değişince (ödeme) kullanıcının kovası yeni limitlerle yeniden oluşturulur
+user_profile_cache.on_invalidate(llm_scheduler.forget_user)
+
+async def run_llm(fn, *args, priority: Optional[Priority] = None, user_id: Optional[str] = None, **kwargs):
+    """Senkron Gemini çağrısını zamanlayıcı üzerinden çalıştırır, hataları HTTP hatalarına çevirir."""
+    # Profil beklenmez: önbellekte yoksa okuma arka planda başlar ve o ana kadar varsayılan
+    # (ücretsiz plan) kovası uygulanır; Firestore gecikmesi/hatası üretimi bloklamaz
+    user_profile_cache.lookup(user_id)
+    try:
+        return await llm_scheduler.run(fn, *args, priority=priority, user_id=user_id, **kwargs)
+    except LLMRateLimited as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except LLMDeadlineExceeded as e:
+        raise HTTPException(status_code=503, detail=f"AI servisi yoğun, lütfen tekrar deneyin ({e})")
+
+# Sabit prompt önekleri (SYSTEM_PROMPT, dilekçe şablonu) Gemini context cache üzerinden gönderilir
+from services.prompt_cache import PromptCacheManager
+
+# PROMPT_CACHE_MIN_TOKENS: modelin explicit cache minimumu (boşsa model adına göre tablodan)
+_prompt_cache_min_tokens = os.getenv("PROMPT_CACHE_MIN_TOKENS")
+prompt_cache = PromptCacheManager(
+    client, GEMINI_MODEL, min_tokens=int(_prompt_cache_min_tokens) if _prompt_cache_min_tokens else None
+)
 
 # Helper function for AI generation
-def generate_ai_content(prompt: str) -> str:
-    """Generate content using Gemini API."""
+async def generate_ai_content(
+    prompt: str,
+    priority: Optional[Priority] = None,
+    user_id: Optional[str] = None,
+    prefix: Optional[str] = None
+) -> str:
+    """Generate content using Gemini API. prefix: prompt_cache'e kayıtlı sabit önek adı."""
     if not client:
         raise HTTPException(status_code=500, detail="Gemini API yapılandırılmamış")
     try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash-exp",
-            contents=prompt
-        )
+        if prefix:
+            response = await run_llm(
+                prompt_cache.generate, prefix, prompt,
+                priority=priority,
+                user_id=user_id
+            )
+        else:
+            response = await run_llm(
+                client.models.generate_content,
+                model=GEMINI_MODEL,
+                contents=prompt,
+                priority=priority,
+                user_id=user_id
+            )
+            record_llm_usage(response, "direct")
         return response.text
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"AI hatası: {str(e)}")
 
+# Structured (JSON mode) generation - regex ile JSON ayıklama yerine şemalı yanıt
+from services.structured_output import (
+    StructuredGenerator, KararOzeti, MevzuatMaddesi, DilekceIcerigi
+)
+
+structured_generator = StructuredGenerator(client, GEMINI_MODEL)
+
+async def generate_ai_list(prompt: str, schema, priority: Optional[Priority] = None, user_id: Optional[str] = None) -> List[dict]:
+    """Şemaya uygun nesne listesi üretir, doğrulanmış öğeleri dict olarak döner."""
+    items = await run_llm(structured_generator.generate_list, prompt, schema, priority=priority, user_id=user_id)
+    return [item.model_dump() for item in items]
+
+async def generate_ai_object(prompt: str, schema, priority: Optional[Priority] = None, user_id: Optional[str] = None) -> dict:
+    """Şemaya uygun tek nesne üretir, dict olarak döner."""
+    item = await run_llm(structured_generator.generate, prompt, schema, priority=priority, user_id=user_id)
+    return item.model_dump()
+
 app = FastAPI(
     title="JustLaw API",
     description="Türk Hukuku AI Asistanı Backend",
@@ -75,10 +167,62 @@ app.add_middleware(
 
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    print(f"DEBUG: Incoming request: {request.method} {request.url}")
-    response = await call_next(request)
-    print(f"DEBUG: Response status: {response.status_code}")
-    return response
+    import time
+
+    # Gelen X-Request-ID korunur; yoksa üretilir ve yanıtta döner
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+    request_id_token = request_id_var.set(request_id)
+    route_token = route_var.set(request.url.path)
+    start = time.perf_counter()
+    query_prewarmer.request_started()
+    HTTP_IN_FLIGHT.inc()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers["X-Request-ID"] = request_id
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        HTTP_IN_FLIGHT.dec()
+        query_prewarmer.request_finished()
+        # Etiket kardinalitesi sınırlı kalsın diye ham path yerine route şablonu kullanılır
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.observe(
+            elapsed, method=request.method, route=getattr(route, "path", None) or "unmatched", status=status_code
+        )
+        logger.info(
+            "%s %s %s", request.method, request.url.path, status_code,
+            extra={"method": request.method, "status": status_code, "duration_ms": round(elapsed * 1000, 1)}
+        )
+        route_var.reset(route_token)
+        request_id_var.reset(request_id_token)
+
+# Popüler sorgu ön ısıtma (boşta kalan zamanda)
+from services.query_prewarmer import query_prewarmer
+
+@app.on_event("startup")
+async def start_query_prewarmer():
+    async def warm_yargitay(query: str, limit: int):
+        with llm_priority(Priority.BACKGROUND):
+            return await _search_yargitay_uncached(query, limit)
+
+    async def warm_mevzuat(query: str, limit: int):
+        with llm_priority(Priority.BACKGROUND):
+            return await _search_mevzuat_uncached(query, limit)
+
+    query_prewarmer.register("yargitay", warm_yargitay)
+    query_prewarmer.register("mevzuat", warm_mevzuat)
+    query_prewarmer.start()
+
+    # Prompt önbelleklerini ilk istekten önce oluştur (arka planda)
+    if client:
+        import asyncio
+        asyncio.create_task(asyncio.to_thread(prompt_cache.warm_up))
+
+@app.on_event("shutdown")
+async def stop_query_prewarmer():
+    await query_prewarmer.stop()
 
 # Static files mount moved to bottom to prevent route shadowing
 
@@ -105,6 +249,8 @@ BİÇİMLENDİRME KURALLARI:
 HEDEF:
 Kullanıcıya sadece "ne olduğunu" değil, "haklarını nasıl koruyacağını" gösteren eylem odaklı yanıtlar ver."""
 
+prompt_cache.register("chat", SYSTEM_PROMPT)
+
 # ============== MODELS ==============
 
 class ChatRequest(BaseModel):
@@ -128,23 +274,26 @@ class SozlesmeAnaliz(BaseModel):
 
 # ============== HELPERS ==============
 
-async def increment_user_stat(user_id: str, field: str):
+from services.usage_counters import usage_counters
+
+
+@app.on_event("startup")
+async def start_usage_counters():
+    usage_counters.start()
+
+
+@app.on_event("shutdown")
+async def stop_usage_counters():
+    # Bekleyen artışlar kapanmadan önce yazılır
+    await usage_counters.stop()
+
+
+async def increment_user_stat(user_id: str, field: str, amount: int = 1):
     """
     Kullanıcı istatistiğini artırır.
+    Artış bellekte biriktirilir ve Firestore'a toplu yazılır; istek ağ çağrısı beklemez.
     """
-    if not user_id or user_id == "anonymous":
-        return
-        
-    try:
-        db = firestore.client()
-        user_ref = db.collection("users").document(user_id)
-        # Atomik increment işlemi
-        user_ref.update({
-            field: firestore.Increment(1)
-        })
-        print(f"Stat incremented: {field} for {user_id}")
-    except Exception as e:
-        print(f"Stat increment error: {e}")
+    usage_counters.increment(user_id, field, amount)
 
 # ============== ROUTES ==============
 
@@ -161,29 +310,151 @@ async def root():
 async def health_check():
     return {"status": "healthy", "gemini": client is not None}
 
+@app.get("/api/llm/metrics")
+async def llm_metrics():
+    """
+    LLM zamanlayıcı durumunu döner (kuyruk derinliği, çalışan çağrılar, reddedilenler).
+    """
+    return {
+        **llm_scheduler.metrics(),
+        "prompt_cache": prompt_cache.metrics(),
+        "analysis_cache": analysis_cache.metrics(),
+        "jobs": job_queue.metrics(),
+        "render": render_service.metrics(),
+        "usage_counters": usage_counters.metrics(),
+        "user_profiles": user_profile_cache.metrics(),
+        "payments": payment_queue.metrics(),
+        "logging": logging_pipeline.metrics()
+    }
+
+
+def _cache_samples():
+    """Önbellek isabet/ıska sayıları ve oranları (servislerin kendi sayaçlarından)."""
+    caches = {
+        "search": (query_prewarmer.cache.hits, query_prewarmer.cache.misses),
+        "user_profile": (user_profile_cache.stats["hits"], user_profile_cache.stats["misses"]),
+        "prompt_prefix": (
+            prompt_cache.stats["cached_requests"],
+            prompt_cache.stats["requests"] - prompt_cache.stats["cached_requests"]
+        ),
+    }
+    for kind in ("text", "analysis"):
+        caches[f"document_{kind}"] = (analysis_cache.hits.get(kind, 0), analysis_cache.misses.get(kind, 0))
+
+    return [
+        ("cache_hits_total", "counter", "Önbellek isabetleri",
+         [({"cache": name}, hits) for name, (hits, _misses) in caches.items()]),
+        ("cache_misses_total", "counter", "Önbellek ıskaları",
+         [({"cache": name}, misses) for name, (_hits, misses) in caches.items()]),
+        ("cache_hit_ratio", "gauge", "Önbellek isabet oranı (başlangıçtan beri)",
+         [({"cache": name}, round(hits / (hits + misses), 4) if hits + misses else None)
+          for name, (hits, misses) in caches.items()]),
+    ]
+
+
+def _queue_samples():
+    """Kuyruk derinlikleri ve süren işler."""
+    llm = llm_scheduler.metrics()
+    jobs = job_queue.metrics()
+    return [
+        ("llm_in_flight", "gauge", "Süren Gemini çağrıları", [({}, llm["in_flight"])]),
+        ("llm_queue_depth", "gauge", "Gemini kuyruğunda bekleyen çağrılar",
+         [({"priority": name}, depth) for name, depth in llm["queue_depth"].items()]),
+        ("llm_rejected_total", "counter", "Reddedilen Gemini çağrıları",
+         [({"reason": reason}, count) for reason, count in llm["rejected"].items()]),
+        ("render_pending", "gauge", "Bekleyen/süren PDF-UDF üretimleri", [({}, render_service.metrics()["pending"])]),
+        ("jobs", "gauge", "Asenkron işler (duruma göre)",
+         [({"status": status}, count) for status, count in jobs["jobs"].items()]),
+        ("jobs_queue_depth", "gauge", "Kuyrukta bekleyen asenkron işler", [({}, jobs["queue_depth"])]),
+        ("payments_queued", "gauge", "İşlenmeyi bekleyen ödeme bildirimleri",
+         [({}, payment_queue.metrics()["queued"])]),
+        ("usage_counters_pending", "gauge", "Firestore'a yazılmayı bekleyen kullanım sayaçları",
+         [({}, usage_counters.metrics()["pending_counters"])]),
+    ]
+
+
+metrics_registry.add_collector(_cache_samples)
+metrics_registry.add_collector(_queue_samples)
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """
+    Prometheus metin formatında metrikler: route/bağımlılık gecikme histogramları,
+    önbellek isabet oranları, süren iş göstergeleri, Gemini token sayıları.
+    """
+    return Response(content=metrics_registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+# Sunucu tarafı konuşma hafızası (LRU + Firestore), eski turlar özetlenir
+from services.conversation_store import ConversationStore, FirestoreConversationBackend
+
+conversation_store = ConversationStore(
+    backend=FirestoreConversationBackend() if firebase_admin._apps else None
+)
+
+@app.on_event("shutdown")
+async def stop_conversation_store():
+    # Yanıt sonrası başlayan özetlemeler kapanışta yarıda kalmasın
+    await conversation_store.stop()
+
+async def summarize_conversation(summary: str, turns: List[dict]) -> str:
+    """Konuşma özetini eski turlarla artımlı olarak günceller."""
+    transcript = "\n\n".join(
+        f"{'Kullanıcı' if t['role'] == 'user' else 'Asistan'}: {t['text']}" for t in turns
+    )
+    prompt = f"""Aşağıdaki hukuki danışma konuşmasının özetini güncelle.
+Kullanıcının olayını, sorduğu hukuki soruları, verilen temel yanıtları ve bahsi geçen kanun maddelerini koru.
+En fazla 200 kelime, sadece özet metnini yaz.
+
+Mevcut Özet: {summary or 'Yok'}
+
+Yeni Mesajlar:
+{transcript}
+
+Güncel Özet:"""
+    return await generate_ai_content(prompt, Priority.BACKGROUND)
+
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """
     Kullanıcı sorusuna Gemini ile yanıt üretir.
+    conversation_id verilirse önceki konuşma (özet + son mesajlar) bağlam olarak eklenir.
     """
-    import traceback
+    import asyncio
     
     if not client:
         raise HTTPException(status_code=500, detail="Gemini API yapılandırılmamış")
     
     try:
-        # Create prompt with system instructions
-        full_prompt = f"{SYSTEM_PROMPT}\n\nKullanıcı Sorusu: {request.message}\n\nYanıtınız:"
+        # Generate conversation ID if not provided
+        conv_id = request.conversation_id or str(uuid.uuid4())
         
-        print(f"Sending prompt to Gemini: {request.message[:50]}...")
+        conversation = None
+        if request.conversation_id:
+            try:
+                conversation = await conversation_store.get(conv_id, request.user_id)
+            except PermissionError:
+                # Başka kullanıcının konuşması - yeni konuşma başlat
+                conv_id = str(uuid.uuid4())
+        if conversation is None:
+            conversation = conversation_store.create(conv_id, request.user_id)
+        
+        # SYSTEM_PROMPT önbellekteki önek olarak gönderilir (prompt_cache "chat")
+        history = conversation_store.build_context(conversation)
+        full_prompt = f"Kullanıcı Sorusu: {request.message}\n\nYanıtınız:"
+        if history:
+            full_prompt = f"{history}\n\n{full_prompt}"
+        
+        logger.debug("Sending prompt to Gemini", extra={"prompt_chars": len(full_prompt)})
         
         # Generate response using helper
-        response_text = generate_ai_content(full_prompt)
+        response_text = await generate_ai_content(full_prompt, Priority.INTERACTIVE, request.user_id, prefix="chat")
         
-        print(f"Got response from Gemini")
+        logger.debug("Got response from Gemini", extra={"response_chars": len(response_text)})
         
-        # Generate conversation ID if not provided
-        conv_id = request.conversation_id or str(uuid.uuid4())
+        await conversation_store.append(conversation, request.message, response_text)
+        # Pencereden taşan turlar yanıt döndükten sonra özetlenir
+        conversation_store.schedule_compact(conversation, summarize_conversation)
         
         return ChatResponse(
             response=response_text,
@@ -191,9 +462,10 @@ async def chat(request: ChatRequest):
             conversation_id=conv_id
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
-        error_details = traceback.format_exc()
-        print(f"Error generating response: {error_details}")
+        logger.exception("Error generating response")
         raise HTTPException(status_code=500, detail=f"Yanıt üretilirken hata: {str(e)}")
 
 @app.post("/api/dilekce")
@@ -211,7 +483,7 @@ Bilgiler: {request.bilgiler}
 
 Dilekçe resmi formatta olmalı ve Türk Hukuku standartlarına uygun olmalıdır."""
 
-        response_text = generate_ai_content(dilekce_prompt)
+        response_text = await generate_ai_content(dilekce_prompt, Priority.GENERATION, request.user_id)
         
         # Track usage
         await increment_user_stat(request.user_id, "petition_count")
@@ -225,50 +497,15 @@ Dilekçe resmi formatta olmalı ve Türk Hukuku standartlarına uygun olmalıdı
         raise HTTPException(status_code=500, detail=f"Dilekçe oluşturulurken hata: {str(e)}")
 
 from fastapi import UploadFile, File
+from services.pdf_extractor import pdf_extractor, ScannedPDFError
+from services.analysis_cache import analysis_cache, content_digest
+# Kısa belgeler tek prompt, uzun belgeler map-reduce (services/document_analysis.py)
+from services.document_analysis import document_analyzer, DocumentAnalysisError
 
-@app.post("/api/sozlesme-analiz")
-async def analyze_sozlesme(file: UploadFile = File(...), user_id: str = "anonymous"):
-    """
-    Sözleşme analizi yapar. Dosya yükleme (PDF/TXT) destekler.
-    """
-    if not client:
-        raise HTTPException(status_code=500, detail="Gemini API yapılandırılmamış")
-    
-    try:
-        content = ""
-        filename = file.filename.lower()
-        
-        # Read file content based on type
-        if filename.endswith(".pdf"):
-            import PyPDF2
-            from io import BytesIO
-            
-            pdf_bytes = await file.read()
-            pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_bytes))
-            
-            for page in pdf_reader.pages:
-                content += page.extract_text() + "\n"
-                
-        elif filename.endswith(".txt"):
-            content_bytes = await file.read()
-            content = content_bytes.decode("utf-8")
-        else:
-            # Fallback for unsupported/other types - try to read as text or just use filename
-            try:
-                content_bytes = await file.read()
-                content = content_bytes.decode("utf-8")
-            except:
-                content = f"Dosya adı: {file.filename} (İçerik okunamadı, lütfen analiz için genel bir değerlendirme yap.)"
+SINGLE_PROMPT_CHARS = 25000
+MAX_ANALYSIS_CHARS = 400000
 
-        # Truncate if too long (Gemini limits)
-        if len(content) > 30000:
-            content = content[:30000] + "...(devamı kesildi)"
-
-        analiz_prompt = f"""Aşağıdaki sözleşme metnini Türk Hukuku açısından detaylı analiz et.
-
-Dosya Adı: {file.filename}
-
-YANITINI ŞU FORMATTA VER (Markdown kullan):
+SOZLESME_REPORT_FORMAT = """YANITINI ŞU FORMATTA VER (Markdown kullan):
 
 ## 📊 Genel Değerlendirme
 Sözleşmenin genel durumu hakkında 2-3 cümle özet.
@@ -288,13 +525,134 @@ Her riskli madde için:
 3. Üçüncü öneri
 
 ## ⚖️ Hukuki Uyarı
-Bu analiz genel bilgilendirme amaçlıdır.
+Bu analiz genel bilgilendirme amaçlıdır."""
+
+# Prompt veya rapor formatı değişince önbellekteki eski analizler otomatik olarak geçersizleşir
+SOZLESME_PROMPT_VERSION = "sozlesme-md-3-" + content_digest(SOZLESME_REPORT_FORMAT.encode("utf-8"))[:8]
+
+
+def upload_suffix(filename: Optional[str]) -> str:
+    """Geçici dosya için yüklenen dosyanın uzantısı (ör. ".udf"); uzantı yoksa boş."""
+    return os.path.splitext(filename or "")[1].lower()
+
+
+async def read_sozlesme_text(path: str, digest: str, filename: str, user_id: str):
+    """
+    Geçici dosyaya aktarılmış belgeden analiz metnini çıkarır (PDF/UDF/TXT).
+    Metin önbelleği ortaktır; analiz sadece aynı kullanıcının önceki analizinden döner.
+
+    Returns:
+        (metin, önbellekteki analiz) - analiz varsa metin çıkarılmaz (None)
+    """
+    import asyncio
+    cached = analysis_cache.get_analysis(digest, SOZLESME_PROMPT_VERSION, user_id)
+    if cached is not None:
+        return None, cached
+
+    name = filename.lower()
+    if name.endswith(".pdf"):
+        # Paralel çıkarılır; MAX_ANALYSIS_CHARS dolunca durur
+        text = analysis_cache.get_text(digest, MAX_ANALYSIS_CHARS)
+        if text is None:
+            try:
+                text, _pages = await asyncio.to_thread(pdf_extractor.extract, path, MAX_ANALYSIS_CHARS)
+            except ScannedPDFError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            analysis_cache.put_text(digest, text, MAX_ANALYSIS_CHARS)
+        return text, None
+
+    if name.endswith(".udf"):
+        # UDF dosyadan tek geçişte ayrıştırılır
+        try:
+            return udf_analysis_text(await asyncio.to_thread(udf_generator.parse_udf, path)), None
+        except UDFParseError as e:
+            raise HTTPException(status_code=400, detail=f"UDF okunamadı: {str(e)}")
+
+    # TXT ve diğer türler düz metin olarak okunmaya çalışılır
+    def read_text() -> str:
+        with open(path, encoding="utf-8") as f:
+            return f.read(MAX_ANALYSIS_CHARS)
+
+    try:
+        return await asyncio.to_thread(read_text), None
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Desteklenmeyen dosya formatı.")
+
+
+def udf_analysis_text(data: dict) -> str:
+    """Ayrıştırılmış UDF alanlarını analiz prompt'u için metne çevirir."""
+    text = f"BELGE TÜRÜ: {data.get('dilekce_turu') or 'Bilinmiyor'}\n"
+    text += f"MAHKEME: {data.get('mahkeme', '')}\n"
+    text += f"KONU: {data.get('konu', '')}\n"
+    text += f"AÇIKLAMALAR:\n{data.get('aciklamalar', '')}\n"
+    text += f"TALEPLER:\n{data.get('talepler', '')}\n"
+    if data.get('ekler'):
+        text += f"EKLER: {', '.join(data.get('ekler'))}\n"
+    return text
+
+
+@app.on_event("shutdown")
+async def stop_pdf_extractor():
+    pdf_extractor.shutdown()
+
+@app.post("/api/sozlesme-analiz")
+async def analyze_sozlesme(file: UploadFile = File(...), user_id: str = Form("anonymous")):
+    """
+    Sözleşme analizi yapar. Dosya yükleme (PDF/UDF/TXT) destekler.
+    Kısa belgeler tek prompt ile, uzun belgeler parçalara bölünüp map-reduce ile analiz edilir.
+    """
+    if not client:
+        raise HTTPException(status_code=500, detail="Gemini API yapılandırılmamış")
+
+    # Yükleme belleğe alınmadan bir kez geçici dosyaya yazılır; özet önbellek anahtarıdır
+    path, digest = await pdf_extractor.spool_upload(file, suffix=upload_suffix(file.filename))
+    try:
+        return await run_sozlesme_analysis(path, digest, file.filename, user_id)
+    finally:
+        remove_file(path)
+
+
+async def run_sozlesme_analysis(path: str, digest: str, filename: str, user_id: str) -> dict:
+    """Geçici dosyadaki sözleşmeyi analiz eder (canlı istek ve kuyruktaki iş ortak yolu)."""
+    try:
+        content, cached_analysis = await read_sozlesme_text(path, digest, filename, user_id)
+
+        if cached_analysis is not None:
+            if user_id != "anonymous":
+                await increment_user_stat(user_id, "analysis_count")
+            return {
+                "status": "success",
+                "analiz": cached_analysis,
+                "riskler": [],
+                "oneriler": [],
+                "cached": True
+            }
+
+        if not content.strip():
+            raise HTTPException(status_code=400, detail="Dosya içeriği okunamadı veya boş.")
+
+        content = content[:MAX_ANALYSIS_CHARS]
+
+        if len(content) <= SINGLE_PROMPT_CHARS:
+            # Dosya adı prompt'a girmez: analiz önbelleği sadece içerik özetiyle adreslenir
+            analiz_prompt = f"""Aşağıdaki sözleşme metnini Türk Hukuku açısından detaylı analiz et.
+
+{SOZLESME_REPORT_FORMAT}
 
 Sözleşme İçeriği:
 {content}
 """
+            response_text = await generate_ai_content(analiz_prompt, Priority.GENERATION, user_id)
+        else:
+            # Uzun sözleşme: parçalara böl, paralel analiz et, tek raporda birleştir.
+            # Kullanıcının önceki sürümüyle eşleşen parçaların bulguları yeniden kullanılır
+            async def generate(prompt: str) -> str:
+                return await generate_ai_content(prompt, Priority.GENERATION, user_id)
+
+            response_text = await document_analyzer.analyze(content, generate, SOZLESME_REPORT_FORMAT, user_id)
 
-        response_text = generate_ai_content(analiz_prompt)
+        if response_text:
+            analysis_cache.put_analysis(digest, SOZLESME_PROMPT_VERSION, user_id, response_text)
         
         # Track usage
         if user_id != "anonymous":
@@ -306,16 +664,132 @@ Sözleşme İçeriği:
             "riskler": [],
             "oneriler": []
         }
+    except HTTPException:
+        raise
+    except DocumentAnalysisError as e:
+        logger.warning("Sözleşme analizi başarısız: %s", e)
+        raise HTTPException(status_code=503, detail=f"AI servisi yoğun, lütfen tekrar deneyin ({e})")
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("Analiz hatası")
         raise HTTPException(status_code=500, detail=f"Analiz sırasında hata: {str(e)}")
 
+# ============== DİLEKÇE ALAN ÜRETİMİ ==============
+
+DILEKCE_FIELDS = ("konu", "aciklamalar", "talepler")
+
+# Tüm alan prompt'larında ortak olan şablon; prompt_cache "dilekce" öneki olarak bir kez gönderilir
+DILEKCE_SYSTEM_PROMPT = """Sen deneyimli bir Türk Hukuku avukatısın. Kullanıcının taslağını, Türk Mahkemeleri'nde kabul gören resmi dilekçe formatına çevirirsin.
+Her istekte dilekçenin SADECE istenen bölümünü yazarsın.
+
+ÖRNEK DİLEKÇE FORMATI (TAKİP ET):
+---
+KONU: [Kısa ve net başlık, örn: "Kıdem ve İhbar Tazminatı ile Fazla Mesai Ücreti Alacağı Talebi"]
+
+AÇIKLAMALAR:
+
+1. Müvekkil, davalı şirkette [tarih] - [tarih] tarihleri arasında [pozisyon] olarak çalışmıştır.
+
+2. [Olayların kronolojik ve detaylı anlatımı, maddeler halinde]
+
+3. 4857 sayılı İş Kanunu'nun [ilgili madde] hükmü gereğince...
+
+4. Yargıtay [Daire] Dairesi'nin [tarih] tarihli [esas/karar no] sayılı kararında da belirtildiği üzere...
+
+SONUÇ VE İSTEM:
+
+Yukarıda açıklanan nedenlerle;
+
+1. Davanın KABULÜNE,
+2. [Miktar] TL tutarındaki [alacak türü] alacağının yasal faiziyle birlikte davalıdan tahsiline,
+3. Yargılama giderleri ve vekalet ücretinin davalı tarafa yükletilmesine,
+
+karar verilmesini saygılarımla arz ve talep ederim.
+---
+
+ÖNEMLİ KURALLAR:
+1. Açıklamalar en az 4-5 madde olsun, detaylı ve kronolojik; maddeleri boş satırla ayır.
+2. İlgili kanun maddelerini ve Yargıtay kararlarını referans göster.
+3. Talepler en az 3-4 madde olsun, net ve ölçülebilir; "Yukarıda açıklanan nedenlerle;" ile başlasın.
+4. Profesyonel ve resmi dil kullan.
+5. Eksik veya belirsiz kısımları "[...]" ile işaretle ki kullanıcı doldurabilsin.
+6. Bölüm başlığı (KONU, AÇIKLAMALAR, SONUÇ VE İSTEM) veya ek açıklama koyma, sadece bölüm metnini yaz."""
+
+prompt_cache.register("dilekce", DILEKCE_SYSTEM_PROMPT)
+
+# Her alan için ayrı, küçük prompt: alanlar paralel üretilir (toplam süre = en yavaş alan)
+DILEKCE_FIELD_PROMPTS = {
+    "konu": "Aşağıdaki dava bilgileri için kısa, öz ve hukuki bir 'Konu' metni yaz.",
+    "aciklamalar": "Aşağıdaki dava bilgileri için dilekçenin 'Açıklamalar' bölümünü yaz.",
+    "talepler": "Aşağıdaki dava bilgileri için 'Sonuç ve İstem' (Talepler) kısmını maddeler halinde yaz.",
+}
+
+# Toplu dilekçe şablonlarındaki taraf yer tutucuları: {davaci_adi}, {davali_adres} ...
+PLACEHOLDER_PATTERN = re.compile(r"\{(davaci_adi|davaci_tc|davaci_adres|davali_adi|davali_adres)\}")
+
+def build_field_prompt(field_type: str, context: dict) -> Optional[str]:
+    """Tek bir dilekçe alanı için prompt oluşturur (şablon önekten gelir). Bilinmeyen alan için None döner."""
+    instruction = DILEKCE_FIELD_PROMPTS.get(field_type)
+    if not instruction:
+        return None
+
+    aciklamalar = context.get('aciklamalar') or ''
+    taslak = context.get(field_type)
+    taslak_satiri = f"\nKullanıcının taslağı (profesyonel hukuki dile çevir ve geliştir): {taslak}\n" if taslak else ""
+    if any(PLACEHOLDER_PATTERN.search(str(value or "")) for value in context.values()):
+        # Toplu üretim şablonu: yer tutucular taraf bilgileriyle sonradan değiştirilir
+        instruction += (
+            " {davaci_adi}, {davali_adi} gibi süslü parantezli yer tutucuları olduğu gibi koru;"
+            " taraflardan bahsederken isim yerine bu yer tutucuları kullan."
+        )
+
+    return f"""{instruction}
+
+Dava Türü: {context.get('dilekce_turu') or 'Belirtilmedi'}
+Davacı: {context.get('davaci_adi') or 'Belirtilmedi'}
+Davalı: {context.get('davali_adi') or 'Belirtilmedi'}
+Konu: {context.get('konu') or 'Belirtilmedi'}
+Açıklamalar Özeti: {aciklamalar[:1500] if aciklamalar else 'Belirtilmedi'}
+{taslak_satiri}"""
+
+async def generate_dilekce_fields(
+    fields, context: dict, user_id: Optional[str] = None, timeout: float = 25.0
+):
+    """
+    İstenen alanları eşzamanlı üretir. Zaman aşımına uğrayan veya hata veren alanlar
+    sonuçtan çıkarılır ve errors içinde raporlanır (kısmi sonuç).
+    """
+    import asyncio
+
+    async def one(field_type: str):
+        prompt = build_field_prompt(field_type, context)
+        if prompt is None:
+            raise ValueError("Bilinmeyen alan")
+        text = await asyncio.wait_for(
+            generate_ai_content(prompt, Priority.GENERATION, user_id, prefix="dilekce"),
+            timeout=timeout
+        )
+        return text.strip()
+
+    fields = list(dict.fromkeys(fields))
+    outcomes = await asyncio.gather(*[one(f) for f in fields], return_exceptions=True)
+
+    results, errors = {}, {}
+    for field_type, outcome in zip(fields, outcomes):
+        if isinstance(outcome, asyncio.TimeoutError):
+            errors[field_type] = "Zaman aşımı"
+        elif isinstance(outcome, HTTPException):
+            errors[field_type] = outcome.detail
+        elif isinstance(outcome, Exception):
+            errors[field_type] = str(outcome)
+        elif outcome:
+            results[field_type] = outcome
+    return results, errors
+
 @app.post("/api/dilekce/generate-field")
 async def generate_dilekce_field(request: dict):
     """
     Dilekçenin belirli bir alanını (konu, talep vb.) AI ile oluşturur.
-    Expected keys: field_type (konu|talepler), context (other form data)
+    Expected keys: field_type (konu|aciklamalar|talepler), context (other form data)
     """
     if not client:
         raise HTTPException(status_code=500, detail="Gemini API yapılandırılmamış")
@@ -324,61 +798,68 @@ async def generate_dilekce_field(request: dict):
         field_type = request.get("field_type")
         context = request.get("context", {})
         
-        if field_type == "konu":
-            prompt = f"""Aşağıdaki dava bilgileri için kısa, öz ve hukuki bir 'Konu' metni yaz.
-            
-            Dava Türü: {context.get('dilekce_turu')}
-            Davacı: {context.get('davaci_adi')}
-            Davalı: {context.get('davalı_adi')}
-            
-            Sadece konu metnini yaz, başlık veya ek açıklama koyma."""
-            
-        elif field_type == "talepler":
-            prompt = f"""Aşağıdaki dava bilgileri için 'Sonuç ve İstem' (Talepler) kısmı yaz. Maddeler halinde olsun.
-            
-            Dava Türü: {context.get('dilekce_turu')}
-            Konu: {context.get('konu')}
-            Açıklamalar Özeti: {context.get('aciklamalar')[:500] if context.get('aciklamalar') else 'Belirtilmedi'}
-            
-            Sadece talep maddelerini yaz."""
-        else:
+        prompt = build_field_prompt(field_type, context)
+        if prompt is None:
             return {"text": ""}
             
-        response_text = generate_ai_content(prompt)
+        response_text = await generate_ai_content(prompt, Priority.GENERATION, request.get("user_id"), prefix="dilekce")
         return {"text": response_text.strip()}
         
     except Exception as e:
         return {"text": "", "error": str(e)}
 
+class DilekceFieldsRequest(BaseModel):
+    fields: List[str] = list(DILEKCE_FIELDS)
+    context: dict = {}
+    user_id: str = "anonymous"
+    timeout: float = 25.0
+
+@app.post("/api/dilekce/generate-fields")
+async def generate_dilekce_fields_batch(request: DilekceFieldsRequest):
+    """
+    Birden fazla dilekçe alanını tek istekte, paralel olarak üretir.
+    Bir alan zaman aşımına uğrarsa diğer alanlar yine döner (partial=True).
+    """
+    if not client:
+        raise HTTPException(status_code=500, detail="Gemini API yapılandırılmamış")
+
+    timeout = min(max(request.timeout, 1.0), 60.0)
+    results, errors = await generate_dilekce_fields(
+        request.fields, request.context, request.user_id, timeout
+    )
+
+    return {
+        "status": "success" if results else "error",
+        "fields": results,
+        "errors": errors or None,
+        "partial": bool(errors)
+    }
+
 @app.get("/api/mevzuat/search")
 async def search_mevzuat(query: str, limit: int = 10):
+    cached = query_prewarmer.record("mevzuat", query, limit)
+    if cached:
+        return cached
+    
+    result = await _search_mevzuat_uncached(query, limit)
+    if result.get("total"):
+        query_prewarmer.store("mevzuat", query, limit, result)
+    return result
+
+async def _search_mevzuat_uncached(query: str, limit: int) -> dict:
     # Placeholder for future implementation
     if not client:
         return {"results": [], "message": "Sistem hatası"}
         
     # Generate informative "fake" results via AI if database is empty
-    prompt = f"""Türk Hukuku mevzuatında "{query}" ile ilgili en önemli 3 kanun maddesini bul/hatırla.
-    
-    Yanıtı şu JSON formatında ver:
-    [
-        {{
-            "mevzuat_no": "Kanun No",
-            "baslik": "Kanun Adı",
-            "madde_no": "Madde X",
-            "icerik": "Madde içeriğinin özeti..."
-        }}
-    ]"""
+    prompt = f"""Türk Hukuku mevzuatında "{query}" ile ilgili en önemli 3 kanun maddesini bul/hatırla."""
     
     try:
-        response = generate_ai_content(prompt)
-        import json
-        import re
-        json_match = re.search(r'\[[\s\S]*\]', response_text)
-        if json_match:
-            results = json.loads(json_match.group())
+        results = await generate_ai_list(prompt, MevzuatMaddesi)
+        if results:
             return {"results": results, "total": len(results), "message": "AI tarafından oluşturulan mevzuat önerileri"}
-    except:
-        pass
+    except Exception as e:
+        logger.warning("Mevzuat AI error: %s", e)
         
     return {"results": [], "total": 0, "message": "Sonuç bulunamadı"}
 
@@ -412,7 +893,7 @@ async def search_all_sources(
         except asyncio.TimeoutError:
             return []
         except Exception as e:
-            print(f"{name} error: {e}")
+            logger.warning("%s error: %s", name, e)
             return []
     
     tasks = []
@@ -445,24 +926,12 @@ async def search_all_sources(
     # AI fallback if no results
     if not all_results and client:
         prompt = f"""Türk Hukuku'nda "{query}" konusuyla ilgili emsal karar özetleri oluştur.
-        Yargıtay, Danıştay, Anayasa Mahkemesi ve Rekabet Kurumu kararlarından örnekler ver.
-        
-        JSON formatında döndür:
-        [
-            {{"esas_no": "...", "karar_no": "...", "daire": "...", "tarih": "...", "ozet": "...", "source": "yargitay"}}
-        ]
-        
-        Sadece JSON array döndür."""
+        Yargıtay, Danıştay, Anayasa Mahkemesi ve Rekabet Kurumu kararlarından örnekler ver."""
         
         try:
-            ai_text = generate_ai_content(prompt)
-            import json
-            import re
-            json_match = re.search(r'\[[\s\S]*\]', ai_text)
-            if json_match:
-                all_results = json.loads(json_match.group())
+            all_results = await generate_ai_list(prompt, KararOzeti)
         except Exception as e:
-            print(f"AI fallback error: {e}")
+            logger.warning("AI fallback error: %s", e)
     
     # Track usage (Search) - Generic stat update since we don't have user_id here easily without auth middleware
     # For now, skipping search tracking or need to pass user_id in query params.
@@ -479,7 +948,22 @@ async def search_all_sources(
 # ============== UYAP UDF FORMAT ==============
 
 from fastapi import UploadFile, File, Form
-from services.udf_generator import udf_generator
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from services.udf_generator import udf_generator, UDFParseError
+from services.render_service import render_service, RenderBusy, iter_file, remove_file
+
+
+@app.on_event("startup")
+async def start_render_service():
+    # Worker'lar fontları yükleyerek açılır; ilk PDF isteği ısınma maliyeti ödemez
+    render_service.start()
+
+
+@app.on_event("shutdown")
+async def stop_render_service():
+    render_service.shutdown()
+
 
 @app.post("/api/dilekce/udf")
 async def create_dilekce_udf(
@@ -492,13 +976,17 @@ async def create_dilekce_udf(
     konu: str = Form(""),
     aciklamalar: str = Form(""),
     talepler: str = Form(""),
-    dilekce_turu: str = Form("genel")
+    dilekce_turu: str = Form("genel"),
+    user_id: str = Form("anonymous"),
+    udf_format: str = Form("xml")
 ):
     """
     UYAP uyumlu UDF formatında dilekçe oluşturur.
+    udf_format="uyap" ile UYAP editörünün açtığı ZIP tabanlı UDF (content.xml) üretilir.
     """
-    from fastapi.responses import Response
-    
+    if udf_format not in ("xml", "uyap"):
+        raise HTTPException(status_code=400, detail="udf_format 'xml' veya 'uyap' olmalı")
+
     try:
         # AI ile zenginleştir
         enhanced_data = {
@@ -519,47 +1007,46 @@ async def create_dilekce_udf(
                 enhance_prompt = f"""Dilekçe içeriğini profesyonel hukuki dile çevir:
                 Konu: {konu}
                 Açıklamalar: {aciklamalar}
-                Talepler: {talepler}
-                
-                JSON döndür: {{"konu": "...", "aciklamalar": "...", "talepler": "..."}}"""
+                Talepler: {talepler}"""
                 
-                ai_text = generate_ai_content(enhance_prompt)
-                import json
-                import re
-                json_match = re.search(r'\{[\s\S]*\}', ai_text)
-                if json_match:
-                    ai_data = json.loads(json_match.group())
-                    enhanced_data.update(ai_data)
-            except:
-                pass
+                ai_data = await generate_ai_object(enhance_prompt, DilekceIcerigi, Priority.GENERATION, user_id)
+                enhanced_data.update(ai_data)
+            except Exception as e:
+                logger.warning("AI zenginleştirme hatası: %s", e)
         
-        udf_bytes = udf_generator.create_udf(enhanced_data)
+        # UDF worker'da doğrudan dosyaya akıtılır, yanıt da dosyadan parça parça okunur
+        kind = "udf_uyap" if udf_format == "uyap" else "udf"
+        path = await render_service.render_to_file(kind, enhanced_data, suffix=".udf")
         
         from urllib.parse import quote
         filename = f"dilekce_{dilekce_turu}.udf"
         encoded_filename = quote(filename)
         
-        return Response(
-            content=udf_bytes,
-            media_type="application/xml",
+        return StreamingResponse(
+            iter_file(path),
+            media_type="application/zip" if udf_format == "uyap" else "application/xml",
             headers={
-                "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"
-            }
+                "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}",
+                "Content-Length": str(os.path.getsize(path))
+            },
+            background=BackgroundTask(remove_file, path)
         )
         
+    except RenderBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("UDF oluşturma hatası")
         raise HTTPException(status_code=500, detail=f"UDF oluşturulurken hata: {str(e)}")
 
 @app.post("/api/dilekce/udf/parse")
 async def parse_udf_file(file: UploadFile = File(...)):
     """
     UDF dosyasını parse eder ve içeriğini döndürür.
+    Yükleme belleğe alınmadan tek geçişte ayrıştırılır ve yapı doğrulanır.
     """
+    import asyncio
     try:
-        content = await file.read()
-        data = udf_generator.parse_udf(content)
+        data = await asyncio.to_thread(udf_generator.parse_udf, file.file)
         
         return {
             "status": "success",
@@ -572,7 +1059,18 @@ async def parse_udf_file(file: UploadFile = File(...)):
 async def search_yargitay(query: str, limit: int = 10):
     """
     Yargıtay kararları araması yapar. Scraper çalışmazsa AI devreye girer.
+    Popüler sorgular arka planda önceden hesaplanır (services/query_prewarmer.py).
     """
+    cached = query_prewarmer.record("yargitay", query, limit)
+    if cached:
+        return cached
+    
+    result = await _search_yargitay_uncached(query, limit)
+    if result.get("total"):
+        query_prewarmer.store("yargitay", query, limit, result)
+    return result
+
+async def _search_yargitay_uncached(query: str, limit: int) -> dict:
     # 1. Try Scraper first (with short timeout)
     from services.scraper import YargitayScraper
     import asyncio
@@ -593,50 +1091,32 @@ async def search_yargitay(query: str, limit: int = 10):
                     "message": "success"
                 }
         except asyncio.TimeoutError:
-            print("Yargıtay scraper timeout - switching to AI")
+            logger.warning("Yargıtay scraper timeout - switching to AI")
             # Do not close here, let it be garbage collected or handled
         except Exception as e:
-            print(f"Scraper error: {e}")
+            logger.warning("Scraper error: %s", e)
             
     except Exception as e:
-        print(f"General search error: {e}")
+        logger.warning("General search error: %s", e)
 
     # 2. Fallback to Gemini AI
     if client:
-        print(f"Using AI fallback for query: {query}")
+        logger.debug("Using AI fallback for query: %s", query)
         prompt = f"""Türk Hukuku Yargıtay içtihatlarında "{query}" konusuyla ilgili 8 adet detaylı emsal karar özeti oluştur.
         
         Her bir karar için GERÇEKÇİ ve DOĞRULANABİLİR formatta daire isimleri, esas/karar numaraları ve tarihler kullan.
-        
-        Her karar için tam olarak şu JSON yapısını kullan:
-        [
-          {{
-            "esas_no": "2023/...",
-            "karar_no": "2024/...",
-            "daire": "... Hukuk Dairesi",
-            "tarih": "DD.MM.YYYY",
-            "ozet": "Kararın kısa hukuki özeti (2-3 cümle)...",
-            "content": "DETAYLI GEREKÇE: ... (Buraya kararın hukuki mantığını, dayandığı kanun maddelerini ve varılan sonucu en az 150-200 kelime olacak şekilde detaylıca yaz)"
-          }}
-        ]
-        
-        Sadece JSON array döndür."""
+        "content" alanına kararın hukuki mantığını, dayandığı kanun maddelerini ve varılan sonucu en az 150-200 kelime olacak şekilde detaylıca yaz."""
         
         try:
-            response = generate_ai_content(prompt)
-            import json
-            import re
-            
-            json_match = re.search(r'\[[\s\S]*\]', response)
-            if json_match:
-                ai_results = json.loads(json_match.group())
+            ai_results = await generate_ai_list(prompt, KararOzeti)
+            if ai_results:
                 return {
                     "results": ai_results,
                     "total": len(ai_results),
                     "message": "AI tarafından oluşturulan emsal karar önerileri (Resmi veritabanı yanıt vermedi)"
                 }
         except Exception as e:
-            print(f"AI generation error: {e}")
+            logger.warning("AI generation error: %s", e)
             
     return {
         "results": [],
@@ -689,7 +1169,7 @@ async def search_legal_multi(query: str, sources: str = "yargitay", limit: int =
                 results.extend(res)
                 
     except Exception as e:
-        print(f"Multi search error: {e}")
+        logger.warning("Multi search error: %s", e)
     finally:
         # Close all clients
         for s in scrapers:
@@ -697,7 +1177,7 @@ async def search_legal_multi(query: str, sources: str = "yargitay", limit: int =
             
     # AI Fallback if no results
     if not results and client:
-        print(f"Multi-search empty, using AI for: {query}")
+        logger.debug("Multi-search empty, using AI for: %s", query)
         
         prompt = f"""Türk Yüksek Mahkemeleri (Yargıtay, Danıştay, AYM) kararlarında "{query}" konusuyla ilgili toplam 8 adet detaylı emsal karar oluştur.
         
@@ -706,35 +1186,18 @@ async def search_legal_multi(query: str, sources: str = "yargitay", limit: int =
         Her karar için şunları yap:
         1. İlgili mahkemeye (Yargıtay/Danıştay/AYM) uygun daire ve esas no formatı kullan.
         2. "source" alanına kaynağı yaz (yargitay, danistay, anayasa, rekabet).
-        
-        JSON Formatı:
-        [
-          {{
-            "source": "yargitay",
-            "daire": "...",
-            "esas_no": "...",
-            "karar_no": "...",
-            "tarih": "...",
-            "ozet": "Kısa özet...",
-            "content": "DETAYLI GEREKÇE: ... (En az 150 kelime, hukuki tartışma ve sonuç)"
-          }}
-        ]
-        """
+        3. "content" alanına en az 150 kelimelik hukuki tartışma ve sonuç yaz."""
         
         try:
-            response = generate_ai_content(prompt)
-            import json
-            import re
-            json_match = re.search(r'\[[\s\S]*\]', response)
-            if json_match:
-                ai_results = json.loads(json_match.group())
+            ai_results = await generate_ai_list(prompt, KararOzeti)
+            if ai_results:
                 return {
                     "results": ai_results,
                     "total": len(ai_results),
                     "message": "AI tarafından oluşturulan emsal karar önerileri"
                 }
         except Exception as e:
-             print(f"AI fallback error: {e}")
+            logger.warning("AI fallback error: %s", e)
 
     return {
         "results": results,
@@ -744,6 +1207,14 @@ async def search_legal_multi(query: str, sources: str = "yargitay", limit: int =
 
 # ============== SHOPIER PAYMENT ==============
 
+# Abonelik planları (frontend/js/subscription.js PLANS fiyatları ile aynı)
+SUBSCRIPTION_PLANS = {
+    "professional": {"name": "JustLaw Profesyonel (1 Ay)", "price": 1200.0},
+    "enterprise": {"name": "JustLaw Kurumsal (1 Ay)", "price": 2000.0},
+}
+SUBSCRIPTION_DAYS = 30
+
+
 class ShopierPayment:
     def __init__(self, api_key: str, api_secret: str, website_index: int = 1):
         self.api_key = api_key
@@ -755,6 +1226,7 @@ class ShopierPayment:
         import hmac
         import hashlib
         import base64
+        import random
         
         # Shopier parametreleri
         user_name = user_name or "Misafir Kullanici"
@@ -763,21 +1235,212 @@ class ShopierPayment:
         
         # Rastgele 10 haneli alıcı hesap numarası (Shopier zorunlu kılıyor olabilir, dokümana göre değişir)
         # Burada temel form yapısını oluşturacağız.
+        random_nr = str(random.randint(1000000000, 9999999999))
+        total = f"{amount:.2f}"
+        currency = "0"  # TL
         
         # Shopier API maalesef standart bir REST API değil, bir Form POST işlemidir.
         # Bu yüzden backend'den ziyade frontend'den form submit etmek veya backend'den HTML dönmek gerekir.
-            })
-            
+        # Backend imzalı form alanlarını döner, frontend bunları base_url'e POST eder.
+        params = {
+            "API_key": self.api_key,
+            "website_index": self.website_index,
+            "platform_order_id": order_id,
+            "product_name": product_name,
+            "product_type": 1,  # dijital ürün / hizmet
+            "buyer_name": first_name,
+            "buyer_surname": last_name,
+            "buyer_email": user_email,
+            "buyer_account_age": 0,
+            "buyer_id_nr": 0,
+            "buyer_phone": "",
+            "billing_address": "Türkiye",
+            "billing_city": "İstanbul",
+            "billing_country": "TR",
+            "billing_postcode": "",
+            "shipping_address": "Türkiye",
+            "shipping_city": "İstanbul",
+            "shipping_country": "TR",
+            "shipping_postcode": "",
+            "total_order_value": total,
+            "currency": currency,
+            "platform": 0,
+            "is_in_frame": 0,
+            "current_language": 0,
+            "modul_version": "1.0.4",
+            "random_nr": random_nr,
+        }
+        data = f"{random_nr}{order_id}{total}{currency}".encode("utf-8")
+        digest = hmac.new(self.api_secret.encode("utf-8"), data, hashlib.sha256).digest()
+        params["signature"] = base64.b64encode(digest).decode("ascii")
+        
+        return {"url": self.base_url, "params": params}
+
+    def verify_callback(self, random_nr: str, order_id: str, signature: str) -> bool:
+        import hmac
+        import hashlib
+        import base64
+        
+        expected = hmac.new(
+            self.api_secret.encode("utf-8"), f"{random_nr}{order_id}".encode("utf-8"), hashlib.sha256
+        ).digest()
+        try:
+            received = base64.b64decode(signature)
+        except Exception:
+            return False
+        return hmac.compare_digest(received, expected)
+
+
+shopier = ShopierPayment(
+    os.getenv("SHOPIER_API_KEY", ""),
+    os.getenv("SHOPIER_API_SECRET", ""),
+    int(os.getenv("SHOPIER_WEBSITE_INDEX", "1"))
+)
+
+
+def make_order_id(user_id: str, plan: str) -> str:
+    import time
+    return f"{user_id}-{plan}-{int(time.time())}"
+
+
+def parse_order_id(order_id: str):
+    """Sipariş numarasından (user_id, plan) çıkarır; user_id içinde '-' olabilir."""
+    user_id, plan, _ts = order_id.rsplit("-", 2)
+    return user_id, plan
+
+
+class PaymentRequest(BaseModel):
+    user_id: str
+    plan: str
+    email: str
+    name: Optional[str] = None
+
+
+@app.post("/api/payment/create")
+async def create_payment(request: PaymentRequest):
+    """
+    Shopier ödeme formu için imzalı alanları döner.
+    """
+    if not shopier.api_key or not shopier.api_secret:
+        raise HTTPException(status_code=503, detail="Ödeme sistemi yapılandırılmamış")
+    plan = SUBSCRIPTION_PLANS.get(request.plan)
+    if plan is None or not request.user_id or request.user_id == "anonymous":
+        raise HTTPException(status_code=400, detail="Geçersiz plan veya kullanıcı")
+
+    order_id = make_order_id(request.user_id, request.plan)
+    return shopier.generate_payment_link(order_id, plan["price"], request.email, request.name, plan["name"])
+
+
+# Ödeme bildirimleri idempotent kuyrukta işlenir: callback imzayı doğrular, siparişi
+# kaydeder ve hemen yanıt verir; abonelik güncellemesi worker'da tekrar denemeli uygulanır
+from services.payment_queue import payment_queue, PaymentPermanentError
+
+
+@timed("firestore", "users.subscription")
+def _apply_subscription_tx(order_id: str, user_id: str, plan: str, payment_id: str):
+    """Plan ve bitiş tarihini transaction içinde günceller; aynı sipariş ikinci kez uygulanmaz."""
+    from datetime import datetime, timedelta, timezone
+
+    db = firestore.client()
+    user_ref = db.collection("users").document(user_id)
+
+    @firestore.transactional
+    def update(transaction):
+        snapshot = user_ref.get(transaction=transaction)
+        if not snapshot.exists:
+            raise PaymentPermanentError(f"Kullanıcı bulunamadı: {user_id}")
+        data = snapshot.to_dict() or {}
+        if data.get("lastOrderId") == order_id:
+            return False
+
+        # Süresi bitmemiş abonelik varsa yeni dönem onun sonuna eklenir
+        now = datetime.now(timezone.utc)
+        current_end = data.get("premiumEndDate")
+        start = current_end if isinstance(current_end, datetime) and current_end > now else now
+        transaction.update(user_ref, {
+            "plan": plan,
+            "premiumEndDate": start + timedelta(days=SUBSCRIPTION_DAYS),
+            "lastPaymentId": payment_id,
+            "lastOrderId": order_id,
+            "lastPaymentDate": now
+        })
+        return True
+
+    return update(db.transaction())
+
+
+async def apply_subscription(order_id: str, payload: dict):
+    import asyncio
+
+    try:
+        user_id, plan = parse_order_id(order_id)
+    except ValueError:
+        raise PaymentPermanentError(f"Geçersiz sipariş numarası: {order_id}")
+    if plan not in SUBSCRIPTION_PLANS:
+        raise PaymentPermanentError(f"Geçersiz plan: {plan}")
+
+    applied = await asyncio.to_thread(_apply_subscription_tx, order_id, user_id, plan, payload.get("payment_id", ""))
+    if applied:
+        # Plan değişti: önbellekteki profil ve LLM kotası yeniden yüklenir
+        user_profile_cache.invalidate(user_id)
+
+
+@app.on_event("startup")
+async def start_payment_queue():
+    payment_queue.start(apply_subscription)
+
+
+@app.on_event("shutdown")
+async def stop_payment_queue():
+    await payment_queue.stop()
+
+
+@app.post("/api/payment/callback")
+async def shopier_callback(
+    platform_order_id: str = Form(...),
+    status: str = Form(...),
+    payment_id: str = Form(""),
+    random_nr: str = Form(...),
+    signature: str = Form(...)
+):
+    """
+    Shopier ödeme sonucu bildirimi. İmza doğrulanır, başarılı ödeme kuyruğa alınır ve hemen
+    onaylanır; aynı siparişin tekrar gelen bildirimleri yeniden işlenmez.
+    """
+    try:
+        if not shopier.verify_callback(random_nr, platform_order_id, signature):
+            logger.warning("Shopier callback: geçersiz imza (%s)", platform_order_id)
+            payment_queue.record_invalid_signature()
+            return "Fail"
+        
+        if status.lower() == "success":
+            await payment_queue.submit(platform_order_id, {"payment_id": payment_id, "status": status})
             return "OK"
         return "Fail"
-    except Exception as e:
-        print(f"Callback error: {e}")
+    except Exception:
+        logger.exception("Callback error")
         return "Error"
 
+
+@app.get("/api/users/{user_id}/plan")
+async def get_user_plan(user_id: str):
+    """
+    Kullanıcının etkin planı ve limitleri (profil önbelleğinden).
+    """
+    profile = await user_profile_cache.get(user_id)
+    if profile is not None and profile.load_error:
+        # Firestore okunamadı: kullanıcı var/yok bilinmiyor, 404 dönülmez
+        raise HTTPException(
+            status_code=503, detail="Kullanıcı bilgisi şu anda okunamıyor, lütfen tekrar deneyin",
+            headers={"Retry-After": "30"}
+        )
+    if profile is None or not profile.exists:
+        raise HTTPException(status_code=404, detail="Kullanıcı bulunamadı")
+    return profile.to_dict()
+
 # ============== PDF GENERATION ==============
 
 from fastapi.responses import Response
-from services.pdf_generator import pdf_generator
 
 class DilekcePDFRequest(BaseModel):
     mahkeme: str
@@ -790,113 +1453,190 @@ class DilekcePDFRequest(BaseModel):
     aciklamalar: str
     talepler: str
     dilekce_turu: str
+    user_id: str = "anonymous"
 
-@app.post("/api/dilekce/pdf")
-async def create_dilekce_pdf(request: DilekcePDFRequest):
+async def enhance_dilekce_data(request: DilekcePDFRequest, report=None) -> dict:
     """
-    Dilekçe PDF'i oluşturur ve döner. AI ile tüm alanları zenginleştirir.
+    Dilekçe alanlarını AI ile zenginleştirir; AI yoksa/başarısızsa girilen veriler kullanılır.
     """
-    try:
-        enhanced_data = {
-            'mahkeme': request.mahkeme,
-            'davaci_adi': request.davaci_adi,
-            'davaci_tc': request.davaci_tc,
-            'davaci_adres': request.davaci_adres,
-            'davali_adi': request.davali_adi,
-            'davali_adres': request.davali_adres,
-            'dilekce_turu': request.dilekce_turu,
-            'konu': request.konu,
-            'aciklamalar': request.aciklamalar,
-            'talepler': request.talepler
-        }
-
-        # AI ile zenginleştirme (Varsa)
-        if client:
-            try:
-                # Tek bir prompt ile tüm alanları zenginleştir - GERÇEK DİLEKÇE ÖRNEKLERİ İLE
-                enhance_prompt = f"""Sen deneyimli bir Türk Hukuku avukatısın. Aşağıdaki taslağı, Türk Mahkemeleri'nde kabul gören resmi dilekçe formatına çevir.
-
-ÖRNEK DİLEKÇE FORMATI (TAKİP ET):
----
-KONU: [Kısa ve net başlık, örn: "Kıdem ve İhbar Tazminatı ile Fazla Mesai Ücreti Alacağı Talebi"]
-
-AÇIKLAMALAR:
-
-1. Müvekkil, davalı şirkette [tarih] - [tarih] tarihleri arasında [pozisyon] olarak çalışmıştır.
-
-2. [Olayların kronolojik ve detaylı anlatımı, maddeler halinde]
-
-3. 4857 sayılı İş Kanunu'nun [ilgili madde] hükmü gereğince...
-
-4. Yargıtay [Daire] Dairesi'nin [tarih] tarihli [esas/karar no] sayılı kararında da belirtildiği üzere...
+    enhanced_data = {
+        'mahkeme': request.mahkeme,
+        'davaci_adi': request.davaci_adi,
+        'davaci_tc': request.davaci_tc,
+        'davaci_adres': request.davaci_adres,
+        'davali_adi': request.davali_adi,
+        'davali_adres': request.davali_adres,
+        'dilekce_turu': request.dilekce_turu,
+        'konu': request.konu,
+        'aciklamalar': request.aciklamalar,
+        'talepler': request.talepler
+    }
 
-SONUÇ VE İSTEM:
+    # AI ile zenginleştirme (Varsa)
+    if client:
+        if report:
+            report(20, "Dilekçe alanları AI ile hazırlanıyor")
+        try:
+            # Alanlar ayrı prompt'larla paralel zenginleştirilir; biten alanlar kullanılır
+            ai_fields, ai_errors = await generate_dilekce_fields(
+                DILEKCE_FIELDS, enhanced_data, request.user_id
+            )
+            enhanced_data.update(ai_fields)
+            if ai_errors:
+                logger.info("AI zenginleştirme kısmi: %s", ai_errors)
+                
+        except Exception as e:
+            logger.warning("AI zenginleştirme hatası: %s", e)
+            # Hata olursa orijinal verileri kullan (zaten enhanced_data'da var)
+    
+    return enhanced_data
 
-Yukarıda açıklanan nedenlerle;
 
-1. Davanın KABULÜNE,
-2. [Miktar] TL tutarındaki [alacak türü] alacağının yasal faiziyle birlikte davalıdan tahsiline,
-3. Yargılama giderleri ve vekalet ücretinin davalı tarafa yükletilmesine,
+async def build_dilekce_pdf(request: DilekcePDFRequest, report=None):
+    """
+    Dilekçe alanlarını AI ile zenginleştirip PDF'i geçici dosyaya üretir.
 
-karar verilmesini saygılarımla arz ve talep ederim.
----
+    Returns:
+        (geçici PDF yolu, dosya adı) - dosyayı silmek çağırana aittir
+    """
+    enhanced_data = await enhance_dilekce_data(request, report)
 
-ŞİMDİ BU TASLAĞA UYGULA:
-- Dilekçe Türü: {request.dilekce_turu}
-- Kullanıcının Konusu: {request.konu}
-- Kullanıcının Açıklamaları: {request.aciklamalar}
-- Kullanıcının Talepleri: {request.talepler}
+    # PDF oluştur (render süreç havuzunda, event loop'u bloklamadan)
+    if report:
+        report(70, "PDF oluşturuluyor")
+    path = await render_service.render_to_file("dilekce_pdf", enhanced_data)
+    return path, f"dilekce_{request.dilekce_turu}.pdf"
 
-ÖNEMLİ KURALLAR:
-1. Açıklamalar en az 4-5 madde olsun, detaylı ve kronolojik.
-2. İlgili kanun maddelerini ve Yargıtay kararlarını referans göster.
-3. Talepler en az 3-4 madde olsun, net ve ölçülebilir.
-4. Profesyonel ve resmi dil kullan.
-5. Eksik veya belirsiz kısımları "[...]" ile işaretle ki kullanıcı doldurabilsin.
 
-YANIT FORMATI (SADECE JSON):
-{{
-    "konu": "Yeni konu başlığı",
-    "aciklamalar": "1. Birinci madde...\\n\\n2. İkinci madde...\\n\\n3. Üçüncü madde...",
-    "talepler": "Yukarıda açıklanan nedenlerle;\\n\\n1. ...\\n2. ...\\n3. ..."
-}}"""
-                
-                ai_response = generate_ai_content(enhance_prompt)
-                
-                import json
-                import re
-                json_match = re.search(r'\{[\s\S]*\}', ai_response)
-                
-                if json_match:
-                    ai_data = json.loads(json_match.group())
-                    enhanced_data['konu'] = ai_data.get('konu', request.konu)
-                    enhanced_data['aciklamalar'] = ai_data.get('aciklamalar', request.aciklamalar)
-                    enhanced_data['talepler'] = ai_data.get('talepler', request.talepler)
-                    
-            except Exception as e:
-                print(f"AI zenginleştirme hatası: {e}")
-                # Hata olursa orijinal verileri kullan (zaten enhanced_data'da var)
-        
-        # PDF oluştur
-        pdf_bytes = pdf_generator.create_dilekce(enhanced_data)
+@app.post("/api/dilekce/pdf")
+async def create_dilekce_pdf(request: DilekcePDFRequest):
+    """
+    Dilekçe PDF'i oluşturur ve döner. AI ile tüm alanları zenginleştirir.
+    PDF geçici dosyaya üretilir ve parça parça akıtılır; API sürecinde tam kopya tutulmaz.
+    """
+    try:
+        path, filename = await build_dilekce_pdf(request)
         
         from urllib.parse import quote
-        filename = f"dilekce_{request.dilekce_turu}.pdf"
         encoded_filename = quote(filename)
         
-        return Response(
-            content=pdf_bytes,
+        return StreamingResponse(
+            iter_file(path),
             media_type="application/pdf",
             headers={
-                "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"
-            }
+                "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}",
+                "Content-Length": str(os.path.getsize(path))
+            },
+            background=BackgroundTask(remove_file, path)
         )
         
+    except RenderBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        logger.exception("PDF oluşturma hatası")
         raise HTTPException(status_code=500, detail=f"PDF oluşturulurken hata: {str(e)}")
 
+# ============== TOPLU DİLEKÇE ==============
+
+from services.bulk_render import stream_zip, safe_filename
+
+MAX_BULK_PARTIES = 500
+BULK_TEXT_FIELDS = ("konu", "aciklamalar", "talepler")
+BULK_PARTY_FIELDS = ("davaci_adi", "davaci_tc", "davaci_adres", "davali_adi", "davali_adres")
+
+
+class DilekceTarafi(BaseModel):
+    davaci_adi: Optional[str] = None
+    davaci_tc: Optional[str] = None
+    davaci_adres: Optional[str] = None
+    davali_adi: Optional[str] = None
+    davali_adres: Optional[str] = None
+    dosya_adi: Optional[str] = None
+
+
+class DilekceBulkRequest(BaseModel):
+    sablon: DilekcePDFRequest
+    taraflar: List[DilekceTarafi]
+    formatlar: List[str] = ["pdf"]
+
+
+def apply_party(template_data: dict, party: DilekceTarafi) -> dict:
+    """
+    Şablon verisine tarafı uygular. Metin alanlarındaki {davaci_adi}, {davali_adi} vb.
+    yer tutucular tarafın bilgileriyle değiştirilir.
+    """
+    data = dict(template_data)
+    for field, value in party.model_dump(exclude={"dosya_adi"}, exclude_none=True).items():
+        data[field] = value
+    for field in BULK_TEXT_FIELDS:
+        text = data.get(field) or ""
+        for key in BULK_PARTY_FIELDS:
+            text = text.replace("{" + key + "}", data.get(key) or "")
+        data[field] = text
+    return data
+
+
+async def enhance_bulk_template(sablon: DilekcePDFRequest) -> dict:
+    """
+    Toplu şablonu AI ile bir kez zenginleştirir; taraf değerleri yerine sonra apply_party ile yer tutucular.
+
+    AI'ya taraf alanları yer tutucu olarak verilir, böylece ürettiği metin de yer tutucu içerir.
+    Zenginleştirme taslaktaki bir yer tutucuyu düşürdüyse o alan için taslak metni kullanılır.
+    """
+    placeholders = {key: "{" + key + "}" for key in BULK_PARTY_FIELDS}
+    data = await enhance_dilekce_data(sablon.model_copy(update=placeholders))
+    # Tarafı belirtilmeyen alanlar şablondaki değerle doldurulur
+    data.update({key: getattr(sablon, key) for key in BULK_PARTY_FIELDS})
+
+    for field in BULK_TEXT_FIELDS:
+        draft = getattr(sablon, field) or ""
+        missing = set(PLACEHOLDER_PATTERN.findall(draft)) - set(PLACEHOLDER_PATTERN.findall(data.get(field) or ""))
+        if missing:
+            logger.info("Toplu şablon: AI metni yer tutucuları düşürdü, taslak kullanılıyor",
+                        extra={"field": field, "missing": sorted(missing)})
+            data[field] = draft
+    return data
+
+
+@app.post("/api/dilekce/bulk")
+async def create_dilekce_bulk(request: DilekceBulkRequest):
+    """
+    Aynı dilekçeyi çok sayıda taraf için üretir ve ZIP olarak akıtır.
+    AI zenginleştirme şablon başına bir kez, yer tutucular korunarak yapılır; taraf bilgileri
+    zenginleştirmeden sonra yerleştirilir. PDF/UDF'ler render havuzunda paralel üretilir.
+    """
+    if not request.taraflar:
+        raise HTTPException(status_code=400, detail="En az bir taraf gerekli")
+    if len(request.taraflar) > MAX_BULK_PARTIES:
+        raise HTTPException(status_code=400, detail=f"Tek istekte en fazla {MAX_BULK_PARTIES} taraf işlenebilir")
+    formats = [f for f in dict.fromkeys(request.formatlar) if f in ("pdf", "udf", "uyap")]
+    if not formats:
+        raise HTTPException(status_code=400, detail="formatlar 'pdf', 'udf' ve/veya 'uyap' içermeli")
+
+    template_data = await enhance_bulk_template(request.sablon)
+
+    entries = []
+    for i, party in enumerate(request.taraflar, 1):
+        data = apply_party(template_data, party)
+        base = f"{i:03d}_" + safe_filename(party.dosya_adi or data.get("davali_adi") or data.get("davaci_adi"))
+        if "pdf" in formats:
+            entries.append((f"{base}.pdf", "dilekce_pdf", data))
+        if "udf" in formats:
+            entries.append((f"{base}.udf", "udf", data))
+        if "uyap" in formats:
+            entries.append((f"{base}_uyap.udf", "udf_uyap", data))
+
+    # Her taraf için üretilen dilekçe (format sayısından bağımsız) bir kez sayılır
+    await increment_user_stat(request.sablon.user_id, "petition_count", len(request.taraflar))
+
+    from urllib.parse import quote
+    encoded_filename = quote(f"dilekceler_{request.sablon.dilekce_turu}.zip")
+    return StreamingResponse(
+        stream_zip(entries, render_service),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}"}
+    )
+
 @app.post("/api/dilekce/generate")
 async def generate_dilekce_with_ai(request: DilekceRequest):
     """
@@ -921,7 +1661,7 @@ Dilekçe şu formatta olmalı:
 
 Türk Hukuku standartlarına tam uygun olmalıdır."""
 
-        response_text = generate_ai_content(prompt)
+        response_text = await generate_ai_content(prompt, Priority.GENERATION, request.user_id)
         
         return {
             "status": "success",
@@ -931,97 +1671,128 @@ Türk Hukuku standartlarına tam uygun olmalıdır."""
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Dilekçe oluşturulurken hata: {str(e)}")
 
-@app.post("/api/sozlesme-analiz")
-async def analyze_document(file: UploadFile = File(...), user_id: str = Form("anonymous")):
+# ============== ASENKRON İŞLER ==============
+# Uzun analiz ve PDF üretimi bağlantıyı açık tutmadan kuyrukta çalışır:
+# POST iş kimliği döner, ilerleme GET /api/jobs/{id} veya SSE ile izlenir
+from services.job_queue import job_queue, JobQueueFull, JobPermanentError, JobStatus
+
+
+@app.on_event("startup")
+async def start_job_queue():
+    job_queue.start()
+
+
+@app.on_event("shutdown")
+async def stop_job_queue():
+    await job_queue.stop()
+
+
+def _submit_job(kind: str, handler, user_id: str, on_finish=None):
+    try:
+        job = job_queue.submit(kind, handler, user_id, on_finish)
+    except JobQueueFull as e:
+        if on_finish:
+            on_finish()
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+    return {"job_id": job.id, "status": job.status}
+
+
+def _as_job_error(e: HTTPException) -> Exception:
+    """İstemci hataları tekrar denenmez; sunucu hataları denenir."""
+    if e.status_code < 500:
+        return JobPermanentError(e.detail)
+    return RuntimeError(e.detail)
+
+
+@app.post("/api/jobs/sozlesme-analiz")
+async def submit_sozlesme_job(file: UploadFile = File(...), user_id: str = Form("anonymous")):
     """
-    Belge analizi (PDF, UDF, TXT).
+    Sözleşme analizini kuyruğa alır. Dosya istek içinde bir kez, özgün uzantısıyla geçici dosyaya yazılır.
     """
     if not client:
         raise HTTPException(status_code=500, detail="Gemini API yapılandırılmamış")
 
-    try:
-        content = await file.read()
-        filename = file.filename.lower()
-        extracted_text = ""
+    path, digest = await pdf_extractor.spool_upload(file, suffix=upload_suffix(file.filename))
+    filename = file.filename
 
-        if filename.endswith(".udf"):
-            # UDF Parse (using global udf_generator instance)
-            try:
-                data = udf_generator.parse_udf(content)
-                # Convert dict to text summary
-                extracted_text = f"BELGE TÜRÜ: {data.get('dilekce_turu', 'Bilinmiyor')}\n"
-                extracted_text += f"MAHKEME: {data.get('mahkeme', '')}\n"
-                extracted_text += f"KONU: {data.get('konu', '')}\n"
-                extracted_text += f"AÇIKLAMALAR:\n{data.get('aciklamalar', '')}\n"
-                extracted_text += f"TALEPLER:\n{data.get('talepler', '')}\n"
-                
-                # Ekler varsa ekle
-                if data.get('ekler'):
-                     extracted_text += f"EKLER: {', '.join(data.get('ekler'))}\n"
-                     
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"UDF okunamadı: {str(e)}")
+    async def run(job, report):
+        report(20, "Belge analiz ediliyor")
+        try:
+            job.result = await run_sozlesme_analysis(path, digest, filename, user_id)
+        except HTTPException as e:
+            raise _as_job_error(e)
 
-        elif filename.endswith(".pdf"):
-            # PDF Parse
-            try:
-                pdf_file = io.BytesIO(content)
-                reader = PdfReader(pdf_file)
-                for page in reader.pages:
-                    extracted_text += page.extract_text() + "\n"
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"PDF okunamadı: {str(e)}")
-        
-        elif filename.endswith(".txt"):
-            extracted_text = content.decode("utf-8")
-            
-        else:
-             # Try generic text decode for others
-             try:
-                 extracted_text = content.decode("utf-8")
-             except:
-                 raise HTTPException(status_code=400, detail="Desteklenmeyen dosya formatı.")
+    def cleanup():
+        remove_file(path)
 
-        if not extracted_text.strip():
-             raise HTTPException(status_code=400, detail="Dosya içeriği okunamadı veya boş.")
+    return _submit_job("sozlesme-analiz", run, user_id, cleanup)
 
-        # AI Analysis
-        prompt = f"""Sen uzman bir Türk Hukuku avukatısın. Aşağıdaki metni/belgeyi bir avukat titizliğiyle incele ve analiz et.
-        
-        BELGE İÇERİĞİ:
-        {extracted_text[:25000]}
-        
-        YAPILACAK DETAYLI ANALİZ (FORMAT):
-        
-        <h3>1. Belgenin Niteliği</h3>
-        <p>Bu belgenin hukuki türü nedir? (Dava dilekçesi, Kira sözleşmesi, İhtarname, Mahkeme kararı vb.)</p>
-        
-        <h3>2. Özet</h3>
-        <p>Belgenin içeriğini 2-3 cümle ile özetle.</p>
-        
-        <h3>3. Hukuki Risk Analizi & Tespitler</h3>
-        <ul>
-            <li><strong>Lehe Hususlar:</strong> Belgede tarafın lehine olan güçlü yönler.</li>
-            <li><strong>Aleyhe Hususlar/Riskler:</strong> Belgede tarafı zora sokabilecek, riskli maddeler veya ifadeler.</li>
-            <li><strong>Eksiklikler:</strong> Hukuken olması gereken ama eksik bırakılmış unsurlar.</li>
-        </ul>
-        
-        <h3>4. Öneriler ve Aksiyon Planı</h3>
-        <p>Kullanıcı bu belgeyle ilgili ne yapmalı? (İmzalamalı mı, itiraz mı etmeli, noterden ihtar mı çekmeli?)</p>
-        
-        Lütfen yanıtı temiz bir HTML formatında ver (div container olmadan, sadece iç etiketler)."""
 
-        analysis = generate_ai_content(prompt)
-        
-        return {"analiz": analysis}
+@app.post("/api/jobs/dilekce/pdf")
+async def submit_dilekce_pdf_job(request: DilekcePDFRequest):
+    """
+    Dilekçe PDF üretimini kuyruğa alır. Sonuç /api/jobs/{job_id}/result adresinden indirilir.
+    """
+    async def run(job, report):
+        path, filename = await build_dilekce_pdf(request, report)
+        job.file_path, job.file_name, job.media_type = path, filename, "application/pdf"
 
-    except HTTPException as he:
-        raise he
-    except Exception as e:
-        print(f"Analiz hatası: {e}")
-        import traceback
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=f"Analiz sistemi hatası: {str(e)}")
+    return _submit_job("dilekce-pdf", run, request.user_id)
+
+
+async def _get_job_or_404(job_id: str):
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="İş bulunamadı veya süresi doldu")
+    return job
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    İş durumunu döner (status, progress, message, JSON sonuç).
+    """
+    return (await _get_job_or_404(job_id)).to_dict()
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    İş durumunu Server-Sent Events olarak akıtır; iş bitince akış kapanır.
+    """
+    job = await _get_job_or_404(job_id)
+    return StreamingResponse(
+        job_queue.events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/api/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    """
+    Biten işin sonucunu döner: dosya üreten işler için dosya, diğerleri için JSON.
+    """
+    job = await _get_job_or_404(job_id)
+    if not job.done:
+        raise HTTPException(status_code=409, detail=f"İş henüz tamamlanmadı ({job.status})")
+    if job.status == JobStatus.FAILED:
+        raise HTTPException(status_code=500, detail=job.error)
+
+    if job.file_path is not None:
+        # Sonuç dosyası iş süresi dolana kadar tekrar indirilebilir; silmek iş kuyruğuna aittir
+        if not os.path.exists(job.file_path):
+            raise HTTPException(status_code=404, detail="İş sonucu bulunamadı veya süresi doldu")
+        from urllib.parse import quote
+        return StreamingResponse(
+            iter_file(job.file_path),
+            media_type=job.media_type or "application/octet-stream",
+            headers={
+                "Content-Disposition": f"attachment; filename*=UTF-8''{quote(job.file_name or 'sonuc')}",
+                "Content-Length": str(os.path.getsize(job.file_path))
+            }
+        )
+    return job.result
 
 
 # Serve Frontend Files (Moved to bottom)
@@ -0,0 +1,130 @@
+"""
+JustLaw Analysis Cache
+Yüklenen belgeler için içerik adresli önbellek: SHA-256(dosya) -> çıkarılmış metin ve analiz
+"""
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+import hashlib
+import threading
+import time
+
+
+def content_digest(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("text", "text_budget", "analyses", "expires_at", "size")
+
+    def __init__(self):
+        self.text: Optional[str] = None
+        self.text_budget: Optional[int] = None
+        self.analyses: Dict[Tuple[str, str], str] = {}
+        self.expires_at = 0.0
+        self.size = 0
+
+
+class AnalysisCache:
+    """
+    İçerik özeti ile adreslenen, boyut ve TTL sınırlı LRU önbellek.
+
+    - Metin: özet başına bir kez saklanır; aynı dosya tekrar yüklendiğinde PDF hiç açılmaz
+    - Analiz: (özet, kullanıcı, prompt sürümü) başına saklanır; prompt değişince eski analizler
+      kullanılmaz, bir kullanıcının analizi başka kullanıcıya dönmez (aynı belgeyi kimin yüklediği sızmaz).
+      Anonim istekler için analiz saklanmaz
+    """
+
+    def __init__(self, max_chars: int = 32 * 1024 * 1024, ttl: float = 24 * 3600):
+        self.max_chars = max_chars
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = {"text": 0, "analysis": 0}
+        self.misses = {"text": 0, "analysis": 0}
+
+    def get_text(self, digest: str, char_budget: Optional[int] = None) -> Optional[str]:
+        """Çıkarılmış metni döner; saklanan metin istenen bütçeden kısa kesilmişse None."""
+        with self._lock:
+            entry = self._get(digest)
+            if entry is None or entry.text is None or not self._covers(entry.text_budget, char_budget):
+                self.misses["text"] += 1
+                return None
+            self.hits["text"] += 1
+            return entry.text
+
+    def put_text(self, digest: str, text: str, char_budget: Optional[int] = None):
+        with self._lock:
+            entry = self._get(digest) or self._new(digest)
+            entry.text = text
+            entry.text_budget = char_budget
+            self._resize(entry)
+
+    def get_analysis(self, digest: str, prompt_version: str, user_id: Optional[str]) -> Optional[str]:
+        if not user_id or user_id == "anonymous":
+            return None
+        with self._lock:
+            entry = self._get(digest)
+            analysis = entry.analyses.get((user_id, prompt_version)) if entry else None
+            if analysis is None:
+                self.misses["analysis"] += 1
+            else:
+                self.hits["analysis"] += 1
+            return analysis
+
+    def put_analysis(self, digest: str, prompt_version: str, user_id: Optional[str], analysis: str):
+        if not user_id or user_id == "anonymous":
+            return
+        with self._lock:
+            entry = self._get(digest) or self._new(digest)
+            entry.analyses[(user_id, prompt_version)] = analysis
+            self._resize(entry)
+
+    def metrics(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "size_chars": self._size,
+            "max_chars": self.max_chars,
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+        }
+
+    # ============== INTERNAL ==============
+
+    @staticmethod
+    def _covers(stored_budget: Optional[int], wanted_budget: Optional[int]) -> bool:
+        if stored_budget is None:
+            return True
+        return wanted_budget is not None and stored_budget >= wanted_budget
+
+    def _get(self, digest: str) -> Optional[_Entry]:
+        entry = self._entries.get(digest)
+        if entry is None:
+            return None
+        if entry.expires_at < time.monotonic():
+            self._drop(digest)
+            return None
+        self._entries.move_to_end(digest)
+        return entry
+
+    def _new(self, digest: str) -> _Entry:
+        entry = _Entry()
+        entry.expires_at = time.monotonic() + self.ttl
+        self._entries[digest] = entry
+        return entry
+
+    def _resize(self, entry: _Entry):
+        new_size = len(entry.text or "") + sum(len(a) for a in entry.analyses.values())
+        self._size += new_size - entry.size
+        entry.size = new_size
+        while self._size > self.max_chars and len(self._entries) > 1:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+
+    def _drop(self, digest: str):
+        entry = self._entries.pop(digest)
+        self._size -= entry.size
+
+
+# Singleton instance
+analysis_cache = AnalysisCache()
@@ -0,0 +1,119 @@
+"""
+JustLaw Bulk Render
+Tek şablondan çok sayıda dilekçe (PDF/UDF) üretip ZIP arşivi olarak parça parça akıtır
+"""
+from collections import deque
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import re
+import zipfile
+
+from services.render_service import RenderService, remove_file
+
+logger = logging.getLogger(__name__)
+
+
+_TR_ASCII = str.maketrans("çğıöşüÇĞİÖŞÜ", "cgiosuCGIOSU")
+
+
+def safe_filename(text: str, fallback: str = "dilekce", max_length: int = 60) -> str:
+    """Arşiv içi dosya adı: Türkçe karakterler sadeleştirilir, geri kalanı alt çizgi olur."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", (text or "").translate(_TR_ASCII)).strip("_")
+    return slug[:max_length] or fallback
+
+
+class _ChunkSink:
+    """ZipFile için sadece yazılabilir hedef; yazılanlar drain() ile parça olarak alınır."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+# (arşivdeki ad, render türü, belge verisi)
+BulkEntry = Tuple[str, str, Dict]
+
+_SUFFIX = {"dilekce_pdf": ".pdf", "sozlesme_pdf": ".pdf", "udf": ".udf", "udf_uyap": ".udf"}
+
+# Zaten sıkıştırılmış çıktılar (PDF akışları, ZIP tabanlı UDF) arşive olduğu gibi eklenir
+_STORED_KINDS = {"dilekce_pdf", "sozlesme_pdf", "udf_uyap"}
+
+
+async def stream_zip(
+    entries: List[BulkEntry],
+    renderer: RenderService,
+    window: Optional[int] = None
+) -> AsyncIterator[bytes]:
+    """
+    Belgeleri render havuzunda paralel üretir ve sırayla ZIP'e ekleyerek akıtır.
+
+    - Aynı anda en fazla window belge üretimde/diskte bekler (bellek ve disk sınırlı kalır)
+    - Her belge arşive eklenince geçici dosyası silinir ve biriken baytlar gönderilir
+    - Üretilemeyen belgeler HATALAR.txt'de listelenir, arşivin geri kalanı etkilenmez
+    """
+    window = window or max(2, min(renderer.max_pending, max(1, renderer.workers) * 2))
+    sink = _ChunkSink()
+    archive = zipfile.ZipFile(sink, mode="w")
+    pending: deque = deque()
+    queue = iter(entries)
+    errors: List[str] = []
+
+    def schedule():
+        entry = next(queue, None)
+        if entry is not None:
+            name, kind, data = entry
+            task = asyncio.ensure_future(renderer.render_to_file(kind, data, _SUFFIX.get(kind, ".bin")))
+            pending.append((name, kind, task))
+
+    try:
+        for _ in range(window):
+            schedule()
+
+        while pending:
+            name, kind, task = pending.popleft()
+            try:
+                path = await task
+            except Exception as e:
+                logger.warning("Bulk render error (%s): %s", name, e)
+                errors.append(f"{name}: {e}")
+                schedule()
+                continue
+            schedule()
+
+            try:
+                compression = zipfile.ZIP_STORED if kind in _STORED_KINDS else zipfile.ZIP_DEFLATED
+                await asyncio.to_thread(archive.write, path, name, compression)
+            finally:
+                remove_file(path)
+
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+
+        if errors:
+            archive.writestr("HATALAR.txt", "\n".join(errors))
+        archive.close()
+        yield sink.drain()
+
+    finally:
+        # İstemci bağlantıyı kestiyse bekleyen üretimleri iptal et; biten olursa dosyası silinir
+        for _name, _kind, task in pending:
+            task.cancel()
+            task.add_done_callback(_discard_rendered)
+
+
+def _discard_rendered(task: asyncio.Future):
+    if not task.cancelled() and task.exception() is None:
+        remove_file(task.result())
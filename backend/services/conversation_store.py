@@ -0,0 +1,205 @@
+"""
+JustLaw Conversation Store
+/api/chat için sunucu tarafı konuşma hafızası: LRU önbellek + kalıcı katman + kayan pencere özetleme
+"""
+from collections import OrderedDict
+from typing import Awaitable, Callable, List, Optional, Set
+import asyncio
+import logging
+import time
+
+from services.instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Kaba token tahmini (Türkçe metinde ~4 karakter/token)."""
+    return len(text) // 4 + 1
+
+
+class Conversation:
+    """Tek bir konuşmanın durumu: eski turların özeti + son turlar."""
+
+    def __init__(self, conversation_id: str, user_id: str, summary: str = "", turns: Optional[List[dict]] = None):
+        self.conversation_id = conversation_id
+        self.user_id = user_id
+        self.summary = summary
+        self.turns: List[dict] = turns or []
+        self.updated = time.time()
+        self.lock = asyncio.Lock()
+
+    def to_dict(self) -> dict:
+        return {
+            "user_id": self.user_id,
+            "summary": self.summary,
+            "turns": self.turns,
+            "updated": self.updated,
+        }
+
+    @classmethod
+    def from_dict(cls, conversation_id: str, data: dict) -> "Conversation":
+        conv = cls(conversation_id, data.get("user_id", ""), data.get("summary", ""), data.get("turns", []))
+        conv.updated = data.get("updated", time.time())
+        return conv
+
+
+class FirestoreConversationBackend:
+    """Kalıcı katman: Firestore conversations/{conversation_id} dokümanı."""
+
+    def __init__(self, collection: str = "conversations"):
+        self.collection = collection
+
+    def _ref(self, conversation_id: str):
+        from firebase_admin import firestore
+        return firestore.client().collection(self.collection).document(conversation_id)
+
+    @timed("firestore", "conversations.get")
+    def load(self, conversation_id: str) -> Optional[dict]:
+        snapshot = self._ref(conversation_id).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+    @timed("firestore", "conversations.set")
+    def save(self, conversation_id: str, data: dict):
+        self._ref(conversation_id).set(data)
+
+
+# Özetleyici imzası: (önceki özet, özetlenecek turlar) -> yeni özet
+Summarizer = Callable[[str, List[dict]], Awaitable[str]]
+
+
+class ConversationStore:
+    """
+    Konuşmaları bellekte LRU olarak tutar, isteğe bağlı kalıcı katmana (load/save) yazar.
+
+    Prompt'a sadece token bütçesine sığan son turlar ve eski turların artımlı özeti girer;
+    böylece konuşma uzadıkça prompt boyutu sabit kalır.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        max_conversations: int = 1000,
+        window_tokens: int = 2000,
+        max_turn_chars: int = 6000
+    ):
+        self.backend = backend
+        self.max_conversations = max_conversations
+        self.window_tokens = window_tokens
+        self.max_turn_chars = max_turn_chars
+        self._cache: "OrderedDict[str, Conversation]" = OrderedDict()
+        # Arka plan özetleme task'ları; referans tutulmazsa GC tarafından yarıda toplanabilir
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def get(self, conversation_id: str, user_id: str) -> Optional[Conversation]:
+        """
+        Konuşmayı döner; yoksa None. Başka kullanıcıya aitse PermissionError fırlatır.
+        """
+        conv = self._cache.get(conversation_id)
+        if conv is None and self.backend:
+            try:
+                data = await asyncio.to_thread(self.backend.load, conversation_id)
+            except Exception as e:
+                logger.warning("Conversation load error: %s", e)
+                data = None
+            if data:
+                conv = Conversation.from_dict(conversation_id, data)
+                self._put(conv)
+
+        if conv is None:
+            return None
+        if conv.user_id != user_id:
+            raise PermissionError("Konuşma bu kullanıcıya ait değil")
+        self._cache.move_to_end(conversation_id)
+        return conv
+
+    def create(self, conversation_id: str, user_id: str) -> Conversation:
+        conv = Conversation(conversation_id, user_id)
+        self._put(conv)
+        return conv
+
+    def build_context(self, conv: Conversation) -> str:
+        """Özet + pencereye sığan son turlardan prompt bağlamı üretir."""
+        recent = []
+        budget = self.window_tokens
+        for turn in reversed(conv.turns):
+            cost = estimate_tokens(turn["text"])
+            if cost > budget:
+                break
+            recent.append(turn)
+            budget -= cost
+        recent.reverse()
+
+        parts = []
+        if conv.summary:
+            parts.append(f"ÖNCEKİ KONUŞMA ÖZETİ:\n{conv.summary}")
+        if recent:
+            lines = [
+                f"{'Kullanıcı' if t['role'] == 'user' else 'Asistan'}: {t['text']}"
+                for t in recent
+            ]
+            parts.append("SON MESAJLAR:\n" + "\n\n".join(lines))
+        return "\n\n".join(parts)
+
+    async def append(self, conv: Conversation, user_text: str, assistant_text: str):
+        """Yeni turu ekler ve kalıcı katmana yazar."""
+        conv.turns.append({"role": "user", "text": user_text[:self.max_turn_chars]})
+        conv.turns.append({"role": "assistant", "text": assistant_text[:self.max_turn_chars]})
+        conv.updated = time.time()
+        await self._save(conv)
+
+    def schedule_compact(self, conv: Conversation, summarizer: Summarizer) -> asyncio.Task:
+        """compact'ı arka planda başlatır; task bitene kadar store tarafından tutulur."""
+        task = asyncio.create_task(self.compact(conv, summarizer))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def stop(self):
+        """Süren özetlemelerin bitmesini bekler (kapanışta)."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def compact(self, conv: Conversation, summarizer: Summarizer):
+        """
+        Pencereden taşan en eski turları özete katlar. Yanıt döndükten sonra arka planda çağrılır.
+        """
+        async with conv.lock:
+            overflow = self._overflow_count(conv)
+            if overflow == 0:
+                return
+            old_turns = conv.turns[:overflow]
+            try:
+                conv.summary = (await summarizer(conv.summary, old_turns)).strip()
+            except Exception as e:
+                logger.warning("Conversation summarize error: %s", e)
+                return
+            # Özetleme sırasında eklenen turlar korunur
+            conv.turns = conv.turns[overflow:]
+            await self._save(conv)
+
+    # ============== INTERNAL ==============
+
+    def _overflow_count(self, conv: Conversation) -> int:
+        """Token penceresine sığmayan en eski tur sayısı (kullanıcı/asistan çiftleri halinde)."""
+        total = sum(estimate_tokens(t["text"]) for t in conv.turns)
+        count = 0
+        while total > self.window_tokens and count < len(conv.turns) - 2:
+            total -= estimate_tokens(conv.turns[count]["text"])
+            total -= estimate_tokens(conv.turns[count + 1]["text"])
+            count += 2
+        return count
+
+    def _put(self, conv: Conversation):
+        self._cache[conv.conversation_id] = conv
+        self._cache.move_to_end(conv.conversation_id)
+        while len(self._cache) > self.max_conversations:
+            self._cache.popitem(last=False)
+
+    async def _save(self, conv: Conversation):
+        if not self.backend:
+            return
+        try:
+            await asyncio.to_thread(self.backend.save, conv.conversation_id, conv.to_dict())
+        except Exception as e:
+            logger.warning("Conversation save error: %s", e)
@@ -0,0 +1,248 @@
+"""
+JustLaw Document Analysis
+Prompt penceresinden uzun belgeler için map-reduce analiz: madde/sayfa bazlı bölme,
+parça başına eşzamanlı risk analizi ve tek Markdown raporda birleştirme.
+Aynı kullanıcının revize ettiği belgelerde sadece değişen parçalar yeniden analiz edilir.
+"""
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import hashlib
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+
+# Madde başlıkları: "MADDE 5", "Madde 5 -", "5. MADDE"
+CLAUSE_PATTERN = re.compile(r"(?m)^(?=\s*(?:MADDE|Madde)\s+\d+|\s*\d+\s*[.)]\s*(?:MADDE|Madde)\b)")
+
+class DocumentAnalysisError(Exception):
+    """Hiçbir parça analiz edilemedi; boş bulgularla rapor üretilmez."""
+
+
+# Üretici imzası: prompt -> yanıt metni (main.py'deki zamanlayıcılı generate_ai_content)
+Generate = Callable[[str], Awaitable[str]]
+
+
+def split_clauses(text: str) -> List[str]:
+    """Metni madde başlıklarından böler; madde bulunamazsa sayfa/paragraf sınırlarını kullanır."""
+    parts = [p.strip() for p in CLAUSE_PATTERN.split(text) if p.strip()]
+    if len(parts) > 1:
+        return parts
+    parts = [p.strip() for p in re.split(r"\n\s*\n", text) if p.strip()]
+    return parts if len(parts) > 1 else [text.strip()]
+
+
+def pack_chunks(clauses: List[str], max_chars: int) -> List[str]:
+    """Ardışık maddeleri max_chars sınırına kadar aynı parçada toplar; tek başına büyük maddeyi böler."""
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+
+    for clause in clauses:
+        while len(clause) > max_chars:
+            cut = clause.rfind("\n", 0, max_chars)
+            cut = cut if cut > max_chars // 2 else max_chars
+            pieces = clause[:cut], clause[cut:].lstrip()
+            if current:
+                chunks.append("\n\n".join(current))
+                current, size = [], 0
+            chunks.append(pieces[0])
+            clause = pieces[1]
+
+        if size + len(clause) > max_chars and current:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(clause)
+        size += len(clause) + 2
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def clause_hash(text: str) -> str:
+    """Boşluk/büyük-küçük harf farklarına duyarsız madde özeti."""
+    return hashlib.sha1(" ".join(text.split()).lower().encode("utf-8")).hexdigest()
+
+
+def pack_chunks_stable(clauses: List[str], max_chars: int, boundary_mod: int = 16) -> List[str]:
+    """
+    İçerik tanımlı parçalama: parça sınırı madde içeriğinin özetine göre seçilir.
+
+    pack_chunks'tan farkı, bir maddedeki düzenlemenin sadece o maddenin parçasını
+    (ve en kötü ihtimalle bir sonraki içerik sınırına kadarını) değiştirmesidir;
+    böylece önceki sürümün parça bulguları tekrar kullanılabilir.
+    """
+    min_chars = max_chars // 4
+    pieces: List[str] = []
+    for clause in clauses:
+        pieces.extend(pack_chunks([clause], max_chars) if len(clause) > max_chars else [clause])
+
+    chunks: List[str] = []
+    current: List[str] = []
+    size = 0
+    for piece in pieces:
+        if size + len(piece) > max_chars and current:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece) + 2
+        if size >= min_chars and int(clause_hash(piece)[:8], 16) % boundary_mod == 0:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+class _AnalyzedVersion:
+    __slots__ = ("clauses", "findings")
+
+    def __init__(self, clauses: frozenset, findings: Dict[str, str]):
+        self.clauses = clauses
+        self.findings = findings
+
+
+class ClauseHistory:
+    """
+    Kullanıcı başına son analiz edilen belge sürümleri: madde özetleri kümesi (parmak izi)
+    ve parça özeti -> bulgu eşlemesi.
+
+    Yeni yükleme, madde kümesi en çok örtüşen (Jaccard >= min_similarity) önceki sürümle eşlenir.
+    """
+
+    def __init__(self, versions_per_user: int = 5, max_users: int = 1000, min_similarity: float = 0.5):
+        self.versions_per_user = versions_per_user
+        self.max_users = max_users
+        self.min_similarity = min_similarity
+        self._users: "OrderedDict[str, List[_AnalyzedVersion]]" = OrderedDict()
+
+    def match(self, user_id: str, clauses: frozenset) -> Optional[_AnalyzedVersion]:
+        best, best_score = None, self.min_similarity
+        for version in self._users.get(user_id, []):
+            union = len(clauses | version.clauses)
+            score = len(clauses & version.clauses) / union if union else 0.0
+            if score >= best_score:
+                best, best_score = version, score
+        return best
+
+    def save(self, user_id: str, clauses: frozenset, findings: Dict[str, str],
+             replaces: Optional[_AnalyzedVersion] = None):
+        versions = self._users.pop(user_id, [])
+        if replaces is not None:
+            versions = [v for v in versions if v is not replaces]
+        versions.append(_AnalyzedVersion(clauses, findings))
+        self._users[user_id] = versions[-self.versions_per_user:]
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+
+class MapReduceAnalyzer:
+    """
+    Uzun belgeyi parçalara ayırır, her parçayı eşzamanlılık sınırı altında analiz eder
+    ve bulguları verilen Markdown rapor formatında birleştirir.
+    """
+
+    def __init__(self, chunk_chars: int = 12000, concurrency: int = 4, history: Optional[ClauseHistory] = None):
+        self.chunk_chars = chunk_chars
+        self.concurrency = concurrency
+        self.history = history
+        self.stats = {"chunks_analyzed": 0, "chunks_reused": 0}
+
+    def split(self, text: str) -> List[str]:
+        return pack_chunks(split_clauses(text), self.chunk_chars)
+
+    @staticmethod
+    def map_prompt(chunk: str) -> str:
+        # Prompt sadece parça içeriğine bağlıdır (sıra/toplam yok): bulgular parça özetiyle tekrar kullanılır
+        return f"""Sen uzman bir Türk Hukuku avukatısın. Aşağıda uzun bir belgenin bir bölümü var.
+Sadece bu bölümü incele ve kısa notlar halinde yaz:
+
+LEHE: tarafın lehine olan hükümler (madde numarasıyla)
+RİSK: tarafı zora sokabilecek riskli maddeler veya ifadeler (madde numarasıyla, neden riskli olduğu)
+EKSİK: bu bölümde hukuken olması gerekip eksik bırakılan unsurlar
+ÖZET: bölümün 1-2 cümlelik özeti
+
+Bulgu yoksa ilgili satıra "-" yaz. HTML kullanma.
+
+BÖLÜM METNİ:
+{chunk}"""
+
+    @staticmethod
+    def reduce_prompt(findings: List[str], report_format: str) -> str:
+        notes = "\n\n".join(
+            f"--- BÖLÜM {i} ---\n{finding}" for i, finding in enumerate(findings, 1)
+        )
+        return f"""Sen uzman bir Türk Hukuku avukatısın. Uzun bir belge bölüm bölüm incelendi; bölüm notları aşağıda.
+Bu notları birleştirerek belgenin TAMAMI için tek bir analiz raporu yaz. Tekrarlayan bulguları birleştir,
+riskleri önem sırasına koy ve madde numaralarını koru.
+
+BÖLÜM NOTLARI:
+{notes}
+
+{report_format}"""
+
+    async def analyze(
+        self,
+        text: str,
+        generate: Generate,
+        report_format: str,
+        user_id: Optional[str] = None
+    ) -> str:
+        """
+        user_id verilirse önceki sürümle eşleşen parçaların bulguları tekrar kullanılır;
+        LLM'e sadece eklenen/değişen parçalar gider.
+
+        Raises:
+            DocumentAnalysisError: hiçbir parça için bulgu elde edilemezse
+        """
+        incremental = self.history is not None and user_id and user_id != "anonymous"
+        if incremental:
+            clauses = split_clauses(text)
+            chunks = pack_chunks_stable(clauses, self.chunk_chars)
+            fingerprint = frozenset(clause_hash(c) for c in clauses)
+            previous = self.history.match(user_id, fingerprint)
+        else:
+            chunks = self.split(text)
+            previous = None
+
+        keys = [clause_hash(chunk) for chunk in chunks]
+        known = previous.findings if previous else {}
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def analyze_chunk(i: int, chunk: str) -> Optional[str]:
+            async with semaphore:
+                try:
+                    return (await generate(self.map_prompt(chunk))).strip()
+                except Exception as e:
+                    logger.warning("Map-reduce chunk %s error: %s", i, e)
+                    return None
+
+        pending = [i for i, key in enumerate(keys) if key not in known]
+        fresh = await asyncio.gather(
+            *[analyze_chunk(i + 1, chunks[i]) for i in pending]
+        )
+        self.stats["chunks_analyzed"] += len(pending)
+        self.stats["chunks_reused"] += len(chunks) - len(pending)
+        if previous:
+            logger.info("Artımlı analiz: %s/%s parça yeniden analiz edildi", len(pending), len(chunks))
+
+        findings = {key: known[key] for key in keys if key in known}
+        findings.update({keys[i]: result for i, result in zip(pending, fresh) if result})
+        if not findings:
+            # Tüm map çağrıları düştü (ör. Gemini kesintisi): boş notlardan rapor üretilip önbelleğe yazılmasın
+            raise DocumentAnalysisError(f"Belgenin {len(chunks)} bölümünün hiçbiri analiz edilemedi")
+
+        if incremental:
+            self.history.save(user_id, fingerprint, findings, replaces=previous)
+
+        return await generate(self.reduce_prompt(
+            [findings.get(key, "Bu bölüm analiz edilemedi.") for key in keys], report_format
+        ))
+
+
+# Singleton instance
+document_analyzer = MapReduceAnalyzer(history=ClauseHistory())
@@ -0,0 +1,274 @@
+"""
+JustLaw Instrumentation
+Route ve bağımlılık (llm, scraper, pdf_extract, pdf_render, udf, firestore) gecikme histogramları,
+sayaçlar ve anlık göstergeler; /metrics uç noktası Prometheus metin formatında sunar.
+Ek bağımlılık gerektirmez; kayıtlar thread-safe'tir (to_thread ve render thread'lerinden de çağrılır).
+"""
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import asyncio
+import functools
+import threading
+import time
+
+# Saniye; LLM ve scraper çağrıları için üst kovalar geniş tutuldu
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+class _Metric:
+    TYPE = ""
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> LabelValues:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.TYPE}"]
+
+
+class Counter(_Metric):
+    TYPE = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    TYPE = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class _HistogramSeries:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(_Metric):
+    TYPE = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, _HistogramSeries] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        # Kova sayıları kümülatif değil tutulur, render sırasında toplanır (observe O(log n))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _HistogramSeries(len(self.buckets) + 1)
+            series.counts[index] += 1
+            series.sum += value
+            series.count += 1
+
+    def snapshot(self, **labels) -> Optional[dict]:
+        series = self._series.get(self._key(labels))
+        if series is None:
+            return None
+        return {"count": series.count, "sum": series.sum}
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(s.counts), s.sum, s.count) for key, s in self._series.items()]
+        lines = self.header()
+        names = self.labelnames + ("le",)
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+# Collector: her /metrics isteğinde çağrılır ve anlık değerleri (ör. servislerin metrics() dict'leri)
+# (ad, tip, açıklama, [(etiketler, değer)]) listesi olarak döner
+Sample = Tuple[str, str, str, List[Tuple[dict, float]]]
+Collector = Callable[[], Iterable[Sample]]
+
+
+class MetricsRegistry:
+    def __init__(self, prefix: str = "justlaw"):
+        self.prefix = prefix
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Collector] = []
+
+    def counter(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(f"{self.prefix}_{name}", help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(f"{self.prefix}_{name}", help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Tuple[str, ...] = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(f"{self.prefix}_{name}", help, labelnames, buckets))
+
+    def add_collector(self, collector: Collector):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                lines.append(f"# collector error: {_escape(e)}")
+                continue
+            for name, kind, help, values in samples:
+                full_name = f"{self.prefix}_{name}"
+                lines.append(f"# HELP {full_name} {help}")
+                lines.append(f"# TYPE {full_name} {kind}")
+                for labels, value in values:
+                    if value is None:
+                        continue
+                    lines.append(f"{full_name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metrik zaten kayıtlı: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+# Singleton instance
+metrics_registry = MetricsRegistry()
+
+HTTP_REQUEST_SECONDS = metrics_registry.histogram(
+    "http_request_duration_seconds", "HTTP istek süresi (route şablonu bazında)", ("method", "route", "status")
+)
+HTTP_IN_FLIGHT = metrics_registry.gauge("http_requests_in_flight", "İşlenmekte olan HTTP istekleri")
+DEPENDENCY_SECONDS = metrics_registry.histogram(
+    "dependency_duration_seconds", "Bağımlılık çağrı süresi", ("dependency", "target", "outcome")
+)
+DEPENDENCY_IN_FLIGHT = metrics_registry.gauge(
+    "dependency_in_flight", "Süren bağımlılık çağrıları", ("dependency",)
+)
+LLM_TOKENS = metrics_registry.counter(
+    "llm_tokens_total", "Gemini token kullanımı (usage_metadata)", ("source", "kind")
+)
+
+
+class Timer:
+    """
+    Bir bağımlılık çağrısının süresini ölçer; context manager (with/async with) veya dekoratör
+    olarak kullanılır. Çağrı sürerken dependency_in_flight artar; hata olursa outcome="error".
+    """
+
+    __slots__ = ("dependency", "target", "_start")
+
+    def __init__(self, dependency: str, target: str = ""):
+        self.dependency = dependency
+        self.target = target
+        self._start = 0.0
+
+    def __enter__(self) -> "Timer":
+        DEPENDENCY_IN_FLIGHT.inc(dependency=self.dependency)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self._start
+        DEPENDENCY_IN_FLIGHT.dec(dependency=self.dependency)
+        DEPENDENCY_SECONDS.observe(
+            elapsed, dependency=self.dependency, target=self.target, outcome="ok" if exc_type is None else "error"
+        )
+        return False
+
+    async def __aenter__(self) -> "Timer":
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+    def __call__(self, fn):
+        # Dekoratör: her çağrı kendi Timer'ını kullanır (eşzamanlı çağrılar birbirini ezmez)
+        dependency, target = self.dependency, self.target
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with Timer(dependency, target):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with Timer(dependency, target):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+def timed(dependency: str, target: str = "") -> Timer:
+    """Örn. `with timed("firestore", "users.load"):` veya `@timed("scraper", "yargitay")`."""
+    return Timer(dependency, target)
+
+
+def record_llm_usage(response, source: str):
+    """Gemini yanıtındaki usage_metadata token sayılarını sayaçlara ekler."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for kind, attr in (
+        ("prompt", "prompt_token_count"),
+        ("output", "candidates_token_count"),
+        ("cached", "cached_content_token_count"),
+    ):
+        count = getattr(usage, attr, None)
+        if count:
+            LLM_TOKENS.inc(count, source=source, kind=kind)
@@ -0,0 +1,372 @@
+"""
+JustLaw Job Queue
+Uzun süren işler (sözleşme analizi, dilekçe PDF) için süreç içi asenkron iş kuyruğu:
+POST iş kimliği döner, iş sınırlı worker havuzunda çalışır, durum GET/SSE ile izlenir
+"""
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+    TERMINAL = (SUCCEEDED, FAILED)
+
+
+class JobQueueFull(Exception):
+    """Kuyruk dolu; istemci daha sonra tekrar denemeli."""
+
+
+class JobPermanentError(Exception):
+    """Tekrar denenmemesi gereken hata (ör. geçersiz dosya)."""
+
+
+class Job:
+    """Tek bir işin durumu ve sonucu."""
+
+    def __init__(self, kind: str, user_id: str = "anonymous", job_id: Optional[str] = None):
+        self.id = job_id or uuid.uuid4().hex
+        self.kind = kind
+        self.user_id = user_id
+        self.status = JobStatus.QUEUED
+        self.progress = 0
+        self.message = "Sırada"
+        self.attempts = 0
+        self.error: Optional[str] = None
+        self.result: Optional[dict] = None
+        # Dosya sonucu (ör. PDF) geçici dosyada tutulur; iş süresi dolunca silinir
+        self.file_path: Optional[str] = None
+        self.file_name: Optional[str] = None
+        self.media_type: Optional[str] = None
+        self.created = time.time()
+        self.updated = self.created
+        self._changed: Optional[asyncio.Event] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in JobStatus.TERMINAL
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "attempts": self.attempts,
+            "error": self.error,
+            "result": self.result,
+            "has_file": self.file_path is not None,
+            "created": self.created,
+            "updated": self.updated,
+        }
+
+    def touch(self):
+        """Durum değişikliğini SSE dinleyicilerine bildirir."""
+        self.updated = time.time()
+        if self._changed is not None:
+            self._changed.set()
+            self._changed = None
+
+    async def wait_changed(self, timeout: float) -> bool:
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+class SQLiteJobBackend:
+    """Kalıcı katman: biten işlerin durumu/sonucu yeniden başlatmadan sonra da okunabilir."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT, user_id TEXT, status TEXT, progress INTEGER, message TEXT,
+                attempts INTEGER, error TEXT, result TEXT,
+                file_path TEXT, file_name TEXT, media_type TEXT,
+                created REAL, updated REAL
+            )"""
+        )
+        self._conn.commit()
+
+    def save(self, job: Job):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO jobs VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
+                (
+                    job.id, job.kind, job.user_id, job.status, job.progress, job.message,
+                    job.attempts, job.error, json.dumps(job.result) if job.result is not None else None,
+                    job.file_path, job.file_name, job.media_type, job.created, job.updated,
+                )
+            )
+            self._conn.commit()
+
+    def load(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT kind, user_id, status, progress, message, attempts, error, result,"
+                " file_path, file_name, media_type, created, updated FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        job = Job(row[0], row[1], job_id)
+        (job.status, job.progress, job.message, job.attempts, job.error) = row[2:7]
+        job.result = json.loads(row[7]) if row[7] else None
+        job.file_path, job.file_name, job.media_type = row[8], row[9], row[10]
+        job.created, job.updated = row[11], row[12]
+        return job
+
+    def delete_before(self, cutoff: float) -> List[str]:
+        """Süresi dolan işleri siler; silinen işlerin sonuç dosyalarının yollarını döner."""
+        with self._lock:
+            paths = [row[0] for row in self._conn.execute(
+                "SELECT file_path FROM jobs WHERE updated < ? AND file_path IS NOT NULL", (cutoff,)
+            )]
+            self._conn.execute("DELETE FROM jobs WHERE updated < ?", (cutoff,))
+            self._conn.commit()
+        return paths
+
+    def fail_unfinished(self, message: str):
+        """Önceki süreçte yarım kalan işler devam ettirilemez; başarısız işaretlenir."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE status IN (?, ?)",
+                (JobStatus.FAILED, message, time.time(), JobStatus.QUEUED, JobStatus.RUNNING)
+            )
+            self._conn.commit()
+
+
+# İş fonksiyonu imzası: (job, report) -> None; sonucu job.result / job.file_path'e yazar
+Reporter = Callable[[int, str], None]
+JobHandler = Callable[[Job, Reporter], Awaitable[None]]
+
+
+class JobQueue:
+    """
+    Sınırlı kuyruk + sabit sayıda worker.
+
+    - Kuyruk doluysa submit JobQueueFull fırlatır (istek zaman aşımı yerine hızlı ret)
+    - Geçici hatalar üstel bekleme ile max_retries kez tekrar denenir
+    - Biten işler result_ttl sonunda bellekten ve kalıcı katmandan, sonuç dosyalarıyla birlikte silinir
+    """
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_queued: int = 50,
+        max_retries: int = 2,
+        retry_delay: float = 2.0,
+        result_ttl: float = 3600,
+        backend=None
+    ):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.result_ttl = result_ttl
+        self.backend = backend
+        self._jobs: Dict[str, Job] = {}
+        self._handlers: Dict[str, tuple] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self.stats = {"submitted": 0, "succeeded": 0, "failed": 0, "retried": 0, "rejected": 0}
+
+    # ============== PUBLIC API ==============
+
+    def submit(self, kind: str, handler: JobHandler, user_id: str = "anonymous",
+               on_finish: Optional[Callable[[], Any]] = None) -> Job:
+        """İşi kuyruğa ekler. on_finish iş tamamen bitince (başarılı/başarısız) bir kez çağrılır."""
+        if self._queue is None:
+            raise RuntimeError("JobQueue başlatılmadı")
+        if self._queue.full():
+            self.stats["rejected"] += 1
+            raise JobQueueFull("İş kuyruğu dolu, lütfen biraz sonra tekrar deneyin")
+
+        job = Job(kind, user_id)
+        self._jobs[job.id] = job
+        self._handlers[job.id] = (handler, on_finish)
+        self._queue.put_nowait(job.id)
+        self.stats["submitted"] += 1
+        self._persist(job)
+        return job
+
+    async def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None and self.backend:
+            try:
+                job = await asyncio.to_thread(self.backend.load, job_id)
+            except Exception as e:
+                logger.warning("Job load error: %s", e)
+        return job
+
+    async def events(self, job: Job, keepalive: float = 15.0):
+        """SSE akışı: her durum değişikliğinde bir olay, iş bitince kapanır."""
+        last = None
+        while True:
+            state = job.to_dict()
+            if state != last:
+                yield f"data: {json.dumps(state, ensure_ascii=False)}\n\n"
+                last = state
+            if job.done:
+                return
+            if not await job.wait_changed(keepalive):
+                yield ": keepalive\n\n"
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queued)
+        if self.backend:
+            try:
+                self.backend.fail_unfinished("Sunucu yeniden başlatıldı, işi tekrar gönderin")
+            except Exception as e:
+                logger.warning("Job backend init error: %s", e)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._expire_loop()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if not self.backend:
+            # Kalıcı katman yoksa işler süreçle birlikte kaybolur; sonuç dosyaları da bırakılmaz
+            for job in self._jobs.values():
+                _remove_file(job.file_path)
+
+    def metrics(self) -> dict:
+        by_status: Dict[str, int] = {}
+        for job in self._jobs.values():
+            by_status[job.status] = by_status.get(job.status, 0) + 1
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queued": self.max_queued,
+            "jobs": by_status,
+        }
+
+    # ============== INTERNAL ==============
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.warning("Job worker error: %s", e)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        job = self._jobs.get(job_id)
+        handler, on_finish = self._handlers.pop(job_id, (None, None))
+        if job is None or handler is None:
+            return
+
+        def report(progress: int, message: str):
+            job.progress = max(job.progress, min(99, progress))
+            job.message = message
+            job.touch()
+
+        try:
+            while True:
+                job.attempts += 1
+                job.status = JobStatus.RUNNING
+                job.error = None
+                report(5, "İşleniyor")
+                try:
+                    await handler(job, report)
+                    job.status = JobStatus.SUCCEEDED
+                    job.progress = 100
+                    job.message = "Tamamlandı"
+                    self.stats["succeeded"] += 1
+                    break
+                except Exception as e:
+                    job.error = str(e) or e.__class__.__name__
+                    if isinstance(e, JobPermanentError) or job.attempts > self.max_retries:
+                        job.status = JobStatus.FAILED
+                        job.message = "Başarısız"
+                        self.stats["failed"] += 1
+                        logger.warning("Job %s (%s) failed: %s", job.id, job.kind, job.error)
+                        break
+                    self.stats["retried"] += 1
+                    job.message = f"Tekrar denenecek ({job.attempts}/{self.max_retries})"
+                    job.touch()
+                    await asyncio.sleep(self.retry_delay * (2 ** (job.attempts - 1)))
+        finally:
+            job.touch()
+            await asyncio.to_thread(self._persist, job)
+            if on_finish:
+                try:
+                    on_finish()
+                except Exception as e:
+                    logger.warning("Job cleanup error: %s", e)
+
+    async def _expire_loop(self, interval: float = 60.0):
+        while True:
+            await asyncio.sleep(interval)
+            await self._expire(time.time() - self.result_ttl)
+
+    async def _expire(self, cutoff: float):
+        paths = []
+        for job_id in [j.id for j in self._jobs.values() if j.done and j.updated < cutoff]:
+            paths.append(self._jobs.pop(job_id).file_path)
+        if self.backend:
+            try:
+                paths += await asyncio.to_thread(self.backend.delete_before, cutoff)
+            except Exception as e:
+                logger.warning("Job expire error: %s", e)
+        for path in set(paths):
+            _remove_file(path)
+
+    def _persist(self, job: Job):
+        if not self.backend:
+            return
+        try:
+            self.backend.save(job)
+        except Exception as e:
+            logger.warning("Job save error: %s", e)
+
+
+def _remove_file(path: Optional[str]):
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _create_job_queue() -> JobQueue:
+    db_path = os.getenv("JOB_DB_PATH")
+    return JobQueue(
+        workers=int(os.getenv("JOB_WORKERS", "2")),
+        max_queued=int(os.getenv("JOB_MAX_QUEUED", "50")),
+        result_ttl=float(os.getenv("JOB_RESULT_TTL", "3600")),
+        backend=SQLiteJobBackend(db_path) if db_path else None
+    )
+
+
+# Singleton instance
+job_queue = _create_job_queue()
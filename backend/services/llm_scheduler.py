@@ -0,0 +1,315 @@
+"""
+JustLaw LLM Scheduler
+Gemini çağrıları için öncelikli, adil ve sınırlı eşzamanlı kuyruk
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from enum import IntEnum
+from typing import Callable, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import os
+import time
+
+from services.instrumentation import timed
+
+
+class Priority(IntEnum):
+    """Küçük değer önce çalışır."""
+    INTERACTIVE = 0   # /api/chat, arama
+    GENERATION = 1    # dilekçe alanları, PDF/UDF zenginleştirme, belge analizi
+    BACKGROUND = 2    # ön ısıtma vb.
+
+
+# Çağrı yerinde öncelik verilmezse kullanılacak değer (ör. arka plan görevleri için)
+current_priority: ContextVar[Optional[Priority]] = ContextVar("llm_priority", default=None)
+
+
+@contextmanager
+def llm_priority(priority: Priority):
+    """Bu blok içindeki tüm LLM çağrılarını verilen öncelikle çalıştırır."""
+    token = current_priority.set(priority)
+    try:
+        yield
+    finally:
+        current_priority.reset(token)
+
+
+class LLMSchedulerError(Exception):
+    """Zamanlayıcı çağrıyı kabul etmedi."""
+
+
+class LLMRateLimited(LLMSchedulerError):
+    """Kullanıcının token kovası boş ve bekleme süresi deadline'ı aşıyor."""
+
+
+class LLMDeadlineExceeded(LLMSchedulerError):
+    """Çağrı deadline dolmadan çalışmaya başlayamadı."""
+
+
+class TokenBucket:
+    """Kullanıcı başına istek kotası (rate token/saniye, capacity kadar patlama)."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, cost: float = 1) -> float:
+        """Token ayırır ve token hazır olana kadar beklenecek süreyi döner."""
+        self._refill()
+        self.tokens -= cost
+        return max(0.0, -self.tokens / self.rate)
+
+    def refund(self, cost: float = 1):
+        self.tokens = min(self.capacity, self.tokens + cost)
+
+    def configure(self, rate: float, capacity: float):
+        """Limitleri değiştirir (ör. plan değişimi); biriken token yeni kapasiteyi aşamaz."""
+        self._refill()
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = min(self.tokens, capacity)
+
+    @property
+    def is_full(self) -> bool:
+        self._refill()
+        return self.tokens >= self.capacity
+
+
+class _Waiter:
+    __slots__ = ("priority", "future")
+
+    def __init__(self, priority: Priority, future: asyncio.Future):
+        self.priority = priority
+        self.future = future
+
+
+class LLMScheduler:
+    """
+    Süreç içi LLM istek zamanlayıcısı.
+
+    - max_concurrency: aynı anda çalışan en fazla Gemini çağrısı
+    - reserved_interactive: sadece INTERACTIVE işlerin kullanabileceği slot sayısı
+    - kullanıcı başına token kovası (user_id yoksa kota uygulanmaz)
+    - her öncelik sınıfı için kuyrukta bekleme deadline'ı
+    """
+
+    DEFAULT_TIMEOUTS = {
+        Priority.INTERACTIVE: 30.0,
+        Priority.GENERATION: 60.0,
+        Priority.BACKGROUND: 300.0,
+    }
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        reserved_interactive: int = 1,
+        user_rate_per_minute: float = 30,
+        user_burst: float = 10,
+        max_tracked_users: int = 10000,
+        user_limits: Optional[Callable[[str], Optional[Tuple[float, float]]]] = None
+    ):
+        self.max_concurrency = max_concurrency
+        self.reserved_interactive = min(reserved_interactive, max_concurrency - 1)
+        self.user_rate = user_rate_per_minute / 60.0
+        self.user_burst = user_burst
+        self.max_tracked_users = max_tracked_users
+        # user_id -> (dakikalık hız, burst); None dönerse varsayılan kova kullanılır
+        self.user_limits = user_limits
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._queue: List[tuple] = []
+        self._seq = itertools.count()
+        self._in_flight = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self.completed = 0
+        self.failed = 0
+        self.rejected = {"rate_limited": 0, "deadline": 0}
+
+    # ============== PUBLIC API ==============
+
+    async def run(
+        self,
+        fn: Callable,
+        *args,
+        priority: Optional[Priority] = None,
+        user_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+        **kwargs
+    ):
+        """fn(*args, **kwargs) çağrısını sıraya alır ve bir thread'de çalıştırır."""
+        if priority is None:
+            priority = current_priority.get()
+            if priority is None:
+                priority = Priority.INTERACTIVE
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.DEFAULT_TIMEOUTS[priority])
+
+        bucket = await self._take_user_token(user_id, deadline)
+        try:
+            await self._acquire_slot(priority, deadline)
+        except BaseException:
+            # Çağrı hiç çalışmadı (deadline/iptal): ayrılan token kullanıcıya geri verilir
+            if bucket is not None:
+                bucket.refund()
+            raise
+        try:
+            # Süre sadece Gemini çağrısını kapsar; kuyrukta bekleme hariç
+            call = timed("llm", getattr(fn, "__name__", "call"))(fn)
+            future = self._executor_for().submit(copy_context().run, call, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        # Slot thread'deki çağrı bitince bırakılır: bekleyen istek iptal edilse (wait_for, istemci
+        # bağlantıyı kapattı) bile süren Gemini çağrısı eşzamanlılık sınırına sayılmaya devam eder
+        future.add_done_callback(lambda f: self._call_finished(loop, f))
+        return await asyncio.wrap_future(future)
+
+    def metrics(self) -> dict:
+        depth = {p.name.lower(): 0 for p in Priority}
+        for priority, _seq, waiter in self._queue:
+            if not waiter.future.done():
+                depth[Priority(priority).name.lower()] += 1
+        return {
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": depth,
+            "queued_total": sum(depth.values()),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": dict(self.rejected),
+            "tracked_users": len(self._buckets),
+        }
+
+    # ============== INTERNAL ==============
+
+    async def _take_user_token(self, user_id: Optional[str], deadline: float) -> Optional[TokenBucket]:
+        """Kullanıcı kovasından bir token ayırır (gerekirse bekler); token'ın ayrıldığı kovayı döner."""
+        if not user_id or user_id == "anonymous":
+            return None
+        bucket = self._user_bucket(user_id)
+        wait = bucket.reserve()
+        if wait <= 0:
+            return bucket
+        if asyncio.get_running_loop().time() + wait > deadline:
+            bucket.refund()
+            self.rejected["rate_limited"] += 1
+            raise LLMRateLimited(f"Kullanıcı kotası aşıldı, {wait:.0f} sn sonra tekrar deneyin")
+        try:
+            await asyncio.sleep(wait)
+        except asyncio.CancelledError:
+            bucket.refund()
+            raise
+        return bucket
+
+    def _user_bucket(self, user_id: str) -> TokenBucket:
+        """
+        Kullanıcının kovasını döner. Limitler her çağrıda tekrar okunur: profil arka planda
+        yüklenince veya plan süresi dolunca kova yeni limitlere uyarlanır.
+        """
+        rate, capacity = self._limits_for(user_id)
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            self._prune_buckets()
+            bucket = self._buckets[user_id] = TokenBucket(rate, capacity)
+        elif (bucket.rate, bucket.capacity) != (rate, capacity):
+            bucket.configure(rate, capacity)
+        return bucket
+
+    def _limits_for(self, user_id: str) -> Tuple[float, float]:
+        limits = self.user_limits(user_id) if self.user_limits else None
+        if limits is None:
+            return self.user_rate, self.user_burst
+        rate_per_minute, burst = limits
+        return rate_per_minute / 60.0, burst
+
+    def forget_user(self, user_id: str):
+        """Kullanıcının kovasını siler; sonraki istekte (ör. plan değişince) yeni limitlerle oluşturulur."""
+        self._buckets.pop(user_id, None)
+
+    def _prune_buckets(self):
+        if len(self._buckets) < self.max_tracked_users:
+            return
+        for user_id in [u for u, b in self._buckets.items() if b.is_full]:
+            del self._buckets[user_id]
+
+    async def _acquire_slot(self, priority: Priority, deadline: float):
+        loop = asyncio.get_running_loop()
+        waiter = _Waiter(priority, loop.create_future())
+        heapq.heappush(self._queue, (int(priority), next(self._seq), waiter))
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(waiter.future, timeout=max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self.rejected["deadline"] += 1
+            raise LLMDeadlineExceeded(f"{priority.name} istek kuyrukta zaman aşımına uğradı")
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+    def _abandon(self, waiter: _Waiter):
+        # Slot tam zaman aşımı anında verilmiş olabilir; boşa gitmesin
+        if waiter.future.done() and not waiter.future.cancelled():
+            self._release()
+        else:
+            waiter.future.cancel()
+            self._dispatch()
+
+    def _limit_for(self, priority: int) -> int:
+        if priority == Priority.INTERACTIVE:
+            return self.max_concurrency
+        return self.max_concurrency - self.reserved_interactive
+
+    def _dispatch(self):
+        while self._queue:
+            priority, _seq, waiter = self._queue[0]
+            if waiter.future.done():
+                heapq.heappop(self._queue)
+                continue
+            if self._in_flight >= self._limit_for(priority):
+                break
+            heapq.heappop(self._queue)
+            self._in_flight += 1
+            waiter.future.set_result(True)
+
+    def _release(self):
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _executor_for(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="llm")
+        return self._executor
+
+    def _call_finished(self, loop: asyncio.AbstractEventLoop, future: Future):
+        """Thread future'ının done-callback'i (çağrıyı yapan thread'de çalışır)."""
+        def finish():
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+            else:
+                self.completed += 1
+            self._release()
+
+        try:
+            loop.call_soon_threadsafe(finish)
+        except RuntimeError:
+            # Event loop kapanmış (süreç kapanıyor)
+            pass
+
+
+# Singleton instance
+llm_scheduler = LLMScheduler(
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+    user_rate_per_minute=float(os.getenv("LLM_USER_RATE_PER_MINUTE", "30")),
+    user_burst=float(os.getenv("LLM_USER_BURST", "10"))
+)
@@ -0,0 +1,244 @@
+"""
+JustLaw Payment Queue
+Ödeme bildirimleri (Shopier callback) için idempotent, kalıcı arka plan kuyruğu:
+sipariş numarası bir kez kaydedilir, bildirim hemen onaylanır, abonelik güncellemesi
+worker'da tekrar denemeli uygulanır
+"""
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentStatus:
+    PENDING = "pending"
+    APPLIED = "applied"
+    FAILED = "failed"
+
+
+class PaymentPermanentError(Exception):
+    """Tekrar denense de başarılı olmayacak hata (ör. geçersiz plan, kullanıcı yok)."""
+
+
+class SQLiteIdempotencyStore:
+    """
+    Sipariş numarası -> işlem durumu. Yeniden başlatmadan sonra da tekrar eden bildirimler
+    tanınır ve yarım kalan (pending) siparişler kuyruğa geri alınır.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Bağlantıyı ilk kullanımda açar (import sırasında dosya oluşturulmaz); kilit altında çağrılır."""
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS payments (
+                    order_id TEXT PRIMARY KEY,
+                    payload TEXT, status TEXT, attempts INTEGER, error TEXT,
+                    created REAL, updated REAL
+                )"""
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def claim(self, order_id: str, payload: dict) -> bool:
+        """
+        Siparişi kaydeder. Sipariş pending veya applied ise False (tekrar eden bildirim).
+        Daha önce failed olan sipariş yeni bildirimle yeniden açılır (deneme sayısı sıfırlanır);
+        böylece Shopier'in tekrar gönderdiği bildirim geçici bir kesintiden sonra uygulanabilir.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._connect().execute(
+                """INSERT INTO payments VALUES (?,?,?,?,?,?,?)
+                ON CONFLICT(order_id) DO UPDATE SET
+                    payload = excluded.payload, status = excluded.status, attempts = 0,
+                    error = NULL, updated = excluded.updated
+                WHERE payments.status = ?""",
+                (order_id, json.dumps(payload), PaymentStatus.PENDING, 0, None, now, now, PaymentStatus.FAILED)
+            )
+            self._conn.commit()
+            return cursor.rowcount == 1
+
+    def mark(self, order_id: str, status: str, attempts: int, error: Optional[str] = None):
+        with self._lock:
+            self._connect().execute(
+                "UPDATE payments SET status = ?, attempts = ?, error = ?, updated = ? WHERE order_id = ?",
+                (status, attempts, error, time.time(), order_id)
+            )
+            self._conn.commit()
+
+    def pending(self) -> List[Tuple[str, dict, int]]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT order_id, payload, attempts FROM payments WHERE status = ? ORDER BY created",
+                (PaymentStatus.PENDING,)
+            ).fetchall()
+        return [(order_id, json.loads(payload), attempts) for order_id, payload, attempts in rows]
+
+    def get(self, order_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT status, attempts, error, created, updated FROM payments WHERE order_id = ?",
+                (order_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("status", "attempts", "error", "created", "updated"), row))
+
+    def delete_before(self, cutoff: float):
+        """Tamamlanmış eski kayıtları siler (pending kayıtlar korunur)."""
+        with self._lock:
+            self._connect().execute(
+                "DELETE FROM payments WHERE updated < ? AND status != ?", (cutoff, PaymentStatus.PENDING)
+            )
+            self._conn.commit()
+
+
+# Ödeme işleyici: (sipariş no, bildirim verisi) -> None; hata fırlatırsa tekrar denenir
+PaymentHandler = Callable[[str, dict], Awaitable[None]]
+
+
+class PaymentQueue:
+    """
+    Ödeme bildirimlerini istek dışında işler.
+
+    - submit: sipariş numarasını idempotency store'a yazar; pending/applied siparişin tekrar eden
+      bildirimi iş üretmez, failed sipariş yeniden kuyruğa alınır
+    - worker: handler'ı çalıştırır; hata olursa retry_delay * 2^n sonra tekrar dener
+      (bekleme kuyruğu bloklamaz), max_retries sonunda 'failed' işaretler
+    - start: önceki süreçte yarım kalan siparişleri kuyruğa geri alır
+    """
+
+    def __init__(
+        self,
+        store: SQLiteIdempotencyStore,
+        workers: int = 1,
+        max_retries: int = 5,
+        retry_delay: float = 2.0,
+        retention: float = 90 * 24 * 3600
+    ):
+        self.store = store
+        self.workers = workers
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.retention = retention
+        self.handler: Optional[PaymentHandler] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._timers: Set[asyncio.TimerHandle] = set()
+        self.stats = {
+            "received": 0, "duplicates": 0, "invalid_signature": 0, "applied": 0, "retries": 0, "failed": 0
+        }
+
+    def record_invalid_signature(self):
+        """İmzası doğrulanamayan bildirim (kuyruğa alınmaz, sadece sayılır)."""
+        self.stats["invalid_signature"] += 1
+
+    async def submit(self, order_id: str, payload: dict) -> bool:
+        """Bildirimi kaydeder ve kuyruğa alır; daha önce alınmışsa False döner."""
+        self.stats["received"] += 1
+        if not await asyncio.to_thread(self.store.claim, order_id, payload):
+            self.stats["duplicates"] += 1
+            return False
+        self._queue.put_nowait((order_id, payload, 0))
+        return True
+
+    def start(self, handler: PaymentHandler):
+        if self._tasks:
+            return
+        self.handler = handler
+        self._queue = asyncio.Queue()
+        self.store.delete_before(time.time() - self.retention)
+        for order_id, payload, attempts in self.store.pending():
+            logger.info("Payment queue: yarım kalan sipariş kuyruğa alındı (%s)", order_id)
+            self._queue.put_nowait((order_id, payload, attempts))
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Worker'ları durdurur; işlenmemiş siparişler store'da pending kalır, sonraki açılışta işlenir."""
+        for timer in self._timers:
+            timer.cancel()
+        self._timers.clear()
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def metrics(self) -> dict:
+        return {
+            **self.stats,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "retry_scheduled": len(self._timers),
+        }
+
+    # ============== INTERNAL ==============
+
+    async def _worker(self):
+        while True:
+            order_id, payload, attempts = await self._queue.get()
+            attempts += 1
+            try:
+                await self.handler(order_id, payload)
+            except PaymentPermanentError as e:
+                logger.warning("Payment %s uygulanamadı: %s", order_id, e)
+                self.stats["failed"] += 1
+                await asyncio.to_thread(self.store.mark, order_id, PaymentStatus.FAILED, attempts, str(e))
+                continue
+            except Exception as e:
+                if attempts > self.max_retries:
+                    logger.warning("Payment %s %s denemede uygulanamadı: %s", order_id, attempts, e)
+                    self.stats["failed"] += 1
+                    await asyncio.to_thread(self.store.mark, order_id, PaymentStatus.FAILED, attempts, str(e))
+                else:
+                    self.stats["retries"] += 1
+                    await asyncio.to_thread(self.store.mark, order_id, PaymentStatus.PENDING, attempts, str(e))
+                    self._schedule_retry(order_id, payload, attempts)
+                continue
+
+            self.stats["applied"] += 1
+            await asyncio.to_thread(self.store.mark, order_id, PaymentStatus.APPLIED, attempts)
+
+    def _schedule_retry(self, order_id: str, payload: dict, attempts: int):
+        delay = self.retry_delay * (2 ** (attempts - 1))
+
+        def requeue():
+            self._timers.discard(timer)
+            self._queue.put_nowait((order_id, payload, attempts))
+
+        timer = asyncio.get_running_loop().call_later(delay, requeue)
+        self._timers.add(timer)
+
+
+# PAYMENT_DB_PATH verilmezse kayıt backend/data altında tutulur (çalışma dizininden bağımsız)
+DEFAULT_PAYMENT_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "payments.sqlite3"
+)
+
+
+def _create_payment_queue() -> PaymentQueue:
+    return PaymentQueue(
+        store=SQLiteIdempotencyStore(os.getenv("PAYMENT_DB_PATH", DEFAULT_PAYMENT_DB_PATH)),
+        max_retries=int(os.getenv("PAYMENT_MAX_RETRIES", "5"))
+    )
+
+
+# Singleton instance
+payment_queue = _create_payment_queue()
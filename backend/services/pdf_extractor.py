@@ -0,0 +1,316 @@
+"""
+JustLaw PDF Text Extractor
+Yüklenen PDF'leri geçici dosyaya aktarıp sayfaları süreç havuzunda paralel çıkarır.
+Taranmış (sadece görüntü) PDF'ler birkaç örnek sayfada tespit edilip erken reddedilir.
+PDFium thread-safe olmadığından API sürecindeki tüm PDFium çağrıları tek kilit altında yapılır.
+"""
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import logging
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+
+from services.instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+# pypdfium2 kuruluysa hızlı PDFium metin katmanı kullanılır; yoksa PyPDF2
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+
+class ScannedPDFError(ValueError):
+    """PDF'te metin katmanı yok (taranmış belge); OCR olmadan metin çıkarılamaz."""
+
+
+# ============== LAYOUT ==============
+
+# Yeni paragraf başlatan satırlar: madde başlıkları, numaralı/harfli bentler, madde işaretleri
+_BLOCK_START = re.compile(
+    r"^(?:(?:MADDE|Madde)\s+\d+|\d+\s*[.)]\s|\d+\s*[.)]?\s*(?:MADDE|Madde)\b|[a-zçğıöşü]\)\s|[-•*]\s)"
+)
+
+
+def normalize_layout(text: str) -> str:
+    """
+    Sayfa metnindeki satır kırılımlarını paragraflara çevirir.
+
+    - Satır sonu tirelemesi birleştirilir ("sözleş-\\nme" -> "sözleşme")
+    - Madde başlıkları ve bentler her zaman yeni paragraf başlatır
+    - Sayfa genişliğine göre kısa kalan satır paragraf/başlık sonu kabul edilir
+    Paragraflar boş satırla ayrılır; split_clauses madde sınırlarını korur.
+    """
+    lines = [line.strip() for line in text.replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+    width = max((len(line) for line in lines), default=0)
+    paragraphs: List[str] = []
+    current = ""
+
+    for line in lines:
+        if not line:
+            if current:
+                paragraphs.append(current)
+                current = ""
+            continue
+        if current and _BLOCK_START.match(line):
+            paragraphs.append(current)
+            current = ""
+        if current.endswith("-") and len(current) > 1 and current[-2].isalpha():
+            current = current[:-1] + line
+        else:
+            current = f"{current} {line}" if current else line
+        if len(line) < width * 0.6:
+            paragraphs.append(current)
+            current = ""
+
+    if current:
+        paragraphs.append(current)
+    return "\n\n".join(paragraphs)
+
+
+# ============== WORKER ==============
+
+# PDFium thread-safe değildir: API sürecinde (to_thread'den gelen inspect/satır içi çıkarma) tüm
+# PDFium çağrıları ve _worker_reader bu kilit altında yapılır. Worker süreçler tek thread'lidir,
+# orada kilit hiç beklemez.
+_pdfium_lock = threading.RLock()
+
+# Her worker süreç son açtığı PDF'i tutar; aynı dosyanın sonraki sayfa grupları xref'i yeniden okumaz
+_worker_reader: Dict[str, object] = {}
+
+
+def _open_document(path: str):
+    """Çağıran _pdfium_lock'u tutmalıdır."""
+    document = _worker_reader.get(path)
+    if document is None:
+        _close_documents()
+        if pdfium is not None:
+            document = pdfium.PdfDocument(path)
+        else:
+            from PyPDF2 import PdfReader
+            document = PdfReader(path)
+        _worker_reader[path] = document
+    return document
+
+
+def _close_documents():
+    """Açık belgeleri kapatır; PDFium belgesi GC'ye (rastgele bir thread'e) bırakılmaz."""
+    for document in _worker_reader.values():
+        close = getattr(document, "close", None)
+        if close is not None:
+            try:
+                close()
+            except Exception as e:
+                logger.warning("PDF close error: %s", e)
+    _worker_reader.clear()
+
+
+def _page_text(document, index: int) -> str:
+    if pdfium is None:
+        return document.pages[index].extract_text() or ""
+    page = document[index]
+    textpage = page.get_textpage()
+    try:
+        return textpage.get_text_range()
+    finally:
+        textpage.close()
+        page.close()
+
+
+def _page_total(document) -> int:
+    return len(document) if pdfium is not None else len(document.pages)
+
+
+def _extract_page_range(path: str, start: int, end: int) -> List[str]:
+    """[start, end) aralığındaki sayfaların metnini döner (worker süreçte veya kilitli çağıranda çalışır)."""
+    raw = []
+    with _pdfium_lock:
+        document = _open_document(path)
+        for i in range(start, end):
+            try:
+                raw.append(_page_text(document, i))
+            except Exception as e:
+                logger.warning("PDF page %s extract error: %s", i, e)
+                raw.append("")
+    # Düzen normalizasyonu saf Python; kilit dışında yapılır
+    return [normalize_layout(text) for text in raw]
+
+
+# ============== EXTRACTOR ==============
+
+class PDFTextExtractor:
+    """
+    Sayfa grubu bazlı paralel PDF metin çıkarıcı.
+
+    - Sayfalar batch_size'lık gruplar halinde süreç havuzuna gönderilir
+    - Sonuçlar sayfa sırasıyla toplanır; karakter bütçesi dolunca kalan gruplar iptal edilir
+    - Küçük belgeler havuz maliyetine girmeden doğrudan çıkarılır
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, batch_size: int = 8, inline_max_pages: int = 8):
+        self.max_workers = max_workers or max(1, min(4, os.cpu_count() or 1))
+        self.batch_size = batch_size
+        self.inline_max_pages = inline_max_pages
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: uvicorn/grpc thread'leri olan süreci fork etmekten kaçın
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    @staticmethod
+    def page_count(path: str) -> int:
+        with _pdfium_lock:
+            try:
+                return _page_total(_open_document(path))
+            finally:
+                _close_documents()
+
+    def inspect(self, path: str, sample_pages: int = 3, min_chars: int = 20) -> Tuple[int, bool]:
+        """
+        İlk, orta ve son sayfalardan örnek alarak metin katmanı olup olmadığını belirler.
+
+        Returns:
+            (sayfa sayısı, metin katmanı var mı)
+        """
+        with _pdfium_lock:
+            try:
+                document = _open_document(path)
+                total_pages = _page_total(document)
+                if total_pages == 0:
+                    return 0, False
+                last = total_pages - 1
+                samples = sorted({last * i // max(1, sample_pages - 1) for i in range(sample_pages)})
+                chars = 0
+                for index in samples:
+                    try:
+                        chars += len(_page_text(document, index).strip())
+                    except Exception as e:
+                        logger.warning("PDF page %s sample error: %s", index, e)
+                    if chars >= min_chars:
+                        return total_pages, True
+                return total_pages, False
+            finally:
+                _close_documents()
+
+    @timed("pdf_extract", "pdf")
+    def extract(self, path: str, char_budget: Optional[int] = None) -> Tuple[str, int]:
+        """
+        PDF metnini çıkarır. char_budget dolunca durur.
+        Metin katmanı olmayan (taranmış) PDF'lerde tüm sayfaları dolaşmadan ScannedPDFError fırlatır.
+
+        Returns:
+            (metin, işlenen sayfa sayısı)
+        """
+        total_pages, has_text = self.inspect(path)
+        if not has_text:
+            raise ScannedPDFError(
+                "PDF taranmış görüntülerden oluşuyor, metin katmanı yok. "
+                "Lütfen metin seçilebilen bir PDF yükleyin."
+            )
+        if total_pages <= self.inline_max_pages:
+            with _pdfium_lock:
+                try:
+                    pages = _extract_page_range(path, 0, total_pages)
+                finally:
+                    _close_documents()
+            return self._join(pages, char_budget)
+
+        ranges = [
+            (start, min(start + self.batch_size, total_pages))
+            for start in range(0, total_pages, self.batch_size)
+        ]
+
+        pages: List[str] = []
+        chars = 0
+        in_flight: List[Future] = []
+        next_range = 0
+
+        # Havuzu doyuracak kadar grup gönder; sırayla tüket, bütçe dolunca dur
+        while next_range < len(ranges) and len(in_flight) < self.max_workers * 2:
+            in_flight.append(self.pool.submit(_extract_page_range, path, *ranges[next_range]))
+            next_range += 1
+
+        try:
+            while in_flight:
+                batch = in_flight.pop(0).result()
+                pages.extend(batch)
+                chars += sum(len(p) + 2 for p in batch)
+                if char_budget is not None and chars >= char_budget:
+                    break
+                if next_range < len(ranges):
+                    in_flight.append(self.pool.submit(_extract_page_range, path, *ranges[next_range]))
+                    next_range += 1
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+        return self._join(pages, char_budget)
+
+    @staticmethod
+    def _join(pages: List[str], char_budget: Optional[int]) -> Tuple[str, int]:
+        if char_budget is not None:
+            kept, chars = [], 0
+            for page in pages:
+                kept.append(page)
+                chars += len(page) + 2
+                if chars >= char_budget:
+                    break
+            pages = kept
+        return "\n\n".join(pages), len(pages)
+
+    @staticmethod
+    async def spool_upload(upload, chunk_size: int = 1024 * 1024, suffix: str = ".pdf") -> Tuple[str, str]:
+        """
+        FastAPI UploadFile'ı belleğe almadan geçici dosyaya yazar.
+
+        Returns:
+            (geçici dosya yolu, içeriğin SHA-256 özeti) - dosyayı silmek çağırana aittir
+        """
+        digest = hashlib.sha256()
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix="justlaw_")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                while True:
+                    chunk = await upload.read(chunk_size)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+        except Exception:
+            os.remove(path)
+            raise
+        return path, digest.hexdigest()
+
+    async def extract_upload(self, upload, char_budget: Optional[int] = None) -> Tuple[str, int]:
+        """
+        UploadFile'ı geçici dosyaya aktarıp metni çıkarır.
+        """
+        path, _digest = await self.spool_upload(upload)
+        try:
+            return await asyncio.to_thread(self.extract, path, char_budget)
+        finally:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# Singleton instance
+pdf_extractor = PDFTextExtractor()
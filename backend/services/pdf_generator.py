@@ -4,190 +4,289 @@ Dilekçe ve hukuki doküman PDF oluşturma
 """
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.styles import ParagraphStyle
 from reportlab.lib.units import cm
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Flowable
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from io import BytesIO
 from datetime import datetime
+from collections import OrderedDict
+from typing import Dict, List, Optional
+import logging
 import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+# (normal, kalın) font dosyası adayları; ilk bulunan çift kullanılır
+FONT_CANDIDATES = [
+    # Linux
+    ('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', '/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf'),
+    # Windows
+    ('C:/Windows/Fonts/DejaVuSans.ttf', 'C:/Windows/Fonts/DejaVuSans-Bold.ttf'),
+    ('C:/Windows/Fonts/arial.ttf', 'C:/Windows/Fonts/arialbd.ttf'),
+    ('C:/Windows/Fonts/tahoma.ttf', 'C:/Windows/Fonts/tahomabd.ttf'),
+    # Mac
+    ('/Library/Fonts/Arial.ttf', '/Library/Fonts/Arial Bold.ttf'),
+]
+
+
+class FontRegistry:
+    """
+    Türkçe karakter destekli fontları süreç başına bir kez bulur ve kaydeder.
+
+    - Normal ve kalın yüz "TurkishFont" ailesi olarak kaydedilir; Paragraph içindeki <b> kalın yüzü kullanır
+    - TTFont gömülürken sadece kullanılan glifler alt küme olarak PDF'e eklenir
+    - PDF_FONT_PATH / PDF_FONT_BOLD_PATH ile aday listesi geçersiz kılınabilir
+    """
+
+    FAMILY = 'TurkishFont'
 
-class PDFGenerator:
-    """PDF doküman oluşturucu"""
-    
     def __init__(self):
-        # Register Turkish-compatible font
         self.font_name = 'Helvetica'
         self.font_name_bold = 'Helvetica-Bold'
-        
-        try:
-            # Try to register DejaVuSans which supports Turkish characters
-            import os
-            font_paths = [
-                # Windows
-                'C:/Windows/Fonts/DejaVuSans.ttf',
-                'C:/Windows/Fonts/arial.ttf',
-                'C:/Windows/Fonts/tahoma.ttf',
-                # Linux
-                '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf',
-                # Mac
-                '/Library/Fonts/Arial.ttf',
-            ]
-            
-            font_registered = False
-            for font_path in font_paths:
-                if os.path.exists(font_path):
-                    try:
-                        pdfmetrics.registerFont(TTFont('TurkishFont', font_path))
-                        self.font_name = 'TurkishFont'
-                        
-                        # Try to find bold version
-                        bold_path = font_path.replace('.ttf', 'bd.ttf').replace('Sans.ttf', 'Sans-Bold.ttf')
-                        if os.path.exists(bold_path):
-                            pdfmetrics.registerFont(TTFont('TurkishFontBold', bold_path))
-                            self.font_name_bold = 'TurkishFontBold'
-                        else:
-                            self.font_name_bold = 'TurkishFont'
-                        
-                        font_registered = True
-                        print(f"PDF font registered: {font_path}")
-                        break
-                    except Exception as e:
-                        print(f"Could not register font {font_path}: {e}")
-                        continue
-            
-            if not font_registered:
-                print("Warning: No Turkish font found, using Helvetica (Turkish chars may not display)")
-                
-        except Exception as e:
-            print(f"Font registration error: {e}")
-        
-        self.styles = getSampleStyleSheet()
-        # Custom styles with Turkish font
-        self.styles.add(ParagraphStyle(
-            name='TurkishTitle',
-            fontSize=16,
-            leading=20,
-            alignment=1,  # Center
-            spaceAfter=20,
-            fontName=self.font_name_bold
-        ))
-        self.styles.add(ParagraphStyle(
-            name='TurkishBody',
-            fontSize=12,
-            leading=16,
-            alignment=4,  # Justify
-            spaceAfter=12,
-            fontName=self.font_name
-        ))
-        self.styles.add(ParagraphStyle(
-            name='TurkishRight',
-            fontSize=12,
-            leading=16,
-            alignment=2,  # Right
-            spaceAfter=12,
-            fontName=self.font_name
-        ))
-    
-    def create_dilekce(self, dilekce_data: dict) -> bytes:
-        """
-        Dilekçe PDF'i oluşturur.
-        
-        Args:
-            dilekce_data: {
-                'mahkeme': str,
-                'davaci_adi': str,
-                'davaci_tc': str,
-                'davaci_adres': str,
-                'davali_adi': str,
-                'davali_adres': str,
-                'konu': str,
-                'aciklamalar': str,
-                'talepler': str,
-                'tarih': str (optional),
-                'dilekce_turu': str
-            }
-        """
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(
-            buffer,
-            pagesize=A4,
-            rightMargin=2*cm,
-            leftMargin=2*cm,
-            topMargin=2*cm,
-            bottomMargin=2*cm
-        )
-        
-        story = []
-        
+        self.font_path: Optional[str] = None
+        self._loaded = False
+
+    def load(self) -> "FontRegistry":
+        if self._loaded:
+            return self
+        self._loaded = True
+
+        candidates = list(FONT_CANDIDATES)
+        if os.getenv("PDF_FONT_PATH"):
+            candidates.insert(0, (os.getenv("PDF_FONT_PATH"), os.getenv("PDF_FONT_BOLD_PATH", "")))
+
+        for regular_path, bold_path in candidates:
+            if not os.path.exists(regular_path):
+                continue
+            try:
+                pdfmetrics.registerFont(TTFont(self.FAMILY, regular_path))
+            except Exception as e:
+                logger.warning("Could not register font %s: %s", regular_path, e)
+                continue
+
+            bold_name = self.FAMILY
+            if bold_path and os.path.exists(bold_path):
+                try:
+                    pdfmetrics.registerFont(TTFont(f'{self.FAMILY}Bold', bold_path))
+                    bold_name = f'{self.FAMILY}Bold'
+                except Exception as e:
+                    logger.warning("Could not register bold font %s: %s", bold_path, e)
+
+            pdfmetrics.registerFontFamily(
+                self.FAMILY,
+                normal=self.FAMILY,
+                bold=bold_name,
+                italic=self.FAMILY,
+                boldItalic=bold_name
+            )
+            self.font_name = self.FAMILY
+            self.font_name_bold = bold_name
+            self.font_path = regular_path
+            logger.info("PDF font registered: %s (bold: %s)", regular_path, bold_path if bold_name != self.FAMILY else "-")
+            return self
+
+        logger.warning("No Turkish font found, using Helvetica (Turkish chars may not display)")
+        return self
+
+    def build_styles(self) -> Dict[str, ParagraphStyle]:
+        """Tüm belgelerde paylaşılan paragraf stilleri."""
+        return {
+            'TurkishTitle': ParagraphStyle(
+                name='TurkishTitle',
+                fontSize=16,
+                leading=20,
+                alignment=1,  # Center
+                spaceAfter=20,
+                fontName=self.font_name_bold
+            ),
+            'TurkishBody': ParagraphStyle(
+                name='TurkishBody',
+                fontSize=12,
+                leading=16,
+                alignment=4,  # Justify
+                spaceAfter=12,
+                fontName=self.font_name
+            ),
+            'TurkishRight': ParagraphStyle(
+                name='TurkishRight',
+                fontSize=12,
+                leading=16,
+                alignment=2,  # Right
+                spaceAfter=12,
+                fontName=self.font_name
+            ),
+        }
+
+
+# Modül yüklenirken bir kez: font keşfi ve stiller tüm PDFGenerator örneklerince paylaşılır
+font_registry = FontRegistry().load()
+STYLES = font_registry.build_styles()
+
+
+class MeasuredParagraph(Flowable):
+    """
+    Paragraph'ı bir kez ayrıştırıp ölçer; aynı genişlikte tekrar yerleştirildiğinde
+    satır kırma (wrap) yeniden yapılmaz. Sayfaya sığmayıp bölünürse önbellek düşürülür.
+    """
+
+    def __init__(self, text: str, style: ParagraphStyle):
+        super().__init__()
+        self.paragraph = Paragraph(text, style)
+        self._measured_width: Optional[float] = None
+        self._size = (0, 0)
+
+    def wrap(self, availWidth, availHeight):
+        if self._measured_width != availWidth:
+            self._size = self.paragraph.wrap(availWidth, availHeight)
+            self._measured_width = availWidth
+        self.width, self.height = self._size
+        return self._size
+
+    def split(self, availWidth, availHeight):
+        # Paragraph.split blPara'yı silebilir; ölçüm bir sonraki wrap'te tazelenir
+        self._measured_width = None
+        parts = self.paragraph.split(availWidth, availHeight)
+        return [self] if parts == [self.paragraph] else parts
+
+    def drawOn(self, canvas, x, y, _sW=0):
+        # doc.build sığmayan flowable'a _postponed bırakır; paylaşılan nesnede temizlenmeli
+        self.__dict__.pop('_postponed', None)
+        self.paragraph.drawOn(canvas, x, y, _sW)
+
+    def getSpaceBefore(self):
+        return self.paragraph.getSpaceBefore()
+
+    def getSpaceAfter(self):
+        return self.paragraph.getSpaceAfter()
+
+
+# Taraf ve bölüm başlıkları; UYAP yazıcısı (udf_container) da aynı başlıkları kullanır
+DILEKCE_LAYOUT = {
+    'davaci': 'DAVACI',
+    'davali': 'DAVALI',
+    'aciklamalar': 'AÇIKLAMALAR',
+    'talepler': 'SONUÇ VE TALEP',
+    'imzalayan': 'Davacı',
+}
+
+
+class DilekceTemplate:
+    """
+    Derlenmiş dilekçe iskeleti.
+
+    Sabit öğeler (bölüm başlıkları, boşluklar, imza satırı) bir kez oluşturulup ölçülür.
+    Değişken metinler (mahkeme, konu, açıklama paragrafları, talepler) metin+stil anahtarlı
+    LRU'da tutulur; aynı metin sonraki dilekçelerde (ör. toplu üretim) yeniden ölçülmez.
+    """
+
+    def __init__(self, styles: Dict[str, ParagraphStyle], layout: dict = DILEKCE_LAYOUT, max_cached: int = 512):
+        self.styles = styles
+        self.layout = layout
+        self.max_cached = max_cached
+        self._paragraphs: "OrderedDict[tuple, MeasuredParagraph]" = OrderedDict()
+
+        self.aciklamalar_baslik = MeasuredParagraph(f"<b>{layout['aciklamalar']}:</b>", styles['TurkishBody'])
+        self.talepler_baslik = MeasuredParagraph(f"<b>{layout['talepler']}:</b>", styles['TurkishBody'])
+        self.imza = MeasuredParagraph("İmza", styles['TurkishRight'])
+        self.space = {h: Spacer(1, h) for h in (10, 20, 30)}
+
+    def paragraph(self, text: str, style: str) -> MeasuredParagraph:
+        key = (style, text)
+        cached = self._paragraphs.get(key)
+        if cached is None:
+            cached = self._paragraphs[key] = MeasuredParagraph(text, self.styles[style])
+            if len(self._paragraphs) > self.max_cached:
+                self._paragraphs.popitem(last=False)
+        else:
+            self._paragraphs.move_to_end(key)
+        return cached
+
+    def story(self, dilekce_data: dict) -> List[Flowable]:
+        layout = self.layout
+        p = self.paragraph
+        story: List[Flowable] = []
+
         # Başlık - Mahkeme
         mahkeme = dilekce_data.get('mahkeme', '... MAHKEMESİ HAKİMLİĞİNE')
-        story.append(Paragraph(mahkeme.upper(), self.styles['TurkishTitle']))
-        story.append(Spacer(1, 20))
-        
-        # Taraflar tablosu
+        story += [p(mahkeme.upper(), 'TurkishTitle'), self.space[20]]
+
+        # Taraflar
         davaci_bilgi = f"""
-        <b>DAVACI:</b> {dilekce_data.get('davaci_adi', '...')}<br/>
+        <b>{layout['davaci']}:</b> {dilekce_data.get('davaci_adi', '...')}<br/>
         <b>TC:</b> {dilekce_data.get('davaci_tc', '...')}<br/>
         <b>ADRES:</b> {dilekce_data.get('davaci_adres', '...')}
         """
-        
         davali_bilgi = f"""
-        <b>DAVALI:</b> {dilekce_data.get('davali_adi', '...')}<br/>
+        <b>{layout['davali']}:</b> {dilekce_data.get('davali_adi', '...')}<br/>
         <b>ADRES:</b> {dilekce_data.get('davali_adres', '...')}
         """
-        
-        story.append(Paragraph(davaci_bilgi, self.styles['TurkishBody']))
-        story.append(Spacer(1, 10))
-        story.append(Paragraph(davali_bilgi, self.styles['TurkishBody']))
-        story.append(Spacer(1, 20))
-        
+        story += [
+            p(davaci_bilgi, 'TurkishBody'), self.space[10],
+            p(davali_bilgi, 'TurkishBody'), self.space[20],
+        ]
+
         # Konu
         konu = dilekce_data.get('konu', 'Dava Konusu')
-        story.append(Paragraph(f"<b>KONU:</b> {konu}", self.styles['TurkishBody']))
-        story.append(Spacer(1, 20))
-        
+        story += [p(f"<b>KONU:</b> {konu}", 'TurkishBody'), self.space[20]]
+
         # Açıklamalar
-        story.append(Paragraph("<b>AÇIKLAMALAR:</b>", self.styles['TurkishBody']))
-        story.append(Spacer(1, 10))
-        
+        story += [self.aciklamalar_baslik, self.space[10]]
         aciklamalar = dilekce_data.get('aciklamalar', '')
-        # Paragrafları ayır
         for i, para in enumerate(aciklamalar.split('\n\n'), 1):
             if para.strip():
-                story.append(Paragraph(f"{i}. {para.strip()}", self.styles['TurkishBody']))
-        
-        story.append(Spacer(1, 20))
-        
+                story.append(p(f"{i}. {para.strip()}", 'TurkishBody'))
+        story.append(self.space[20])
+
         # Talepler
-        story.append(Paragraph("<b>SONUÇ VE TALEP:</b>", self.styles['TurkishBody']))
-        story.append(Spacer(1, 10))
-        
-        talepler = dilekce_data.get('talepler', '')
-        story.append(Paragraph(talepler, self.styles['TurkishBody']))
-        story.append(Spacer(1, 30))
-        
+        story += [self.talepler_baslik, self.space[10]]
+        story += [p(dilekce_data.get('talepler', ''), 'TurkishBody'), self.space[30]]
+
         # Tarih ve İmza
         tarih = dilekce_data.get('tarih', datetime.now().strftime('%d/%m/%Y'))
-        story.append(Paragraph(f"Tarih: {tarih}", self.styles['TurkishRight']))
-        story.append(Spacer(1, 10))
-        story.append(Paragraph(f"Davacı: {dilekce_data.get('davaci_adi', '...')}", self.styles['TurkishRight']))
-        story.append(Paragraph("İmza", self.styles['TurkishRight']))
-        
-        # PDF oluştur
-        doc.build(story)
+        story += [
+            p(f"Tarih: {tarih}", 'TurkishRight'), self.space[10],
+            p(f"{layout['imzalayan']}: {dilekce_data.get('davaci_adi', '...')}", 'TurkishRight'),
+            self.imza,
+        ]
+        # Önceki (yarıda kalmış) build'lerden kalan yerleşim işaretlerini temizle
+        for flowable in story:
+            flowable.__dict__.pop('_postponed', None)
+        return story
+
+
+class PDFGenerator:
+    """PDF doküman oluşturucu"""
+    
+    def __init__(self, registry: FontRegistry = font_registry, styles: Dict[str, ParagraphStyle] = STYLES):
+        self.font_name = registry.font_name
+        self.font_name_bold = registry.font_name_bold
+        self.styles = styles
+        # Ölçülmüş flowable'lar thread'ler arasında paylaşılmaz (senkron yedek yol thread'de çalışır)
+        self._local = threading.local()
+
+    def template(self) -> DilekceTemplate:
+        """Derlenmiş dilekçe şablonunu döner (thread başına bir kez derlenir)."""
+        template = getattr(self._local, 'template', None)
+        if template is None:
+            template = self._local.template = DilekceTemplate(self.styles)
+        return template
+
+    @staticmethod
+    def _finish(buffer, output) -> Optional[bytes]:
+        """Çıktı dışarıdan verildiyse çağıran yönetir; aksi halde bellek tamponu bytes'a çevrilir."""
+        if output is not None:
+            return None
         pdf_bytes = buffer.getvalue()
         buffer.close()
-        
         return pdf_bytes
-    
-    def create_sozlesme(self, sozlesme_data: dict) -> bytes:
-        """
-        Sözleşme taslağı PDF'i oluşturur.
-        """
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(
+
+    @staticmethod
+    def _new_document(buffer) -> SimpleDocTemplate:
+        return SimpleDocTemplate(
             buffer,
             pagesize=A4,
             rightMargin=2*cm,
@@ -195,6 +294,43 @@ class PDFGenerator:
             topMargin=2*cm,
             bottomMargin=2*cm
         )
+    
+    def create_dilekce(self, dilekce_data: dict, output=None) -> Optional[bytes]:
+        """
+        Dilekçe PDF'i oluşturur.
+        output (dosya yolu veya yazılabilir dosya) verilirse PDF oraya yazılır ve None döner;
+        verilmezse bytes döner.
+        
+        Args:
+            dilekce_data: {
+                'mahkeme': str,
+                'davaci_adi': str,
+                'davaci_tc': str,
+                'davaci_adres': str,
+                'davali_adi': str,
+                'davali_adres': str,
+                'konu': str,
+                'aciklamalar': str,
+                'talepler': str,
+                'tarih': str (optional),
+                'dilekce_turu': str
+            }
+        """
+        buffer = output if output is not None else BytesIO()
+        doc = self._new_document(buffer)
+        
+        story = self.template().story(dilekce_data)
+        
+        # PDF oluştur
+        doc.build(story)
+        return self._finish(buffer, output)
+    
+    def create_sozlesme(self, sozlesme_data: dict, output=None) -> Optional[bytes]:
+        """
+        Sözleşme taslağı PDF'i oluşturur. output için create_dilekce'ye bakın.
+        """
+        buffer = output if output is not None else BytesIO()
+        doc = self._new_document(buffer)
         
         story = []
         
@@ -251,7 +387,8 @@ class PDFGenerator:
         imza_table = Table(imza_data, colWidths=[8*cm, 8*cm])
         imza_table.setStyle(TableStyle([
             ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 0), (-1, -1), self.font_name),
+            ('FONTNAME', (0, 0), (-1, 0), self.font_name_bold),
             ('FONTSIZE', (0, 0), (-1, -1), 11),
             ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
             ('TOPPADDING', (0, 0), (-1, -1), 12),
@@ -259,10 +396,7 @@ class PDFGenerator:
         story.append(imza_table)
         
         doc.build(story)
-        pdf_bytes = buffer.getvalue()
-        buffer.close()
-        
-        return pdf_bytes
+        return self._finish(buffer, output)
 
 
 # Singleton instance
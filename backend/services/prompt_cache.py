@@ -0,0 +1,254 @@
+"""
+JustLaw Prompt Cache
+Sabit prompt önekleri (SYSTEM_PROMPT, dilekçe şablonu) için Gemini context caching yönetimi
+"""
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from google.genai import types
+from typing import Dict, Optional
+import logging
+import threading
+import time
+
+from services.instrumentation import record_llm_usage
+
+logger = logging.getLogger(__name__)
+
+
+# Explicit context caching için modelin kabul ettiği en küçük önek (token); eşleşme yoksa DEFAULT
+MIN_CACHE_TOKENS = {
+    "gemini-2.5-flash": 1024,
+    "gemini-2.5-pro": 4096,
+}
+DEFAULT_MIN_CACHE_TOKENS = 4096
+
+
+def min_cache_tokens(model: str) -> int:
+    for prefix, tokens in MIN_CACHE_TOKENS.items():
+        if model.startswith(prefix):
+            return tokens
+    return DEFAULT_MIN_CACHE_TOKENS
+
+
+class _Prefix:
+    __slots__ = ("name", "text", "ttl", "cache_name", "expires_at", "retry_after", "tokens", "cacheable", "pending")
+
+    def __init__(self, name: str, text: str, ttl: int):
+        self.name = name
+        self.text = text
+        self.ttl = ttl
+        self.cache_name: Optional[str] = None
+        self.expires_at = 0.0
+        self.retry_after = 0.0
+        self.tokens: Optional[int] = None
+        self.cacheable = True
+        # Süren oluşturma/yenileme; aynı önek için ikinci ağ çağrısı yapılmaz
+        self.pending: Optional[Future] = None
+
+
+class PromptCacheManager:
+    """
+    Statik prompt öneklerini bir kez cached content olarak kaydeder ve isteklerde referans verir.
+
+    Üç kademe:
+    1. cached_content  - önek sunucuda önbellekte, tekrar faturalanmaz
+    2. system_instruction - önbellek oluşturulamazsa (ör. minimum token sınırı altı)
+    3. inline - client caching/config desteklemiyorsa (yerel sahte client) önek prompt'a eklenir
+
+    caches.create/update ağ çağrıları lock dışında ve önek başına tek seferde yapılır; o sırada
+    gelen istekler geçerli önbelleği kullanır ya da en fazla wait_timeout bekleyip kademe 2'ye düşer.
+    Model minimumunun altındaki önekler için önbellek hiç denenmez.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        model: str = "gemini-2.0-flash-exp",
+        ttl: int = 3600,
+        refresh_margin: int = 300,
+        retry_interval: int = 600,
+        wait_timeout: float = 2.0,
+        min_tokens: Optional[int] = None
+    ):
+        self.client = client
+        self.model = model
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.wait_timeout = wait_timeout
+        self.min_tokens = min_tokens if min_tokens is not None else min_cache_tokens(model)
+        self._prefixes: Dict[str, _Prefix] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "requests": 0,
+            "cached_requests": 0,
+            "prompt_tokens": 0,
+            "cached_tokens": 0,
+        }
+
+    def register(self, name: str, text: str, ttl: Optional[int] = None):
+        """Öneki kaydeder. Önbellek ilk kullanımda (veya warm_up ile) oluşturulur."""
+        self._prefixes[name] = _Prefix(name, text, ttl or self.ttl)
+
+    @property
+    def supports_caching(self) -> bool:
+        return self.client is not None and hasattr(self.client, "caches")
+
+    def warm_up(self):
+        """Tüm önekler için önbelleği önceden oluşturur (başlangıçta thread'de çağrılır)."""
+        for prefix in self._prefixes.values():
+            self._ensure_cache(prefix)
+
+    def generate(self, name: str, prompt: str):
+        """Önekli prompt'u mümkün olan en ucuz kademeyle çalıştırır ve yanıtı döner."""
+        prefix = self._prefixes[name]
+
+        if not self.supports_caching:
+            response = self.client.models.generate_content(
+                model=self.model,
+                contents=f"{prefix.text}\n\n{prompt}"
+            )
+            self._record(name, response, cached=False)
+            return response
+
+        cache_name = self._ensure_cache(prefix)
+        if cache_name:
+            try:
+                response = self.client.models.generate_content(
+                    model=self.model,
+                    contents=prompt,
+                    config=types.GenerateContentConfig(cached_content=cache_name)
+                )
+                self._record(name, response, cached=True)
+                return response
+            except Exception as e:
+                # Önbellek sunucu tarafında silinmiş/süresi dolmuş olabilir
+                logger.warning("Prompt cache '%s' kullanılamadı, system_instruction ile devam: %s", name, e)
+                with self._lock:
+                    if prefix.cache_name == cache_name:
+                        prefix.cache_name = None
+                        prefix.expires_at = 0.0
+
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=types.GenerateContentConfig(system_instruction=prefix.text)
+        )
+        self._record(name, response, cached=False)
+        return response
+
+    def metrics(self) -> dict:
+        now = time.monotonic()
+        return {
+            **self.stats,
+            "prefixes": {
+                p.name: {
+                    "cached": bool(p.cache_name) and p.expires_at > now,
+                    "expires_in": max(0, int(p.expires_at - now)) if p.cache_name else 0,
+                    "cacheable": p.cacheable,
+                    "tokens": p.tokens,
+                }
+                for p in self._prefixes.values()
+            },
+        }
+
+    # ============== INTERNAL ==============
+
+    def _ensure_cache(self, prefix: _Prefix) -> Optional[str]:
+        """Geçerli cache adını döner; yoksa veya süresi dolmak üzereyse oluşturur/yeniler (lock dışında)."""
+        if not self.supports_caching or not prefix.cacheable:
+            return None
+
+        with self._lock:
+            now = time.monotonic()
+            if prefix.cache_name and prefix.expires_at - self.refresh_margin > now:
+                return prefix.cache_name
+            usable = prefix.cache_name if prefix.cache_name and prefix.expires_at > now else None
+            pending = prefix.pending
+            owner = pending is None
+            if owner:
+                if usable is None and now < prefix.retry_after:
+                    return None
+                pending = prefix.pending = Future()
+
+        if not owner:
+            # Başka thread yeniliyor: mevcut önbellek hâlâ geçerliyse onu kullan, değilse kısa süre bekle
+            if usable:
+                return usable
+            try:
+                return pending.result(timeout=self.wait_timeout)
+            except FutureTimeoutError:
+                return None
+
+        cache_name = None
+        try:
+            cache_name = self._refresh(prefix, usable)
+        finally:
+            with self._lock:
+                prefix.pending = None
+            pending.set_result(cache_name)
+        return cache_name
+
+    def _refresh(self, prefix: _Prefix, usable: Optional[str]) -> Optional[str]:
+        """Ağ çağrıları: token sayımı (bir kez), TTL uzatma veya yeni önbellek oluşturma."""
+        if prefix.tokens is None:
+            prefix.tokens = self._count_tokens(prefix.text)
+            if prefix.tokens < self.min_tokens:
+                prefix.cacheable = False
+                logger.info(
+                    "Prompt cache '%s' atlandı: önek %s token, %s için minimum %s; system_instruction kullanılacak",
+                    prefix.name, prefix.tokens, self.model, self.min_tokens
+                )
+                return None
+
+        if usable:
+            try:
+                self.client.caches.update(
+                    name=usable,
+                    config=types.UpdateCachedContentConfig(ttl=f"{prefix.ttl}s")
+                )
+                with self._lock:
+                    prefix.expires_at = time.monotonic() + prefix.ttl
+                return usable
+            except Exception as e:
+                logger.warning("Prompt cache '%s' yenilenemedi, yeniden oluşturulacak: %s", prefix.name, e)
+
+        try:
+            cache = self.client.caches.create(
+                model=self.model,
+                config=types.CreateCachedContentConfig(
+                    display_name=f"justlaw-{prefix.name}",
+                    system_instruction=prefix.text,
+                    ttl=f"{prefix.ttl}s"
+                )
+            )
+        except Exception as e:
+            with self._lock:
+                prefix.cache_name = None
+                prefix.retry_after = time.monotonic() + self.retry_interval
+            logger.warning("Prompt cache '%s' oluşturulamadı: %s", prefix.name, e)
+            return None
+
+        with self._lock:
+            prefix.cache_name = cache.name
+            prefix.expires_at = time.monotonic() + prefix.ttl
+        logger.info("Prompt cache oluşturuldu: %s -> %s", prefix.name, cache.name)
+        return cache.name
+
+    def _count_tokens(self, text: str) -> int:
+        try:
+            return self.client.models.count_tokens(model=self.model, contents=text).total_tokens or 0
+        except Exception as e:
+            # Sayım yapılamazsa kaba tahmin (Türkçe metinde ~4 karakter/token)
+            logger.warning("Prompt cache token sayımı yapılamadı, tahmin kullanılıyor: %s", e)
+            return len(text) // 4
+
+    def _record(self, name: str, response, cached: bool):
+        record_llm_usage(response, name)
+        usage = getattr(response, "usage_metadata", None)
+        with self._lock:
+            self.stats["requests"] += 1
+            if cached:
+                self.stats["cached_requests"] += 1
+            if usage:
+                self.stats["prompt_tokens"] += usage.prompt_token_count or 0
+                self.stats["cached_tokens"] += usage.cached_content_token_count or 0
@@ -0,0 +1,241 @@
+"""
+JustLaw Query Pre-warmer
+Popüler arama sorgularını (Yargıtay, Mevzuat) boşta kalan zamanda önceden hesaplayıp önbelleğe alır
+"""
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import heapq
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """Aynı sorgunun farklı yazımlarını tek anahtarda toplar (Türkçe İ/I duyarlı)."""
+    query = query.replace("İ", "i").replace("I", "ı")
+    return " ".join(query.lower().split())
+
+
+class CountMinSketch:
+    """
+    Sabit bellekli frekans tahmincisi. Tahmin gerçek sayıdan asla küçük olmaz.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.table = [[0] * width for _ in range(depth)]
+
+    def _indexes(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8 * self.depth).digest()
+        for row in range(self.depth):
+            chunk = digest[row * 8:(row + 1) * 8]
+            yield row, int.from_bytes(chunk, "little") % self.width
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Sayacı artırır ve güncel tahmini döner."""
+        estimate = None
+        for row, col in self._indexes(key):
+            self.table[row][col] += count
+            value = self.table[row][col]
+            estimate = value if estimate is None else min(estimate, value)
+        return estimate or 0
+
+    def estimate(self, key: str) -> int:
+        return min(self.table[row][col] for row, col in self._indexes(key))
+
+    def decay(self):
+        """Eski popülerliği unutmak için tüm sayaçları yarıya indirir."""
+        for row in self.table:
+            for i in range(self.width):
+                row[i] >>= 1
+
+
+class TopKTracker:
+    """Count-min sketch tahminlerine göre en sık K sorguyu tutar."""
+
+    def __init__(self, k: int = 50, width: int = 2048, depth: int = 4):
+        self.k = k
+        self.sketch = CountMinSketch(width, depth)
+        self.candidates: Dict[str, int] = {}
+
+    def add(self, key: str):
+        estimate = self.sketch.add(key)
+        if key in self.candidates or len(self.candidates) < self.k:
+            self.candidates[key] = estimate
+            return
+        weakest = min(self.candidates, key=self.candidates.get)
+        if estimate > self.candidates[weakest]:
+            del self.candidates[weakest]
+            self.candidates[key] = estimate
+
+    def top(self, n: int) -> List[Tuple[str, int]]:
+        return heapq.nlargest(n, self.candidates.items(), key=lambda kv: kv[1])
+
+    def decay(self):
+        self.sketch.decay()
+        self.candidates = {
+            key: self.sketch.estimate(key) for key in self.candidates
+        }
+        self.candidates = {key: count for key, count in self.candidates.items() if count > 0}
+
+
+class SearchResultCache:
+    """Arama yanıtları için TTL'li önbellek."""
+
+    def __init__(self, ttl: float = 6 * 3600, max_entries: int = 500):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: Dict[str, Tuple[float, dict]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self._data.get(key)
+        if entry and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        if entry:
+            del self._data[key]
+        self.misses += 1
+        return None
+
+    def is_fresh(self, key: str, margin: float = 0) -> bool:
+        entry = self._data.get(key)
+        return bool(entry) and entry[0] - margin > time.monotonic()
+
+    def set(self, key: str, value: dict):
+        if len(self._data) >= self.max_entries and key not in self._data:
+            oldest = min(self._data, key=lambda k: self._data[k][0])
+            del self._data[oldest]
+        self._data[key] = (time.monotonic() + self.ttl, value)
+
+
+# Warmer imzası: (query, limit) -> yanıt dict'i. Boş sonuç (total=0) önbelleğe yazılmaz.
+Warmer = Callable[[str, int], Awaitable[Optional[dict]]]
+
+
+class QueryPrewarmer:
+    """
+    Sorgu frekansını izler ve en popüler N sorguyu arka planda önceden hesaplar.
+
+    Sadece sistem boştayken çalışır ve her turda hem çağrı sayısı (Gemini/scraper kotası)
+    hem de duvar saati bütçesine uyar. process_time/thread_time kullanılmaz: süreçteki (ve event
+    loop thread'indeki) diğer isteklerin CPU'su da sayılır, tur ilgisiz yüke göre kısalırdı.
+    """
+
+    def __init__(
+        self,
+        top_n: int = 20,
+        interval: float = 300,
+        idle_seconds: float = 10,
+        max_calls_per_cycle: int = 5,
+        cycle_budget_seconds: float = 60.0,
+        ttl: float = 6 * 3600
+    ):
+        self.top_n = top_n
+        self.interval = interval
+        self.idle_seconds = idle_seconds
+        self.max_calls_per_cycle = max_calls_per_cycle
+        self.cycle_budget_seconds = cycle_budget_seconds
+        self.tracker = TopKTracker(k=top_n * 4)
+        self.cache = SearchResultCache(ttl=ttl)
+        self.warmers: Dict[str, Warmer] = {}
+        self._last_activity = time.monotonic()
+        self._in_flight = 0
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def make_key(kind: str, query: str, limit: int) -> str:
+        return f"{kind}\x1f{limit}\x1f{normalize_query(query)}"
+
+    def register(self, kind: str, warmer: Warmer):
+        self.warmers[kind] = warmer
+
+    # ============== REQUEST PATH ==============
+
+    def request_started(self):
+        self._in_flight += 1
+        self._last_activity = time.monotonic()
+
+    def request_finished(self):
+        self._in_flight = max(0, self._in_flight - 1)
+        self._last_activity = time.monotonic()
+
+    def record(self, kind: str, query: str, limit: int) -> Optional[dict]:
+        """Sorguyu sayar ve önbellekte varsa sonucu döner."""
+        key = self.make_key(kind, query, limit)
+        self.tracker.add(key)
+        return self.cache.get(key)
+
+    def store(self, kind: str, query: str, limit: int, result: dict):
+        self.cache.set(self.make_key(kind, query, limit), result)
+
+    # ============== BACKGROUND ==============
+
+    def is_idle(self) -> bool:
+        return self._in_flight == 0 and time.monotonic() - self._last_activity >= self.idle_seconds
+
+    async def warm_once(self) -> int:
+        """Bir ön ısıtma turu çalıştırır, hesaplanan sorgu sayısını döner."""
+        calls = 0
+        started = time.monotonic()
+        # Yenilemeyi TTL dolmadan yap ki popüler sorgu hiç soğumasın
+        margin = self.interval * 2
+
+        for key, _count in self.tracker.top(self.top_n):
+            if calls >= self.max_calls_per_cycle:
+                break
+            if time.monotonic() - started >= self.cycle_budget_seconds:
+                break
+            if not self.is_idle():
+                break
+            if self.cache.is_fresh(key, margin):
+                continue
+
+            kind, limit, query = key.split("\x1f", 2)
+            warmer = self.warmers.get(kind)
+            if not warmer:
+                continue
+
+            calls += 1
+            try:
+                result = await warmer(query, int(limit))
+                if result and result.get("total"):
+                    self.cache.set(key, result)
+            except Exception as e:
+                logger.warning("Prewarm error (%s: %s): %s", kind, query, e)
+
+        return calls
+
+    async def _run(self):
+        cycle = 0
+        while True:
+            await asyncio.sleep(self.interval)
+            cycle += 1
+            # Popülerlik zamanla sönümlensin (~her 12 turda bir yarılanır)
+            if cycle % 12 == 0:
+                self.tracker.decay()
+            if self.is_idle():
+                warmed = await self.warm_once()
+                if warmed:
+                    logger.info("Prewarm: %s popüler sorgu önbelleğe alındı", warmed)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Singleton instance
+query_prewarmer = QueryPrewarmer()
@@ -0,0 +1,197 @@
+"""
+JustLaw Render Service
+PDF/UDF üretimini (ReportLab yerleşimi, XML serileştirme) event loop dışında,
+fontları önceden yüklenmiş sınırlı bir süreç havuzunda çalıştırır
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, Optional
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+
+from services.instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+
+class RenderBusy(Exception):
+    """Bekleyen render sayısı sınırda ve slot zamanında boşalmadı."""
+
+
+# ============== WORKER ==============
+
+def _warm_worker():
+    """Worker başlarken font kaydı ve stilleri yükler; ilk gerçek istek bu maliyeti ödemez."""
+    from services.pdf_generator import pdf_generator
+    from services.udf_generator import udf_generator  # noqa: F401
+
+    pdf_generator.create_dilekce({"mahkeme": "Isınma", "aciklamalar": "İçerik", "talepler": "Talep"})
+
+
+def _ping() -> int:
+    return os.getpid()
+
+
+def _render(kind: str, data: dict, output: Optional[str] = None) -> Optional[bytes]:
+    """
+    Belgeyi üretir (worker süreçte ya da senkron yedek yolda çalışır).
+    output dosya yolu verilirse belge diske yazılır; süreçler arası büyük bytes taşınmaz.
+    """
+    if kind == "dilekce_pdf":
+        from services.pdf_generator import pdf_generator
+        return pdf_generator.create_dilekce(data, output)
+    if kind == "sozlesme_pdf":
+        from services.pdf_generator import pdf_generator
+        return pdf_generator.create_sozlesme(data, output)
+    if kind == "udf":
+        from services.udf_generator import udf_generator
+        return udf_generator.create_udf(data, output)
+    if kind == "udf_uyap":
+        from services.udf_container import write_udf_container
+        if output is not None:
+            write_udf_container(data, output)
+            return None
+        buffer = io.BytesIO()
+        write_udf_container(data, buffer)
+        return buffer.getvalue()
+    raise ValueError(f"Bilinmeyen belge türü: {kind}")
+
+
+def remove_file(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def iter_file(path: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    Dosyayı parça parça okur (StreamingResponse için). Dosyayı silmez: silmenin tek sahibi
+    çağırandır (ör. BackgroundTask(remove_file, path) ya da iş kuyruğunun süre dolumu).
+    """
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+# ============== SERVICE ==============
+
+class RenderService:
+    """
+    Sınırlı süreç havuzu üzerinde belge üretimi.
+
+    - Worker'lar başlangıçta açılır ve fontları yükler (warm)
+    - Aynı anda en fazla max_pending render kabul edilir; fazlası queue_timeout kadar bekler,
+      sonra RenderBusy fırlatır (backpressure)
+    - workers=0 ise veya havuz bozulursa render thread'de senkron çalışır
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None, queue_timeout: float = 10.0):
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or max(1, self.workers) * 4
+        self.queue_timeout = queue_timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._pending = 0
+        self.stats = {"pool": 0, "fallback": 0, "busy": 0, "errors": 0}
+
+    def start(self):
+        """Havuzu açar ve her worker'ı ısıtır (startup'ta çağrılır)."""
+        if self.workers <= 0 or self._pool is not None:
+            return
+        try:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker
+            )
+            for _ in range(self.workers):
+                self._pool.submit(_ping)
+        except Exception as e:
+            logger.warning("Render pool başlatılamadı, senkron üretim kullanılacak: %s", e)
+            self._pool = None
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def render(self, kind: str, data: dict, output: Optional[str] = None) -> Optional[bytes]:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_pending)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.stats["busy"] += 1
+            raise RenderBusy("Belge üretim kuyruğu dolu, lütfen biraz sonra tekrar deneyin")
+
+        self._pending += 1
+        try:
+            with timed("udf" if kind.startswith("udf") else "pdf_render", kind):
+                if self._pool is not None:
+                    try:
+                        result = await asyncio.wrap_future(self._pool.submit(_render, kind, data, output))
+                        self.stats["pool"] += 1
+                        return result
+                    except BrokenProcessPool as e:
+                        logger.warning("Render pool bozuldu, senkron üretime geçiliyor: %s", e)
+                        self._pool = None
+                self.stats["fallback"] += 1
+                return await asyncio.to_thread(_render, kind, data, output)
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self._pending -= 1
+            self._slots.release()
+
+    async def render_to_file(self, kind: str, data: dict, suffix: str = ".pdf") -> str:
+        """
+        Belgeyi geçici dosyaya üretir ve yolunu döner; API sürecinde belge bellekte tutulmaz.
+        Dosyayı silmek çağırana aittir.
+        """
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix="justlaw_render_")
+        os.close(fd)
+        try:
+            await self.render(kind, data, path)
+        except BaseException:
+            remove_file(path)
+            raise
+        return path
+
+    async def render_dilekce_pdf(self, data: dict) -> bytes:
+        return await self.render("dilekce_pdf", data)
+
+    async def render_sozlesme_pdf(self, data: dict) -> bytes:
+        return await self.render("sozlesme_pdf", data)
+
+    async def render_udf(self, data: dict) -> bytes:
+        return await self.render("udf", data)
+
+    def metrics(self) -> dict:
+        return {
+            **self.stats,
+            "workers": self.workers if self._pool is not None else 0,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+        }
+
+
+def _create_render_service() -> RenderService:
+    workers = os.getenv("RENDER_WORKERS")
+    max_pending = os.getenv("RENDER_MAX_PENDING")
+    return RenderService(
+        workers=int(workers) if workers else max(1, min(4, os.cpu_count() or 1)),
+        max_pending=int(max_pending) if max_pending else None
+    )
+
+
+# Singleton instance
+render_service = _create_render_service()
@@ -6,9 +6,14 @@ import httpx
 from bs4 import BeautifulSoup
 from typing import List, Dict, Optional
 import json
+import logging
 import os
 import time
 
+from services.instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
 class MevzuatScraper:
     """
     mevzuat.gov.tr sitesinden mevzuat verilerini çeker.
@@ -32,6 +37,7 @@ class MevzuatScraper:
         # TODO: mevzuat.gov.tr API veya scraping implementasyonu
         return kanunlar
     
+    @timed("scraper", "mevzuat")
     def get_kanun_detay(self, mevzuat_no: str) -> Optional[Dict]:
         """
         Belirli bir kanunun detaylarını çeker.
@@ -71,7 +77,7 @@ class MevzuatScraper:
             }
             
         except Exception as e:
-            print(f"Hata: {e}")
+            logger.warning("Hata: %s", e)
             return None
     
     def chunk_kanun(self, kanun: Dict, chunk_size: int = 1000) -> List[Dict]:
@@ -115,6 +121,7 @@ class YargitayScraper:
             }
         )
     
+    @timed("scraper", "yargitay")
     async def search_kararlar(self, query: str, limit: int = 50) -> List[Dict]:
         """
         Yargıtay kararları arasında arama yapar.
@@ -124,10 +131,10 @@ class YargitayScraper:
         
         try:
             # 1. Ana sayfaya gidip hidden inputları (tokenları) al
-            print("Yargıtay: Tokenlar alınıyor...")
+            logger.debug("Yargıtay: Tokenlar alınıyor...")
             init_response = await self.client.get(self.BASE_URL)
             if init_response.status_code != 200:
-                print(f"Yargıtay init failed: {init_response.status_code}")
+                logger.warning("Yargıtay init failed: %s", init_response.status_code)
                 return kararlar
 
             init_soup = BeautifulSoup(init_response.text, 'html.parser')
@@ -142,7 +149,7 @@ class YargitayScraper:
             form_data['aranan'] = query
             
             # 2. Arama isteği yap
-            print(f"Yargıtay: '{query}' aranıyor...")
+            logger.debug("Yargıtay: '%s' aranıyor...", query)
             search_url = f"{self.BASE_URL}/aramasonuc"
             
             # Referer header ekle (önemli olabilir)
@@ -154,11 +161,10 @@ class YargitayScraper:
             response = await self.client.post(search_url, data=form_data, headers=headers)
             
             if response.status_code != 200:
-                print(f"Yargıtay search failed: {response.status_code}")
+                logger.warning("Yargıtay search failed: %s", response.status_code)
                 return kararlar
             
-            # DEBUG PRINT
-            print(f"DEBUG RESPONSE: {response.text[:1000]}")
+            logger.debug("Yargıtay yanıtı: %s", response.text[:1000])
             
             soup = BeautifulSoup(response.text, 'html.parser')
             
@@ -210,11 +216,11 @@ class YargitayScraper:
                             kararlar.append(karar)
                             
                 except Exception as e:
-                    print(f"Error parsing result: {e}")
+                    logger.warning("Error parsing result: %s", e)
                     continue
                     
         except Exception as e:
-            print(f"Yargıtay search error: {e}")
+            logger.warning("Yargıtay search error: %s", e)
         
         return kararlar
 
@@ -274,6 +280,7 @@ class DanistayScraper:
             }
         )
     
+    @timed("scraper", "danistay")
     async def search_kararlar(self, query: str, limit: int = 20) -> List[Dict]:
         """Danıştay kararları arasında arama yapar."""
         kararlar = []
@@ -323,11 +330,11 @@ class DanistayScraper:
                                 kararlar.append(karar)
                                 
                     except Exception as e:
-                        print(f"Danıştay parse error: {e}")
+                        logger.warning("Danıştay parse error: %s", e)
                         continue
                         
         except Exception as e:
-            print(f"Danıştay search error: {e}")
+            logger.warning("Danıştay search error: %s", e)
         
         return kararlar
     
@@ -351,6 +358,7 @@ class AnayasaMahkemesiScraper:
             }
         )
     
+    @timed("scraper", "aym")
     async def search_kararlar(self, query: str, limit: int = 20) -> List[Dict]:
         """Anayasa Mahkemesi kararları arasında arama yapar."""
         kararlar = []
@@ -395,11 +403,11 @@ class AnayasaMahkemesiScraper:
                                 kararlar.append(karar)
                                 
                     except Exception as e:
-                        print(f"AYM parse error: {e}")
+                        logger.warning("AYM parse error: %s", e)
                         continue
                         
         except Exception as e:
-            print(f"AYM search error: {e}")
+            logger.warning("AYM search error: %s", e)
         
         return kararlar
     
@@ -423,6 +431,7 @@ class RekabetKurumuScraper:
             }
         )
     
+    @timed("scraper", "rekabet")
     async def search_kararlar(self, query: str, limit: int = 20) -> List[Dict]:
         """Rekabet Kurumu kararları arasında arama yapar."""
         kararlar = []
@@ -462,11 +471,11 @@ class RekabetKurumuScraper:
                                 kararlar.append(karar)
                                 
                     except Exception as e:
-                        print(f"Rekabet parse error: {e}")
+                        logger.warning("Rekabet parse error: %s", e)
                         continue
                         
         except Exception as e:
-            print(f"Rekabet search error: {e}")
+            logger.warning("Rekabet search error: %s", e)
         
         return kararlar
     
@@ -0,0 +1,256 @@
+"""
+JustLaw Structured Logging
+Kuyruk tabanlı, event loop'u bloklamayan JSON loglama:
+- İstek yolunda kayıt sadece kuyruğa atılır; biçimlendirme ve stdout yazımı ayrı thread'de yapılır
+- Her kayıtta istek kimliği (X-Request-ID) ve route bulunur
+- Route bazlı log seviyesi (ör. /api/payment=DEBUG, /api/health=WARNING)
+- Debug kayıtları (ör. scraper yanıt dökümleri) logger bazlı oranla örneklenir;
+  örnekleme istek kimliğine göre yapıldığından bir isteğin debug kayıtları ya tamamen ya hiç yazılır
+"""
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import zlib
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="")
+route_var: ContextVar[str] = ContextVar("route", default="")
+
+# LogRecord'un standart alanları; bunların dışındakiler (extra=...) JSON'a eklenir
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id", "route"}
+
+
+def parse_mapping(value: str) -> Dict[str, str]:
+    """'a=1,b=2' biçimindeki ortam değişkenini sözlüğe çevirir."""
+    result = {}
+    for item in (value or "").split(","):
+        if "=" in item:
+            key, _, val = item.partition("=")
+            result[key.strip()] = val.strip()
+    return result
+
+
+def _level(name: str) -> int:
+    level = logging.getLevelName(name.strip().upper())
+    if not isinstance(level, int):
+        raise ValueError(f"Geçersiz log seviyesi: {name}")
+    return level
+
+
+class ContextFilter(logging.Filter):
+    """Çağıran thread/task'taki istek kimliği ve route'u kayda yazar (listener thread'i bunları göremez)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        record.route = route_var.get()
+        return True
+
+
+class RouteLevelFilter(logging.Filter):
+    """En uzun eşleşen route önekinin seviyesini uygular; eşleşme yoksa varsayılan seviye."""
+
+    def __init__(self, default: int, routes: Dict[str, int]):
+        super().__init__()
+        self.default = default
+        # En uzun önek önce eşleşsin
+        self.routes: List[Tuple[str, int]] = sorted(routes.items(), key=lambda item: -len(item[0]))
+
+    def level_for(self, route: str) -> int:
+        for prefix, level in self.routes:
+            if route.startswith(prefix):
+                return level
+        return self.default
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= self.level_for(getattr(record, "route", ""))
+
+
+class SamplingFilter(logging.Filter):
+    """
+    DEBUG kayıtlarını logger öneki bazlı oranla örnekler (ör. services.scraper=0.01).
+    Daha yüksek seviyeler her zaman geçer.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates: List[Tuple[str, float]] = sorted(rates.items(), key=lambda item: -len(item[0]))
+        self.dropped = 0
+
+    def rate_for(self, name: str) -> float:
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + "."):
+                return rate
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        rate = self.rate_for(record.name)
+        if rate >= 1.0:
+            return True
+        request_id = getattr(record, "request_id", "")
+        if request_id:
+            sampled = zlib.crc32(request_id.encode("utf-8")) % 10000 < rate * 10000
+        else:
+            sampled = random.random() < rate
+        if not sampled:
+            self.dropped += 1
+        return sampled
+
+
+class JSONFormatter(logging.Formatter):
+    """Tek satır JSON: ts, level, logger, msg, request_id, route, extra alanlar, exc."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        if getattr(record, "request_id", ""):
+            entry["request_id"] = record.request_id
+        if getattr(record, "route", ""):
+            entry["route"] = record.route
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Geliştirme ortamı için okunabilir tek satır."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = ""
+        return super().format(record)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Kaydı sınırlı kuyruğa atar; kuyruk doluysa kayıt düşürülür ve sayılır (istek yolu hiç beklemez).
+    Mesaj argümanları ve traceback burada metne çevrilir, JSON biçimlendirme listener thread'inde yapılır.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LoggingPipeline:
+    """
+    Kök logger'a takılan kuyruk handler'ı ve stdout'a yazan listener thread'i.
+    Kök logger varsayılan seviyede kalır; route'a özel düşük seviyeler sadece uygulama
+    logger'larını (APP_LOGGERS) açar, üçüncü parti kütüphaneler (httpx, urllib3...) DEBUG üretmez.
+    """
+
+    APP_LOGGERS = ("justlaw", "services")
+
+    def __init__(self):
+        self.handler: Optional[NonBlockingQueueHandler] = None
+        self.listener: Optional[logging.handlers.QueueListener] = None
+        self.route_filter: Optional[RouteLevelFilter] = None
+        self.sampling_filter: Optional[SamplingFilter] = None
+        self._atexit_registered = False
+
+    def configure(
+        self,
+        level: str = "INFO",
+        fmt: str = "json",
+        route_levels: Optional[Dict[str, str]] = None,
+        sample_rates: Optional[Dict[str, str]] = None,
+        queue_size: int = 10000,
+        stream=None
+    ):
+        self.stop()
+        default = _level(level)
+        routes = {route: _level(value) for route, value in (route_levels or {}).items()}
+        self.route_filter = RouteLevelFilter(default, routes)
+        self.sampling_filter = SamplingFilter({name: float(rate) for name, rate in (sample_rates or {}).items()})
+
+        output = logging.StreamHandler(stream or sys.stdout)
+        output.setFormatter(JSONFormatter() if fmt == "json" else TextFormatter())
+
+        self.handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+        self.handler.addFilter(ContextFilter())
+        self.handler.addFilter(self.route_filter)
+        self.handler.addFilter(self.sampling_filter)
+
+        root = logging.getLogger()
+        for existing in [h for h in root.handlers if isinstance(h, NonBlockingQueueHandler)]:
+            root.removeHandler(existing)
+        root.addHandler(self.handler)
+        root.setLevel(default)
+        # Route seviyesi varsayılandan düşükse sadece uygulama logger'ları o seviyeye açılır;
+        # hangi kaydın yazılacağına route filtresi karar verir
+        lowest = min([default, *routes.values()])
+        for name in self.APP_LOGGERS:
+            logging.getLogger(name).setLevel(lowest if lowest < default else logging.NOTSET)
+
+        self.listener = logging.handlers.QueueListener(self.handler.queue, output, respect_handler_level=True)
+        self.listener.start()
+        if not self._atexit_registered:
+            # Kapanış hook'larının kayıtları da yazılsın diye listener en son, süreç çıkarken durur
+            atexit.register(self.stop)
+            self._atexit_registered = True
+
+    def stop(self):
+        """Kuyrukta kalan kayıtları yazar ve listener thread'ini durdurur."""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def metrics(self) -> dict:
+        if self.handler is None:
+            return {}
+        return {
+            "queued": self.handler.queue.qsize(),
+            "dropped_queue_full": self.handler.dropped,
+            "dropped_sampling": self.sampling_filter.dropped,
+        }
+
+
+def setup_logging():
+    """Ortam değişkenlerinden yapılandırır (LOG_LEVEL, LOG_FORMAT, LOG_ROUTE_LEVELS, LOG_SAMPLE_RATES)."""
+    logging_pipeline.configure(
+        level=os.getenv("LOG_LEVEL", "INFO"),
+        fmt=os.getenv("LOG_FORMAT", "json"),
+        route_levels=parse_mapping(os.getenv("LOG_ROUTE_LEVELS", "")),
+        sample_rates=parse_mapping(os.getenv("LOG_SAMPLE_RATES", "services.scraper=0.01")),
+        queue_size=int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+    )
+
+
+# Singleton instance
+logging_pipeline = LoggingPipeline()
@@ -0,0 +1,174 @@
+"""
+JustLaw Structured Output Service
+Gemini JSON modu ile tipli (Pydantic) yanıt üretimi
+"""
+from pydantic import BaseModel, Field, ValidationError, create_model
+from google.genai import types
+from typing import Dict, List, Optional, Set, Type
+import json
+import logging
+
+from services.instrumentation import record_llm_usage
+
+logger = logging.getLogger(__name__)
+
+
+class KararOzeti(BaseModel):
+    """Emsal karar özeti (Yargıtay, Danıştay, AYM, Rekabet)"""
+    source: str = Field("yargitay", description="Kaynak: yargitay, danistay, anayasa veya rekabet")
+    esas_no: str = Field(..., min_length=1, description="Esas numarası, örn: 2023/1234")
+    karar_no: str = Field(..., min_length=1, description="Karar numarası, örn: 2024/567")
+    daire: str = Field(..., min_length=1, description="Daire adı, örn: 9. Hukuk Dairesi")
+    tarih: str = Field(..., min_length=1, description="Karar tarihi, GG.AA.YYYY")
+    ozet: str = Field(..., min_length=1, description="Kararın kısa hukuki özeti (2-3 cümle)")
+    content: str = Field("", description="Detaylı gerekçe: dayanılan kanun maddeleri ve varılan sonuç")
+
+
+class MevzuatMaddesi(BaseModel):
+    """Kanun maddesi önerisi"""
+    mevzuat_no: str = Field(..., min_length=1, description="Kanun numarası")
+    baslik: str = Field(..., min_length=1, description="Kanun adı")
+    madde_no: str = Field(..., min_length=1, description="Madde numarası, örn: Madde 17")
+    icerik: str = Field(..., min_length=1, description="Madde içeriğinin özeti")
+
+
+class DilekceIcerigi(BaseModel):
+    """AI ile zenginleştirilmiş dilekçe alanları"""
+    konu: str = Field(..., min_length=1, description="Kısa ve net konu başlığı")
+    aciklamalar: str = Field(..., min_length=1, description="Numaralı açıklama maddeleri, maddeler arası boş satır")
+    talepler: str = Field(..., min_length=1, description="Sonuç ve istem maddeleri")
+
+
+class StructuredOutputError(Exception):
+    """Model yanıtı şemaya uygun hale getirilemedi."""
+
+
+class StructuredGenerator:
+    """
+    Gemini'den JSON modu ve response_schema ile yanıt alır, Pydantic ile doğrular.
+    Geçersiz alanlar için tüm yanıtı değil, sadece o alanları yeniden ister.
+    """
+
+    def __init__(self, client=None, model: str = "gemini-2.0-flash-exp", max_repairs: int = 1):
+        self.client = client
+        self.model = model
+        self.max_repairs = max_repairs
+
+    def generate(self, prompt: str, schema: Type[BaseModel]) -> BaseModel:
+        """Tek bir nesne üretir. Doğrulanamazsa StructuredOutputError fırlatır."""
+        results = self._generate(prompt, schema, many=False)
+        if not results:
+            raise StructuredOutputError(f"{schema.__name__} yanıtı doğrulanamadı")
+        return results[0]
+
+    def generate_list(self, prompt: str, schema: Type[BaseModel]) -> List[BaseModel]:
+        """Nesne listesi üretir. Onarılamayan öğeler sonuçtan çıkarılır."""
+        return self._generate(prompt, schema, many=True)
+
+    # ============== INTERNAL ==============
+
+    def _call(self, prompt: str, response_schema) -> str:
+        if not self.client:
+            raise StructuredOutputError("Gemini API yapılandırılmamış")
+        response = self.client.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                response_mime_type="application/json",
+                response_schema=response_schema
+            )
+        )
+        record_llm_usage(response, "structured")
+        return response.text or ""
+
+    def _generate(self, prompt: str, schema: Type[BaseModel], many: bool) -> List[BaseModel]:
+        # google-genai response_schema olarak typing.List kabul etmez; builtin list[...] gerekir
+        raw = self._call(prompt, list[schema] if many else schema)
+
+        try:
+            data = json.loads(raw)
+        except json.JSONDecodeError:
+            data = [] if many else {}
+
+        items = data if many and isinstance(data, list) else [data]
+        valid: Dict[int, BaseModel] = {}
+        pending: Dict[int, dict] = {}
+        invalid_fields: Dict[int, Set[str]] = {}
+
+        for i, item in enumerate(items):
+            item = item if isinstance(item, dict) else {}
+            model, fields = self._validate(schema, item)
+            if model is not None:
+                valid[i] = model
+            else:
+                pending[i] = item
+                invalid_fields[i] = fields
+
+        for _ in range(self.max_repairs):
+            if not pending:
+                break
+            self._repair(prompt, schema, pending, invalid_fields)
+            for i in list(pending):
+                model, fields = self._validate(schema, pending[i])
+                if model is not None:
+                    valid[i] = model
+                    del pending[i]
+                    del invalid_fields[i]
+                else:
+                    invalid_fields[i] = fields
+
+        if pending:
+            logger.warning("Structured output: %s %s öğesi onarılamadı", len(pending), schema.__name__)
+
+        return [valid[i] for i in sorted(valid)]
+
+    @staticmethod
+    def _validate(schema: Type[BaseModel], item: dict):
+        try:
+            return schema.model_validate(item), set()
+        except ValidationError as e:
+            fields = {str(err["loc"][0]) for err in e.errors() if err.get("loc")}
+            return None, fields or set(schema.model_fields)
+
+    def _repair(
+        self,
+        prompt: str,
+        schema: Type[BaseModel],
+        pending: Dict[int, dict],
+        invalid_fields: Dict[int, Set[str]]
+    ):
+        """Sadece geçersiz alanları tek bir çağrıda yeniden üretir ve yerinde birleştirir."""
+        fields = set().union(*invalid_fields.values())
+        repair_fields = {
+            name: (Optional[schema.model_fields[name].annotation], Field(None, description=schema.model_fields[name].description))
+            for name in fields if name in schema.model_fields
+        }
+        repair_schema = create_model(f"{schema.__name__}Onarim", index=(int, ...), **repair_fields)
+
+        eksikler = []
+        for i, item in pending.items():
+            mevcut = {k: v for k, v in item.items() if k not in invalid_fields[i]}
+            eksikler.append(
+                f"- index {i}: eksik/geçersiz alanlar {sorted(invalid_fields[i])}; "
+                f"mevcut veri: {json.dumps(mevcut, ensure_ascii=False)}"
+            )
+
+        repair_prompt = f"""{prompt}
+
+Önceki yanıtında bazı alanlar eksik veya geçersizdi. SADECE aşağıdaki öğelerin belirtilen alanlarını doldur,
+her öğe için aynı "index" değerini kullan:
+{chr(10).join(eksikler)}"""
+
+        try:
+            data = json.loads(self._call(repair_prompt, list[repair_schema]))
+        except Exception as e:
+            logger.warning("Structured output onarım hatası: %s", e)
+            return
+
+        for fix in data if isinstance(data, list) else []:
+            if not isinstance(fix, dict) or fix.get("index") not in pending:
+                continue
+            i = fix["index"]
+            for name in invalid_fields[i]:
+                if fix.get(name) not in (None, ""):
+                    pending[i][name] = fix[name]
@@ -0,0 +1,394 @@
+"""
+UYAP UDF Container
+UYAP editörünün .udf dosyaları content.xml ve ikili ekler içeren ZIP arşivleridir.
+Arşiv tembel açılır (sadece merkez dizini okunur), content.xml akışlı ayrıştırılır,
+ekler ihtiyaç halinde parça parça okunan akışlar olarak sunulur.
+"""
+from contextlib import nullcontext
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+import os
+import re
+import shutil
+import zipfile
+
+from services.udf_generator import (
+    StreamingXMLParser, UDFParser, UDFParseError, empty_udf_data, xml_writer, iter_split
+)
+
+
+CONTENT_XML = "content.xml"
+ZIP_MAGIC = b"PK\x03\x04"
+
+# UYAP paragraf hizalaması (javax.swing.text.StyleConstants)
+ALIGN_LEFT, ALIGN_CENTER, ALIGN_RIGHT, ALIGN_JUSTIFY = "0", "1", "2", "3"
+
+UYAP_FORMAT_ID = "1.8"
+UYAP_PAGE_FORMAT = {
+    "mediaSizeName": "1",
+    "leftMargin": "70.875",
+    "rightMargin": "70.875",
+    "topMargin": "70.875",
+    "bottomMargin": "70.875",
+    "paperOrientation": "1",
+    "headerFOffset": "20.0",
+    "footerFOffset": "20.0",
+}
+UYAP_STYLES = (
+    {"name": "default", "description": "Geçerli", "family": "Dialog", "size": "12",
+     "bold": "false", "italic": "false", "foreground": "-13421773"},
+    {"name": "hvl-default", "family": "Times New Roman", "size": "12", "description": "Gövde"},
+)
+
+_ROOT_TAG = re.compile(rb"<(?![?!])([A-Za-z_][\w.:-]*)")
+
+
+def is_zip(head: bytes) -> bool:
+    return head[:4] == ZIP_MAGIC
+
+
+def _java_length(text: str) -> int:
+    """UYAP ofsetleri Java (UTF-16) karakter sayısıdır."""
+    return len(text.encode("utf-16-le")) // 2
+
+
+# ============== OKUMA ==============
+
+class UYAPTemplateParser(StreamingXMLParser):
+    """
+    UYAP editör biçimi (kök <template>) için akışlı ayrıştırıcı.
+    Belge metni <template>/<content> içindedir; biçim öğeleri (paragraph, table, image...)
+    sadece ofset taşır ve atlanır. Paragraflar dilekçe iskeletindeki etiketlerle alanlara eşlenir.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        super().__init__(max_bytes)
+        self._depth = 0
+        self._in_content = False
+        self._has_content = False
+        self._text: List[str] = []
+        self._done = False
+
+    def _start(self, name: str, attrs: Dict):
+        tag = name.rpartition(" ")[2]
+        if self._depth == 0 and tag != "template":
+            raise self._error(f"Kök eleman <template> olmalı, <{tag}> bulundu")
+        if self._depth == 1 and tag == "content":
+            if self._has_content:
+                raise self._error("<content> elemanı <template> içinde birden fazla kez var")
+            self._in_content = self._has_content = True
+        self._depth += 1
+
+    def _chars(self, text: str):
+        if self._in_content:
+            self._text.append(text)
+
+    def _end(self, _name: str):
+        self._depth -= 1
+        self._in_content = False
+        if self._depth == 0:
+            self._done = True
+
+    def _finish(self) -> Dict:
+        if not self._done:
+            raise UDFParseError("UDF dosyası eksik: kök eleman kapanmadı")
+        if not self._has_content:
+            raise UDFParseError("UDF dosyasında <content> bölümü yok")
+
+        # UYAP her paragrafı tek satır sonu ile ayırır
+        text = "".join(self._text)
+        data = _map_paragraphs(line.strip() for line in iter_split(text, "\n"))
+        if data is None:
+            # Dilekçe iskeleti tanınmadı (UYAP editöründe serbest yazılmış belge): metnin tamamı
+            # açıklamalara, paragraflar boş satırla ayrılarak
+            data = empty_udf_data()
+            paragraphs = (line.strip() for line in iter_split(text, "\n"))
+            data["aciklamalar"] = "\n\n".join(line for line in paragraphs if line)
+        return data
+
+
+_NUMBERED = re.compile(r"^\d+[.-]\s*")
+
+
+def _layout_labels() -> Dict[str, str]:
+    """Dilekçe başlıklarını rol adına eşler (ör. 'DAVACI' -> 'davaci')."""
+    from services.pdf_generator import DILEKCE_LAYOUT
+
+    return {label: role for role, label in DILEKCE_LAYOUT.items()}
+
+
+def _map_paragraphs(lines: Iterable[str]) -> Optional[Dict]:
+    """
+    write_uyap_content'in yazdığı paragraf sırasını (_paragraphs) alanlara geri eşler:
+    ortalanmış ilk satır mahkeme, "ETİKET: değer" satırları taraf/konu alanları,
+    bölüm başlıklarından sonraki paragraflar açıklamalar/talepler/ekler.
+    İskelet tanınmazsa None döner.
+    """
+    labels = _layout_labels()
+    data = empty_udf_data()
+    aciklamalar: List[str] = []
+    talepler: List[str] = []
+    recognized = False
+    section = None
+    party = "davaci"
+
+    def value(text: str) -> str:
+        # Yazıcı boş alanları "..." ile doldurur
+        return "" if text == "..." else text
+
+    for line in lines:
+        if not line:
+            continue
+        label, sep, rest = line.partition(": ")
+        role = labels.get(label) if sep else None
+        heading = labels.get(line[:-1]) if line.endswith(":") else None
+
+        if not recognized and not data["mahkeme"] and role is None:
+            data["mahkeme"] = line
+        elif role in ("davaci", "davali"):
+            party = role
+            data[f"{role}_adi"] = value(rest)
+            section = None
+        elif sep and label == "TC" and section is None:
+            data["davaci_tc"] = value(rest)
+        elif sep and label == "ADRES" and section is None:
+            data[f"{party}_adres"] = value(rest)
+        elif sep and label == "KONU" and section is None:
+            data["konu"] = rest
+        elif heading in ("aciklamalar", "talepler"):
+            section = heading
+        elif line == "EKLER:":
+            section = "ekler"
+        elif sep and label == "Tarih":
+            section = "imza"
+        elif section == "aciklamalar":
+            aciklamalar.append(_NUMBERED.sub("", line, count=1))
+        elif section == "talepler":
+            talepler.append(line)
+        elif section == "ekler":
+            data["ekler"].append(_NUMBERED.sub("", line, count=1))
+        elif section == "imza" and role == "imzalayan":
+            pass
+        else:
+            aciklamalar.append(line)
+        recognized = recognized or role is not None or heading is not None
+
+    if not recognized:
+        return None
+    data["aciklamalar"] = "\n\n".join(aciklamalar)
+    data["talepler"] = "\n".join(talepler)
+    return data
+
+
+def parse_content(f: BinaryIO, max_bytes: int = 64 * 1024 * 1024, chunk_size: int = 64 * 1024) -> Dict:
+    """content.xml'i (veya çıplak UDF XML'ini) kök elemanına göre uygun ayrıştırıcıyla tek geçişte okur."""
+    head = f.read(chunk_size)
+    match = _ROOT_TAG.search(head)
+    root = match.group(1).rpartition(b":")[2] if match else b""
+    parser = UYAPTemplateParser(max_bytes) if root == b"template" else UDFParser(max_bytes)
+    parser.feed(head)
+    parser.feed_file(f, chunk_size)
+    return parser.close()
+
+
+class UDFAttachment:
+    __slots__ = ("name", "size", "compressed_size")
+
+    def __init__(self, name: str, size: int, compressed_size: int):
+        self.name = name
+        self.size = size
+        self.compressed_size = compressed_size
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "size": self.size, "compressed_size": self.compressed_size}
+
+
+class UDFContainer:
+    """
+    ZIP tabanlı UDF okuyucu. Açılışta sadece merkez dizini okunur;
+    content.xml ve ekler istendiğinde arşivden akış olarak açılır.
+    """
+
+    def __init__(self, source, max_members: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        try:
+            self._zip = zipfile.ZipFile(source)
+        except zipfile.BadZipFile as e:
+            raise UDFParseError(f"UDF arşivi bozuk: {e}") from None
+
+        infos = self._zip.infolist()
+        if len(infos) > max_members:
+            self._zip.close()
+            raise UDFParseError(f"UDF arşivinde çok fazla dosya var ({len(infos)})")
+        if CONTENT_XML not in self._zip.NameToInfo:
+            self._zip.close()
+            raise UDFParseError("UDF arşivinde content.xml yok")
+
+        self.attachments: List[UDFAttachment] = [
+            UDFAttachment(info.filename, info.file_size, info.compress_size)
+            for info in infos
+            if not info.is_dir() and info.filename != CONTENT_XML
+        ]
+
+    def parse(self) -> Dict:
+        """content.xml'i açıp akışlı ayrıştırır; arşivdeki ekler sonuçtaki ek listesine eklenir."""
+        try:
+            with self._zip.open(CONTENT_XML) as f:
+                data = parse_content(f, self.max_bytes)
+        except (zipfile.BadZipFile, zipfile.LargeZipFile, EOFError) as e:
+            raise UDFParseError(f"UDF arşivi okunamadı: {e}") from None
+        listed = set(data["ekler"])
+        data["ekler"] += [a.name for a in self.attachments if a.name not in listed]
+        return data
+
+    def open_attachment(self, name: str) -> BinaryIO:
+        """Eki parça parça okunabilen bir akış olarak açar (tamamı belleğe alınmaz)."""
+        if name == CONTENT_XML or name not in self._zip.NameToInfo:
+            raise KeyError(name)
+        return self._zip.open(name)
+
+    def iter_attachment(self, name: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        with self.open_attachment(name) as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    def close(self):
+        self._zip.close()
+
+    def __enter__(self) -> "UDFContainer":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ============== YAZMA ==============
+
+def _paragraphs(data: Dict) -> Iterator[Tuple[str, List[Tuple[str, bool]]]]:
+    """Dilekçeyi PDF ile aynı sırada (hizalama, [(metin, kalın)]) paragraflarına ayırır."""
+    from services.pdf_generator import DILEKCE_LAYOUT
+
+    layout = DILEKCE_LAYOUT
+    blank = (ALIGN_LEFT, [])
+
+    def field(key: str, default: str = "...") -> str:
+        return " ".join(str(data.get(key) or default).split())
+
+    yield ALIGN_CENTER, [(field("mahkeme", "... MAHKEMESİ HAKİMLİĞİNE").upper(), True)]
+    yield blank
+    yield ALIGN_LEFT, [(f"{layout['davaci']}: ", True), (field("davaci_adi"), False)]
+    yield ALIGN_LEFT, [("TC: ", True), (field("davaci_tc"), False)]
+    yield ALIGN_LEFT, [("ADRES: ", True), (field("davaci_adres"), False)]
+    yield blank
+    yield ALIGN_LEFT, [(f"{layout['davali']}: ", True), (field("davali_adi"), False)]
+    yield ALIGN_LEFT, [("ADRES: ", True), (field("davali_adres"), False)]
+    yield blank
+    yield ALIGN_LEFT, [("KONU: ", True), (field("konu", "Dava Konusu"), False)]
+    yield blank
+
+    yield ALIGN_LEFT, [(f"{layout['aciklamalar']}:", True)]
+    for i, para in enumerate(iter_split(data.get("aciklamalar") or "", "\n\n"), 1):
+        if para.strip():
+            yield ALIGN_JUSTIFY, [(f"{i}. {' '.join(para.split())}", False)]
+    yield blank
+
+    yield ALIGN_LEFT, [(f"{layout['talepler']}:", True)]
+    for talep in iter_split(data.get("talepler") or "", "\n"):
+        if talep.strip():
+            yield ALIGN_JUSTIFY, [(talep.strip(), False)]
+    yield blank
+
+    tarih = data.get("tarih") or datetime.now().strftime("%d/%m/%Y")
+    yield ALIGN_RIGHT, [(f"Tarih: {tarih}", False)]
+    yield ALIGN_RIGHT, [(f"{layout['imzalayan']}: {field('davaci_adi')}", False)]
+
+    ekler = [ek for ek in data.get("ekler") or [] if ek]
+    if ekler:
+        yield blank
+        yield ALIGN_LEFT, [("EKLER:", True)]
+        for i, ek in enumerate(ekler, 1):
+            yield ALIGN_LEFT, [(f"{i}- {ek}", False)]
+
+
+def write_uyap_content(data: Dict, out: BinaryIO):
+    """
+    UYAP editör biçiminde content.xml yazar.
+    Metin <content> içine paragraflar üretildikçe akıtılır; biçim öğeleri için sadece
+    (hizalama, uzunluk, kalın) üçlüleri tutulur, metnin ikinci kopyası oluşmaz.
+    """
+    layout: List[Tuple[str, List[Tuple[int, bool]]]] = []
+    with xml_writer(out) as xml:
+        xml.startDocument()
+        xml.startElement("template", {"format_id": UYAP_FORMAT_ID})
+
+        xml.startElement("content", {})
+        for alignment, runs in _paragraphs(data):
+            lengths = []
+            for text, bold in runs:
+                if text:
+                    xml.characters(text)
+                    lengths.append((_java_length(text), bold))
+            xml.characters("\n")
+            if lengths:
+                last_length, last_bold = lengths[-1]
+                lengths[-1] = (last_length + 1, last_bold)
+            else:
+                lengths.append((1, False))
+            layout.append((alignment, lengths))
+        xml.endElement("content")
+
+        xml.startElement("properties", {})
+        xml.startElement("pageFormat", UYAP_PAGE_FORMAT)
+        xml.endElement("pageFormat")
+        xml.endElement("properties")
+
+        xml.startElement("elements", {"resolver": "hvl-default"})
+        offset = 0
+        for alignment, lengths in layout:
+            xml.startElement("paragraph", {"Alignment": alignment})
+            for length, bold in lengths:
+                attrs = {"family": "Times New Roman", "size": "12"}
+                if bold:
+                    attrs["bold"] = "true"
+                attrs["startOffset"] = str(offset)
+                attrs["length"] = str(length)
+                xml.startElement("content", attrs)
+                xml.endElement("content")
+                offset += length
+            xml.endElement("paragraph")
+        xml.endElement("elements")
+
+        xml.startElement("styles", {})
+        for style in UYAP_STYLES:
+            xml.startElement("style", style)
+            xml.endElement("style")
+        xml.endElement("styles")
+
+        xml.endElement("template")
+        xml.endDocument()
+
+
+def write_udf_container(data: Dict, output, attachments: Iterable[Tuple[str, object]] = ()):
+    """
+    UYAP'a yüklenebilir ZIP tabanlı UDF yazar.
+
+    Args:
+        data: Dilekçe verileri (create_udf ile aynı alanlar)
+        output: Dosya yolu veya yazılabilir ikili dosya (seek gerekmez)
+        attachments: (arşivdeki ad, dosya yolu veya okunabilir ikili dosya) çiftleri;
+            parça parça kopyalanır, belleğe alınmaz
+    """
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        with archive.open(CONTENT_XML, "w") as f:
+            write_uyap_content(data, f)
+        for name, source in attachments:
+            if name == CONTENT_XML:
+                raise ValueError("Ek adı content.xml olamaz")
+            is_path = isinstance(source, (str, os.PathLike))
+            with (open(source, "rb") if is_path else nullcontext(source)) as src, \
+                    archive.open(name, "w", force_zip64=True) as dst:
+                shutil.copyfileobj(src, dst, 1024 * 1024)
+
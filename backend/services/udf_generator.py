@@ -2,10 +2,260 @@
 UYAP UDF Format Generator
 UYAP (Ulusal Yargı Ağı Projesi) için UDF formatında dilekçe oluşturma
 """
-import xml.etree.ElementTree as ET
+from contextlib import contextmanager
+from xml.parsers import expat
+from xml.sax.saxutils import XMLGenerator
 from datetime import datetime
-from typing import Dict, Optional
+from typing import BinaryIO, Dict, Iterator, List, Optional
 import io
+import os
+
+from services.instrumentation import timed
+
+
+class UDFParseError(ValueError):
+    """UDF bozuk XML içeriyor veya beklenen yapıya uymuyor."""
+
+    def __init__(self, message: str, line: Optional[int] = None, column: Optional[int] = None):
+        self.line = line
+        self.column = column
+        if line is not None:
+            message = f"{message} (satır {line}, sütun {column})"
+        super().__init__(message)
+
+
+# Eleman yolu -> izin verilen alt elemanlar. Burada olmayan elemanlar yaprak (sadece metin) kabul edilir.
+UDF_SCHEMA: Dict[str, frozenset] = {
+    "UDF": frozenset({"Metadata", "Dilekce", "Mahkeme", "Davaci", "Davali", "Icerik", "Ekler", "Imza"}),
+    "UDF/Metadata": frozenset({"OlusturmaTarihi", "Uygulama", "Versiyon"}),
+    "UDF/Dilekce": frozenset({"Tur", "TurAdi"}),
+    "UDF/Mahkeme": frozenset({"Ad", "Il", "Ilce"}),
+    "UDF/Davaci": frozenset({"AdSoyad", "TCKimlikNo", "Adres", "Telefon", "Eposta"}),
+    "UDF/Davali": frozenset({"AdSoyad", "Adres"}),
+    "UDF/Icerik": frozenset({"Konu", "Aciklamalar", "Talepler"}),
+    "UDF/Icerik/Aciklamalar": frozenset({"Madde"}),
+    "UDF/Icerik/Talepler": frozenset({"Talep"}),
+    "UDF/Ekler": frozenset({"Ek"}),
+    "UDF/Ekler/Ek": frozenset({"Ad", "Icerik"}),
+    "UDF/Imza": frozenset({"Tarih", "Imzalayan"}),
+}
+
+# Tekrarlanabilen elemanlar; diğerleri ebeveynleri içinde en fazla bir kez bulunur
+UDF_REPEATED = frozenset({"UDF/Icerik/Aciklamalar/Madde", "UDF/Icerik/Talepler/Talep", "UDF/Ekler/Ek"})
+
+UDF_REQUIRED = ("UDF/Icerik",)
+
+# Yaprak eleman yolu -> sonuç alanı
+UDF_FIELDS = {
+    "UDF/Dilekce/TurAdi": "dilekce_turu",
+    "UDF/Mahkeme/Ad": "mahkeme",
+    "UDF/Davaci/AdSoyad": "davaci_adi",
+    "UDF/Davaci/TCKimlikNo": "davaci_tc",
+    "UDF/Davaci/Adres": "davaci_adres",
+    "UDF/Davali/AdSoyad": "davali_adi",
+    "UDF/Davali/Adres": "davali_adres",
+    "UDF/Icerik/Konu": "konu",
+}
+
+# Gömülü ek içeriği (base64): ayrıştırılırken atlanır, bellekte biriktirilmez
+UDF_EMBEDDED = "UDF/Ekler/Ek/Icerik"
+
+
+def empty_udf_data() -> Dict:
+    return {
+        "mahkeme": "",
+        "davaci_adi": "",
+        "davaci_tc": "",
+        "davaci_adres": "",
+        "davali_adi": "",
+        "davali_adres": "",
+        "konu": "",
+        "aciklamalar": "",
+        "talepler": "",
+        "dilekce_turu": "",
+        "ekler": []
+    }
+
+
+class StreamingXMLParser:
+    """
+    Expat üzerinde parça parça beslenen ayrıştırıcı tabanı.
+    Alt sınıflar _start/_end/_chars ile sonucu doldurur ve _finish ile döner.
+    DTD/entity tanımları reddedilir; hatalar satır/sütun bilgisiyle UDFParseError olur.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._fed = 0
+        self._parser = expat.ParserCreate(namespace_separator=" ")
+        self._parser.buffer_text = True
+        self._parser.StartElementHandler = self._start
+        self._parser.EndElementHandler = self._end
+        self._parser.CharacterDataHandler = self._chars
+        self._parser.StartDoctypeDeclHandler = self._reject_doctype
+        self._parser.EntityDeclHandler = self._reject_doctype
+
+    def _error(self, message: str) -> UDFParseError:
+        return UDFParseError(message, self._parser.CurrentLineNumber, self._parser.CurrentColumnNumber + 1)
+
+    def _reject_doctype(self, *_args):
+        raise self._error("UDF içinde DTD/entity tanımına izin verilmez")
+
+    def _start(self, name: str, attrs: Dict):
+        raise NotImplementedError
+
+    def _end(self, name: str):
+        raise NotImplementedError
+
+    def _chars(self, text: str):
+        raise NotImplementedError
+
+    def _finish(self) -> Dict:
+        raise NotImplementedError
+
+    def feed(self, chunk: bytes):
+        self._fed += len(chunk)
+        if self._fed > self.max_bytes:
+            raise UDFParseError(f"UDF dosyası çok büyük (en fazla {self.max_bytes // (1024 * 1024)} MB)")
+        try:
+            self._parser.Parse(chunk, False)
+        except expat.ExpatError as e:
+            raise UDFParseError(f"Bozuk XML: {expat.errors.messages[e.code]}", e.lineno, e.offset + 1) from None
+
+    def feed_file(self, f: BinaryIO, chunk_size: int = 64 * 1024):
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            self.feed(chunk)
+
+    def close(self) -> Dict:
+        try:
+            self._parser.Parse(b"", True)
+        except expat.ExpatError as e:
+            if not self._fed:
+                raise UDFParseError("UDF dosyası boş") from None
+            raise UDFParseError(f"Bozuk XML: {expat.errors.messages[e.code]}", e.lineno, e.offset + 1) from None
+        return self._finish()
+
+
+class UDFParser(StreamingXMLParser):
+    """
+    JustLaw UDF şeması (kök <UDF>) için tek geçişli, akışlı ayrıştırıcı.
+
+    - Ağaç kurulmaz; alanlar eleman kapandıkça sonuca yazılır
+    - Gömülü ek içerikleri bellekte biriktirilmez
+    - UDF_SCHEMA'ya uymayan eleman, tekrar ve eksik bölümler satır/sütun bilgisiyle raporlanır
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        super().__init__(max_bytes)
+        self.data = empty_udf_data()
+        self._aciklamalar: List[str] = []
+        self._talepler: List[str] = []
+        self._path: List[str] = []
+        self._current = ""
+        self._seen: List[set] = []
+        self._found = set()
+        self._text: List[str] = []
+        self._done = False
+
+    def _start(self, name: str, attrs: Dict):
+        tag = name.rpartition(" ")[2]  # namespace varsa at
+        if not self._path:
+            if tag != "UDF":
+                raise self._error(f"Kök eleman <UDF> olmalı, <{tag}> bulundu")
+            path = "UDF"
+        else:
+            parent = self._current
+            allowed = UDF_SCHEMA.get(parent)
+            if allowed is None:
+                raise self._error(f"<{self._path[-1]}> metin elemanı, alt eleman <{tag}> içeremez")
+            if tag not in allowed:
+                raise self._error(f"<{self._path[-1]}> içinde beklenmeyen eleman <{tag}>")
+            path = f"{parent}/{tag}"
+            if path not in UDF_REPEATED:
+                if tag in self._seen[-1]:
+                    raise self._error(f"<{tag}> elemanı <{self._path[-1]}> içinde birden fazla kez var")
+                self._seen[-1].add(tag)
+            if "no" in attrs and not attrs["no"].isdigit():
+                raise self._error(f"<{tag}> no niteliği sayı olmalı: {attrs['no']!r}")
+
+        self._path.append(tag)
+        self._current = path
+        self._seen.append(set())
+        self._found.add(path)
+        self._text.clear()
+
+    def _chars(self, text: str):
+        path = self._current
+        if path == UDF_EMBEDDED:
+            return
+        if path in UDF_SCHEMA:
+            if text.strip():
+                raise self._error(f"<{self._path[-1]}> içinde eleman dışı metin olamaz")
+        else:
+            self._text.append(text)
+
+    def _end(self, _name: str):
+        path = self._current
+        text = "".join(self._text).strip()
+        self._text.clear()
+        self._path.pop()
+        self._current = path.rpartition("/")[0]
+        self._seen.pop()
+
+        field = UDF_FIELDS.get(path)
+        if field is not None:
+            self.data[field] = text
+        elif path == "UDF/Icerik/Aciklamalar/Madde":
+            if text:
+                self._aciklamalar.append(text)
+        elif path == "UDF/Icerik/Talepler/Talep":
+            if text:
+                self._talepler.append(text)
+        elif path == "UDF/Ekler/Ek/Ad":
+            if text:
+                self.data["ekler"].append(text)
+        elif path == "UDF":
+            self._done = True
+
+    def _finish(self) -> Dict:
+        if not self._done:
+            raise UDFParseError("UDF dosyası eksik: kök eleman kapanmadı")
+        for path in UDF_REQUIRED:
+            if path not in self._found:
+                raise UDFParseError(f"UDF dosyasında zorunlu <{path.rpartition('/')[2]}> bölümü yok")
+
+        self.data["aciklamalar"] = "\n\n".join(self._aciklamalar)
+        self.data["talepler"] = "\n".join(self._talepler)
+        return self.data
+
+
+@contextmanager
+def xml_writer(out: BinaryIO) -> Iterator[XMLGenerator]:
+    """
+    İkili out üzerinde XMLGenerator açar. Küçük yazımlar TextIOWrapper tamponunda birikip
+    parça parça UTF-8'e kodlanır; çıkışta tampon boşaltılır, out kapatılmaz.
+    """
+    text = io.TextIOWrapper(out, encoding="utf-8", errors="xmlcharrefreplace", newline="\n")
+    try:
+        yield XMLGenerator(text, encoding="utf-8", short_empty_elements=True)
+        text.flush()
+    finally:
+        text.detach()
+
+
+def iter_split(text: str, sep: str) -> Iterator[str]:
+    """str.split gibi, ama parçaları tek tek üretir (metnin ikinci bir kopyası listede tutulmaz)."""
+    start = 0
+    while True:
+        end = text.find(sep, start)
+        if end < 0:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + len(sep)
 
 
 class UDFGenerator:
@@ -32,9 +282,10 @@ class UDFGenerator:
         self.version = "1.0"
         self.encoding = "UTF-8"
     
-    def create_udf(self, data: Dict) -> bytes:
+    def create_udf(self, data: Dict, output=None) -> Optional[bytes]:
         """
         Dilekçe verilerinden UDF formatında XML dosyası oluşturur.
+        output (dosya yolu veya yazılabilir dosya) verilirse oraya akıtır ve None döner.
         
         Args:
             data: Dilekçe verileri içeren dictionary
@@ -51,171 +302,143 @@ class UDFGenerator:
                 - ekler: List[str] (opsiyonel)
         
         Returns:
-            UDF formatında XML bytes
+            UDF formatında XML bytes (output verilmediyse)
         """
+        if output is None:
+            buffer = io.BytesIO()
+            self.write_udf(data, buffer)
+            return buffer.getvalue()
+        if isinstance(output, (str, os.PathLike)):
+            with open(output, "wb") as f:
+                self.write_udf(data, f)
+        else:
+            self.write_udf(data, output)
+        return None
+    
+    def write_udf(self, data: Dict, out: BinaryIO):
+        """
+        UDF XML'ini ağaç kurmadan, elemanlar üretildikçe out'a (ikili dosya nesnesi) yazar.
+        Yüzlerce madde/ek olsa da belgenin tam kopyası (ElementTree + serileştirme tamponu) oluşmaz.
+        """
+        with xml_writer(out) as xml:
+            self._write(xml, data)
+    
+    def _write(self, xml, data: Dict):
+        """UDF elemanlarını SAX ContentHandler arayüzüyle (startElement/characters/endElement) sırayla üretir."""
+        def element(name: str, text=None, attrs: Optional[Dict] = None):
+            xml.startElement(name, attrs or {})
+            if text:
+                xml.characters(str(text))
+            xml.endElement(name)
+        
+        xml.startDocument()
         # Root element
-        root = ET.Element("UDF")
-        root.set("version", self.version)
-        root.set("xmlns", "http://www.uyap.gov.tr/udf")
+        xml.startElement("UDF", {"version": self.version, "xmlns": "http://www.uyap.gov.tr/udf"})
         
         # Metadata
-        meta = ET.SubElement(root, "Metadata")
-        ET.SubElement(meta, "OlusturmaTarihi").text = datetime.now().isoformat()
-        ET.SubElement(meta, "Uygulama").text = "JustLaw"
-        ET.SubElement(meta, "Versiyon").text = "1.0"
+        xml.startElement("Metadata", {})
+        element("OlusturmaTarihi", datetime.now().isoformat())
+        element("Uygulama", "JustLaw")
+        element("Versiyon", "1.0")
+        xml.endElement("Metadata")
         
         # Dilekçe bilgileri
-        dilekce = ET.SubElement(root, "Dilekce")
-        ET.SubElement(dilekce, "Tur").text = self.DILEKCE_TURLERI.get(
-            data.get("dilekce_turu", "genel"), "0"
-        )
-        ET.SubElement(dilekce, "TurAdi").text = data.get("dilekce_turu", "Genel Dilekçe")
+        xml.startElement("Dilekce", {})
+        element("Tur", self.DILEKCE_TURLERI.get(data.get("dilekce_turu", "genel"), "0"))
+        element("TurAdi", data.get("dilekce_turu", "Genel Dilekçe"))
+        xml.endElement("Dilekce")
         
         # Mahkeme bilgileri
-        mahkeme = ET.SubElement(root, "Mahkeme")
-        ET.SubElement(mahkeme, "Ad").text = data.get("mahkeme", "")
-        ET.SubElement(mahkeme, "Il").text = ""  # Opsiyonel
-        ET.SubElement(mahkeme, "Ilce").text = ""  # Opsiyonel
+        xml.startElement("Mahkeme", {})
+        element("Ad", data.get("mahkeme", ""))
+        element("Il")  # Opsiyonel
+        element("Ilce")  # Opsiyonel
+        xml.endElement("Mahkeme")
         
         # Davacı bilgileri
-        davaci = ET.SubElement(root, "Davaci")
-        ET.SubElement(davaci, "AdSoyad").text = data.get("davaci_adi", "")
-        ET.SubElement(davaci, "TCKimlikNo").text = data.get("davaci_tc", "")
-        ET.SubElement(davaci, "Adres").text = data.get("davaci_adres", "")
-        ET.SubElement(davaci, "Telefon").text = ""  # Opsiyonel
-        ET.SubElement(davaci, "Eposta").text = ""  # Opsiyonel
+        xml.startElement("Davaci", {})
+        element("AdSoyad", data.get("davaci_adi", ""))
+        element("TCKimlikNo", data.get("davaci_tc", ""))
+        element("Adres", data.get("davaci_adres", ""))
+        element("Telefon")  # Opsiyonel
+        element("Eposta")  # Opsiyonel
+        xml.endElement("Davaci")
         
         # Davalı bilgileri
-        davali = ET.SubElement(root, "Davali")
-        ET.SubElement(davali, "AdSoyad").text = data.get("davali_adi", "")
-        ET.SubElement(davali, "Adres").text = data.get("davali_adres", "")
+        xml.startElement("Davali", {})
+        element("AdSoyad", data.get("davali_adi", ""))
+        element("Adres", data.get("davali_adres", ""))
+        xml.endElement("Davali")
         
         # İçerik
-        icerik = ET.SubElement(root, "Icerik")
-        ET.SubElement(icerik, "Konu").text = data.get("konu", "")
+        xml.startElement("Icerik", {})
+        element("Konu", data.get("konu", ""))
         
         # Açıklamalar (maddeler halinde)
-        aciklamalar_elem = ET.SubElement(icerik, "Aciklamalar")
-        aciklamalar_text = data.get("aciklamalar", "")
-        
-        # Maddelere ayır
-        maddeler = aciklamalar_text.split("\n\n")
-        for i, madde in enumerate(maddeler, 1):
+        xml.startElement("Aciklamalar", {})
+        aciklamalar_text = data.get("aciklamalar") or ""
+        for i, madde in enumerate(iter_split(aciklamalar_text, "\n\n"), 1):
             if madde.strip():
-                madde_elem = ET.SubElement(aciklamalar_elem, "Madde")
-                madde_elem.set("no", str(i))
-                madde_elem.text = madde.strip()
+                element("Madde", madde.strip(), {"no": str(i)})
+        xml.endElement("Aciklamalar")
         
         # Talepler
-        talepler_elem = ET.SubElement(icerik, "Talepler")
-        talepler_text = data.get("talepler", "")
-        
-        talep_maddeler = talepler_text.split("\n")
-        for i, talep in enumerate(talep_maddeler, 1):
+        xml.startElement("Talepler", {})
+        talepler_text = data.get("talepler") or ""
+        for i, talep in enumerate(iter_split(talepler_text, "\n"), 1):
             if talep.strip() and not talep.strip().startswith("Yukarıda"):
-                talep_elem = ET.SubElement(talepler_elem, "Talep")
-                talep_elem.set("no", str(i))
-                talep_elem.text = talep.strip()
+                element("Talep", talep.strip(), {"no": str(i)})
+        xml.endElement("Talepler")
+        xml.endElement("Icerik")
         
         # Ekler
-        ekler_elem = ET.SubElement(root, "Ekler")
-        for ek in data.get("ekler", []):
-            ek_elem = ET.SubElement(ekler_elem, "Ek")
-            ET.SubElement(ek_elem, "Ad").text = ek
+        xml.startElement("Ekler", {})
+        for ek in data.get("ekler") or []:
+            xml.startElement("Ek", {})
+            element("Ad", ek)
+            xml.endElement("Ek")
+        xml.endElement("Ekler")
         
         # Tarih ve imza
-        imza = ET.SubElement(root, "Imza")
-        ET.SubElement(imza, "Tarih").text = datetime.now().strftime("%d.%m.%Y")
-        ET.SubElement(imza, "Imzalayan").text = data.get("davaci_adi", "")
+        xml.startElement("Imza", {})
+        element("Tarih", datetime.now().strftime("%d.%m.%Y"))
+        element("Imzalayan", data.get("davaci_adi", ""))
+        xml.endElement("Imza")
         
-        # XML string oluştur
-        tree = ET.ElementTree(root)
-        buffer = io.BytesIO()
-        tree.write(buffer, encoding="utf-8", xml_declaration=True)
-        
-        return buffer.getvalue()
+        xml.endElement("UDF")
+        xml.endDocument()
     
-    def parse_udf(self, udf_content: bytes) -> Dict:
+    @timed("udf", "parse")
+    def parse_udf(self, udf_content) -> Dict:
         """
-        UDF dosyasını parse eder ve dictionary olarak döndürür.
+        UDF dosyasını tek geçişte parse eder, yapıyı doğrular ve dictionary olarak döndürür.
+        ZIP tabanlı UYAP UDF'lerinde content.xml arşivden akış olarak okunur.
         
         Args:
-            udf_content: UDF XML içeriği bytes olarak
+            udf_content: UDF içeriği (bytes), seek edilebilir ikili dosya nesnesi veya dosya yolu
             
         Returns:
             Parse edilmiş dilekçe verisi dictionary
+        
+        Raises:
+            UDFParseError: XML bozuk veya UDF yapısına uymuyorsa (satır/sütun bilgisiyle)
         """
-        try:
-            root = ET.fromstring(udf_content)
-            
-            # Tüm verileri çıkar
-            data = {
-                "mahkeme": "",
-                "davaci_adi": "",
-                "davaci_tc": "",
-                "davaci_adres": "",
-                "davali_adi": "",
-                "davali_adres": "",
-                "konu": "",
-                "aciklamalar": "",
-                "talepler": "",
-                "dilekce_turu": "",
-                "ekler": []
-            }
-            
-            # Mahkeme
-            mahkeme_elem = root.find(".//Mahkeme/Ad")
-            if mahkeme_elem is not None:
-                data["mahkeme"] = mahkeme_elem.text or ""
-            
-            # Davacı
-            davaci = root.find(".//Davaci")
-            if davaci is not None:
-                data["davaci_adi"] = (davaci.find("AdSoyad").text or "") if davaci.find("AdSoyad") is not None else ""
-                data["davaci_tc"] = (davaci.find("TCKimlikNo").text or "") if davaci.find("TCKimlikNo") is not None else ""
-                data["davaci_adres"] = (davaci.find("Adres").text or "") if davaci.find("Adres") is not None else ""
-            
-            # Davalı
-            davali = root.find(".//Davali")
-            if davali is not None:
-                data["davali_adi"] = (davali.find("AdSoyad").text or "") if davali.find("AdSoyad") is not None else ""
-                data["davali_adres"] = (davali.find("Adres").text or "") if davali.find("Adres") is not None else ""
-            
-            # İçerik
-            icerik = root.find(".//Icerik")
-            if icerik is not None:
-                konu = icerik.find("Konu")
-                data["konu"] = konu.text or "" if konu is not None else ""
-                
-                # Açıklamalar
-                aciklama_maddeler = []
-                for madde in icerik.findall(".//Aciklamalar/Madde"):
-                    if madde.text:
-                        aciklama_maddeler.append(madde.text)
-                data["aciklamalar"] = "\n\n".join(aciklama_maddeler)
-                
-                # Talepler
-                talep_maddeler = []
-                for talep in icerik.findall(".//Talepler/Talep"):
-                    if talep.text:
-                        talep_maddeler.append(talep.text)
-                data["talepler"] = "\n".join(talep_maddeler)
-            
-            # Dilekçe türü
-            tur = root.find(".//Dilekce/TurAdi")
-            if tur is not None:
-                data["dilekce_turu"] = tur.text or ""
-            
-            # Ekler
-            for ek in root.findall(".//Ekler/Ek/Ad"):
-                if ek.text:
-                    data["ekler"].append(ek.text)
-            
-            return data
-            
-        except Exception as e:
-            print(f"UDF parse error: {e}")
-            return {}
+        from services.udf_container import UDFContainer, is_zip, parse_content
+        
+        if isinstance(udf_content, (bytes, bytearray, memoryview)):
+            udf_content = io.BytesIO(udf_content)
+        if isinstance(udf_content, (str, os.PathLike)):
+            with open(udf_content, "rb") as f:
+                return self.parse_udf(f)
+        
+        # UYAP editörünün ürettiği UDF'ler ZIP arşivi (content.xml + ekler), eskileri çıplak XML
+        position = udf_content.tell()
+        head = udf_content.read(4)
+        udf_content.seek(position)
+        if is_zip(head):
+            with UDFContainer(udf_content) as container:
+                return container.parse()
+        return parse_content(udf_content)
 
 
 # Singleton instance
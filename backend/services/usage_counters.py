@@ -0,0 +1,174 @@
+"""
+JustLaw Usage Counters
+Kullanıcı kullanım sayaçlarını (dilekçe, analiz sayısı) bellekte biriktirir ve
+Firestore'a zamanlayıcı ya da eşik dolunca toplu (batch) yazar
+"""
+from typing import Dict, Optional
+import asyncio
+import logging
+import os
+
+from services.instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+# Firestore tek batch'te en fazla 500 yazma kabul eder
+FIRESTORE_BATCH_LIMIT = 500
+
+# (user_id -> {alan: artış})
+Updates = Dict[str, Dict[str, int]]
+
+
+class FirestoreCounterBackend:
+    """Kalıcı katman: users/{user_id} dokümanlarına Increment ile toplu yazma."""
+
+    def __init__(self, collection: str = "users"):
+        self.collection = collection
+        self._db = None
+
+    def _client(self):
+        if self._db is None:
+            from firebase_admin import firestore
+            self._db = firestore.client()
+        return self._db
+
+    @timed("firestore", "users.increment")
+    def write(self, updates: Updates) -> Updates:
+        """
+        Artışları batch'ler halinde yazar. Batch başarısız olursa dokümanlar tek tek denenir:
+        olmayan kullanıcı dokümanı atlanır, geçici hatalar tekrar denenmek üzere geri döner.
+
+        Returns:
+            Yazılamayan artışlar
+        """
+        from firebase_admin import firestore
+
+        db = self._client()
+        failed: Updates = {}
+        items = list(updates.items())
+        for start in range(0, len(items), FIRESTORE_BATCH_LIMIT):
+            chunk = items[start:start + FIRESTORE_BATCH_LIMIT]
+            batch = db.batch()
+            for user_id, fields in chunk:
+                batch.update(
+                    db.collection(self.collection).document(user_id),
+                    {field: firestore.Increment(amount) for field, amount in fields.items()}
+                )
+            try:
+                batch.commit()
+                continue
+            except Exception as e:
+                logger.warning("Usage counters batch error, tek tek yazılıyor: %s", e)
+
+            for user_id, fields in chunk:
+                try:
+                    db.collection(self.collection).document(user_id).update(
+                        {field: firestore.Increment(amount) for field, amount in fields.items()}
+                    )
+                except Exception as e:
+                    if type(e).__name__ == "NotFound":
+                        logger.info("Usage counters: kullanıcı dokümanı yok (%s), atlandı", user_id)
+                    else:
+                        failed[user_id] = fields
+        return failed
+
+
+class UsageCounters:
+    """
+    İstek yolunda sadece bellekte (user_id, alan) sayacını artırır; ağ çağrısı yapmaz.
+
+    - Biriken artışlar flush_interval saniyede bir veya max_pending farklı sayaca ulaşınca
+      tek seferde, event loop dışında (thread) yazılır
+    - Yazılamayan artışlar kaybolmaz, bir sonraki flush'a eklenir
+    - Kapanışta kalan artışlar yazılır
+    """
+
+    def __init__(self, backend=None, flush_interval: float = 10.0, max_pending: int = 500):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: Updates = {}
+        self._size = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"increments": 0, "flushes": 0, "documents_written": 0, "requeued": 0, "errors": 0}
+
+    def increment(self, user_id: str, field: str, amount: int = 1):
+        if not user_id or user_id == "anonymous":
+            return
+        self.stats["increments"] += 1
+        self._add(user_id, field, amount)
+        if self._size >= self.max_pending and self._wake is not None:
+            self._wake.set()
+
+    def _add(self, user_id: str, field: str, amount: int):
+        fields = self._pending.setdefault(user_id, {})
+        if field not in fields:
+            self._size += 1
+        fields[field] = fields.get(field, 0) + amount
+
+    async def flush(self) -> int:
+        """Biriken artışları yazar; yazılan doküman sayısını döner."""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._pending or self.backend is None:
+                return 0
+            updates, self._pending, self._size = self._pending, {}, 0
+            try:
+                failed = await asyncio.to_thread(self.backend.write, updates)
+            except Exception as e:
+                logger.warning("Usage counters flush error: %s", e)
+                self.stats["errors"] += 1
+                failed = updates
+
+            self.stats["flushes"] += 1
+            self.stats["documents_written"] += len(updates) - len(failed)
+            if failed:
+                self.stats["requeued"] += len(failed)
+                for user_id, fields in failed.items():
+                    for field, amount in fields.items():
+                        self._add(user_id, field, amount)
+            return len(updates) - len(failed)
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            # Kapanışta iptal edilse de yazılmakta olan batch yarıda kalmaz
+            await asyncio.shield(self.flush())
+
+    def start(self):
+        if self._task is None:
+            self._wake = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Zamanlayıcıyı durdurur ve kalan artışları yazar."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def metrics(self) -> dict:
+        return {**self.stats, "pending_counters": self._size, "pending_users": len(self._pending)}
+
+
+def _create_usage_counters() -> UsageCounters:
+    return UsageCounters(
+        backend=FirestoreCounterBackend(),
+        flush_interval=float(os.getenv("USAGE_FLUSH_INTERVAL", "10")),
+        max_pending=int(os.getenv("USAGE_MAX_PENDING", "500"))
+    )
+
+
+# Singleton instance
+usage_counters = _create_usage_counters()
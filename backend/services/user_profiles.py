@@ -0,0 +1,251 @@
+"""
+JustLaw User Profiles
+users/{user_id} dokümanından plan/abonelik bilgisini TTL sınırlı LRU önbellekte tutar;
+istek başına plan ve kota kontrolü Firestore'a gitmeden yapılır
+"""
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Set
+import asyncio
+import logging
+import os
+import time
+
+from services.instrumentation import timed
+
+logger = logging.getLogger(__name__)
+
+
+# Plan limitleri (frontend/js/subscription.js PLANS ile aynı); None = sınırsız
+# llm_rate_per_minute/llm_burst: LLM zamanlayıcısındaki kullanıcı kovası; None = varsayılan
+PLAN_LIMITS: Dict[str, dict] = {
+    "trial": {
+        "questions_per_day": 5, "dilekce_per_month": 1, "sozlesme_per_month": 2,
+        "llm_rate_per_minute": 10, "llm_burst": 5,
+    },
+    "professional": {
+        "questions_per_day": None, "dilekce_per_month": 20, "sozlesme_per_month": 10,
+        "llm_rate_per_minute": 60, "llm_burst": 20,
+    },
+    "enterprise": {
+        "questions_per_day": None, "dilekce_per_month": None, "sozlesme_per_month": None,
+        "llm_rate_per_minute": 120, "llm_burst": 40,
+    },
+    "expired": {
+        "questions_per_day": 0, "dilekce_per_month": 0, "sozlesme_per_month": 0,
+        "llm_rate_per_minute": 5, "llm_burst": 3,
+    },
+}
+
+
+def _as_datetime(value) -> Optional[datetime]:
+    """Firestore Timestamp (DatetimeWithNanoseconds), datetime veya epoch saniyesini UTC datetime'a çevirir."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return None
+
+
+class UserProfile:
+    """
+    users/{user_id} dokümanının plan ile ilgili alanları.
+    load_error doluysa doküman okunamamıştır; exists=False "kullanıcı yok" anlamına gelmez.
+    """
+
+    __slots__ = ("user_id", "exists", "plan", "premium_end", "trial_end", "load_error")
+
+    def __init__(self, user_id: str, exists: bool, plan: str = "none",
+                 premium_end: Optional[datetime] = None, trial_end: Optional[datetime] = None,
+                 load_error: Optional[str] = None):
+        self.user_id = user_id
+        self.exists = exists
+        self.plan = plan
+        self.premium_end = premium_end
+        self.trial_end = trial_end
+        self.load_error = load_error
+
+    @classmethod
+    def from_document(cls, user_id: str, data: Optional[dict]) -> "UserProfile":
+        if data is None:
+            return cls(user_id, exists=False)
+        return cls(
+            user_id,
+            exists=True,
+            plan=data.get("plan") or "none",
+            premium_end=_as_datetime(data.get("premiumEndDate")),
+            trial_end=_as_datetime(data.get("trialEndDate")),
+        )
+
+    def effective_plan(self, now: Optional[datetime] = None) -> str:
+        """subscription.js getUserPlan ile aynı kural: aktif premium > aktif deneme > süresi dolmuş deneme."""
+        now = now or datetime.now(timezone.utc)
+        if self.premium_end and self.premium_end > now:
+            return self.plan
+        if self.plan == "trial" and self.trial_end:
+            return "trial" if self.trial_end > now else "expired"
+        return self.plan
+
+    def limits(self) -> Optional[dict]:
+        """Planın limitleri; tanımsız planlarda (free, none) None."""
+        return PLAN_LIMITS.get(self.effective_plan())
+
+    def to_dict(self) -> dict:
+        plan = self.effective_plan()
+        end = self.trial_end if plan in ("trial", "expired") else self.premium_end
+        return {
+            "plan": plan,
+            "end_date": end.isoformat() if end else None,
+            "limits": self.limits(),
+        }
+
+
+class FirestoreProfileBackend:
+    """Kalıcı katman: Firestore users/{user_id} dokümanı."""
+
+    def __init__(self, collection: str = "users"):
+        self.collection = collection
+        self._db = None
+
+    @timed("firestore", "users.get")
+    def load(self, user_id: str) -> Optional[dict]:
+        if self._db is None:
+            from firebase_admin import firestore
+            self._db = firestore.client()
+        snapshot = self._db.collection(self.collection).document(user_id).get()
+        return snapshot.to_dict() if snapshot.exists else None
+
+
+class _Entry:
+    __slots__ = ("profile", "expires_at")
+
+    def __init__(self, profile: UserProfile, expires_at: float):
+        self.profile = profile
+        self.expires_at = expires_at
+
+
+class UserProfileCache:
+    """
+    Kullanıcı profili için TTL sınırlı LRU önbellek.
+
+    - Miss'te profil Firestore'dan thread'de okunur; aynı kullanıcı için eşzamanlı
+      istekler tek okumayı bekler. lookup() beklemez, okumayı arka planda başlatır
+    - Okuma başarısız olursa eski kayıt (varsa) kısa süre daha kullanılır; yoksa load_error
+      işaretli boş profil error_ttl boyunca döner (Firestore kesintisinde okuma tekrarlanmaz)
+    - invalidate() kaydı ve devam eden okumayı geçersiz kılar (ör. ödeme sonrası plan değişimi)
+    """
+
+    def __init__(self, backend=None, max_entries: int = 10000, ttl: float = 300.0, error_ttl: float = 30.0):
+        self.backend = backend
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        # Süren okuma task'ları; referans tutulmazsa GC tarafından yarıda toplanabilir
+        self._tasks: Set[asyncio.Task] = set()
+        self._listeners: List[Callable[[str], None]] = []
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "errors": 0, "invalidations": 0}
+
+    async def get(self, user_id: str) -> Optional[UserProfile]:
+        if not user_id or user_id == "anonymous" or self.backend is None:
+            return None
+
+        entry = self._entries.get(user_id)
+        if entry is not None and entry.expires_at > time.monotonic():
+            self._entries.move_to_end(user_id)
+            self.stats["hits"] += 1
+            return entry.profile
+        self.stats["misses"] += 1
+        return await asyncio.shield(self._start_load(user_id))
+
+    def lookup(self, user_id: str) -> Optional[UserProfile]:
+        """
+        Beklemeden önbellekteki profili döner (süresi dolmuş olsa bile); kayıt yoksa veya
+        süresi dolmuşsa okumayı arka planda başlatır. İstek yolunda Firestore beklenmez.
+        """
+        if not user_id or user_id == "anonymous" or self.backend is None:
+            return None
+        entry = self._entries.get(user_id)
+        if entry is not None and entry.expires_at > time.monotonic():
+            self.stats["hits"] += 1
+            return entry.profile
+        self.stats["misses"] += 1
+        self._start_load(user_id)
+        return entry.profile if entry is not None else None
+
+    def peek(self, user_id: str) -> Optional[UserProfile]:
+        """Önbellekteki profili okuma yapmadan döner (süresi dolmuş olsa bile)."""
+        entry = self._entries.get(user_id)
+        return entry.profile if entry is not None else None
+
+    def invalidate(self, user_id: str):
+        self.stats["invalidations"] += 1
+        self._entries.pop(user_id, None)
+        # Devam eden okuma eski veriyi getirebilir; sonucu önbelleğe yazılmaz
+        self._loading.pop(user_id, None)
+        for listener in self._listeners:
+            listener(user_id)
+
+    def on_invalidate(self, listener: Callable[[str], None]):
+        self._listeners.append(listener)
+
+    def metrics(self) -> dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "size": len(self._entries),
+            "hit_ratio": round(self.stats["hits"] / lookups, 3) if lookups else None,
+        }
+
+    # ============== INTERNAL ==============
+
+    def _start_load(self, user_id: str) -> asyncio.Future:
+        """Kullanıcı için süren okumayı döner; yoksa başlatır (eşzamanlı istekler tek okumayı bekler)."""
+        future = self._loading.get(user_id)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._loading[user_id] = future
+            task = asyncio.create_task(self._load(user_id, future))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return future
+
+    async def _load(self, user_id: str, future: asyncio.Future):
+        self.stats["loads"] += 1
+        ttl = self.ttl
+        try:
+            data = await asyncio.to_thread(self.backend.load, user_id)
+            profile = UserProfile.from_document(user_id, data)
+        except Exception as e:
+            logger.warning("User profile load error (%s): %s", user_id, e)
+            self.stats["errors"] += 1
+            stale = self._entries.get(user_id)
+            profile = stale.profile if stale is not None else UserProfile(user_id, exists=False, load_error=str(e))
+            ttl = self.error_ttl
+
+        if self._loading.get(user_id) is future:
+            del self._loading[user_id]
+            self._put(user_id, profile, ttl)
+        if not future.done():
+            future.set_result(profile)
+
+    def _put(self, user_id: str, profile: UserProfile, ttl: float):
+        self._entries[user_id] = _Entry(profile, time.monotonic() + ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def _create_user_profile_cache() -> UserProfileCache:
+    return UserProfileCache(
+        backend=FirestoreProfileBackend(),
+        max_entries=int(os.getenv("USER_PROFILE_CACHE_SIZE", "10000")),
+        ttl=float(os.getenv("USER_PROFILE_TTL", "300"))
+    )
+
+
+# Singleton instance
+user_profile_cache = _create_user_profile_cache()
@@ -0,0 +1,21 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Testler backend klasöründen çalıştırılır: `python -m pytest`
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture(scope="session")
+def main_module():
+    """main.py'yi yükler; statik dosyalar "../frontend" göreli yolundan bağlandığı için backend klasöründen."""
+    cwd = os.getcwd()
+    os.chdir(BACKEND_DIR)
+    try:
+        return importlib.import_module("main")
+    finally:
+        os.chdir(cwd)
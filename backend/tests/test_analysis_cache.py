@@ -0,0 +1,43 @@
+"""
+AnalysisCache: metin içerik özetiyle paylaşılır; analiz kullanıcıya ve prompt sürümüne bağlıdır.
+"""
+from services.analysis_cache import AnalysisCache, content_digest
+
+
+def test_analysis_is_scoped_to_user_and_prompt_version():
+    cache = AnalysisCache()
+    digest = content_digest(b"sozlesme")
+    cache.put_analysis(digest, "v1", "u1", "rapor")
+
+    assert cache.get_analysis(digest, "v1", "u1") == "rapor"
+    # Aynı belgeyi yükleyen başka kullanıcı önceki analizi (ve yüklendiğini) görmez
+    assert cache.get_analysis(digest, "v1", "u2") is None
+    assert cache.get_analysis(digest, "v2", "u1") is None
+
+
+def test_anonymous_analyses_are_not_cached():
+    cache = AnalysisCache()
+    digest = content_digest(b"sozlesme")
+    cache.put_analysis(digest, "v1", "anonymous", "rapor")
+    assert cache.get_analysis(digest, "v1", "anonymous") is None
+    assert cache.metrics()["entries"] == 0
+
+
+def test_text_is_shared_and_respects_char_budget():
+    cache = AnalysisCache()
+    digest = content_digest(b"sozlesme")
+    cache.put_text(digest, "kısaltılmış metin", char_budget=100)
+
+    assert cache.get_text(digest, 100) == "kısaltılmış metin"
+    assert cache.get_text(digest, 1000) is None
+    assert cache.get_text(digest) is None
+
+
+def test_lru_evicts_oldest_entry_over_size_limit():
+    cache = AnalysisCache(max_chars=10)
+    cache.put_text("a", "12345")
+    cache.put_text("b", "12345")
+    cache.get_text("a")
+    cache.put_text("c", "12345")
+    assert cache.get_text("b") is None
+    assert cache.get_text("a") == "12345"
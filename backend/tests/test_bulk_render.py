@@ -0,0 +1,67 @@
+"""
+Bulk render: belgeler ZIP'e sırayla eklenir, geçici dosyalar silinir; üretilemeyen
+belgeler arşivi bozmaz, HATALAR.txt'de listelenir.
+"""
+import asyncio
+import io
+import os
+import zipfile
+
+from services.bulk_render import safe_filename, stream_zip
+from services.render_service import RenderService
+
+DATA = {"mahkeme": "Ankara 1. Asliye Hukuk Mahkemesine", "aciklamalar": "Açıklama", "talepler": "Talep"}
+
+
+class _Renderer(RenderService):
+    def __init__(self, tmp_path, fail=()):
+        super().__init__(workers=0, max_pending=4)
+        self.tmp_path = tmp_path
+        self.fail = set(fail)
+        self.paths = []
+
+    async def render_to_file(self, kind, data, suffix):
+        await asyncio.sleep(0)
+        if data["n"] in self.fail:
+            raise RuntimeError("şablon hatası")
+        path = self.tmp_path / f"belge{data['n']}{suffix}"
+        path.write_bytes(f"içerik {data['n']}".encode("utf-8"))
+        self.paths.append(path)
+        return str(path)
+
+
+def _collect(entries, renderer, window=None) -> zipfile.ZipFile:
+    async def scenario():
+        return b"".join([chunk async for chunk in stream_zip(entries, renderer, window)])
+
+    return zipfile.ZipFile(io.BytesIO(asyncio.run(scenario())))
+
+
+def test_failed_entries_are_listed_in_error_manifest(tmp_path):
+    renderer = _Renderer(tmp_path, fail={2})
+    entries = [(f"{n:03d}.pdf", "dilekce_pdf", {"n": n}) for n in range(1, 5)]
+    archive = _collect(entries, renderer, window=2)
+
+    assert archive.namelist() == ["001.pdf", "003.pdf", "004.pdf", "HATALAR.txt"]
+    assert archive.read("003.pdf") == "içerik 3".encode("utf-8")
+    assert archive.read("HATALAR.txt").decode("utf-8") == "002.pdf: şablon hatası"
+    assert archive.getinfo("001.pdf").compress_type == zipfile.ZIP_STORED
+    assert not any(os.path.exists(path) for path in renderer.paths)
+
+
+def test_archive_without_errors_has_no_manifest(tmp_path):
+    renderer = _Renderer(tmp_path)
+    archive = _collect([("001.udf", "udf", {"n": 1})], renderer)
+    assert archive.namelist() == ["001.udf"]
+    assert archive.getinfo("001.udf").compress_type == zipfile.ZIP_DEFLATED
+
+
+def test_real_render_produces_pdf_entries():
+    archive = _collect([("001.pdf", "dilekce_pdf", DATA)], RenderService(workers=0))
+    assert archive.read("001.pdf").startswith(b"%PDF")
+
+
+def test_safe_filename_transliterates_turkish():
+    assert safe_filename("Şükrü Öztürk / İş Davası") == "Sukru_Ozturk_Is_Davasi"
+    assert safe_filename("***") == "dilekce"
+    assert len(safe_filename("a" * 100)) == 60
@@ -0,0 +1,88 @@
+"""
+ConversationStore: prompt'a özet + pencereye sığan son turlar girer; taşan turlar arka planda
+özete katlanır, özetleme sırasında eklenen turlar kaybolmaz. Konuşma sadece sahibine döner.
+"""
+import asyncio
+
+import pytest
+
+from services.conversation_store import ConversationStore
+
+
+class _Backend:
+    def __init__(self):
+        self.saved = {}
+
+    def load(self, conversation_id):
+        return self.saved.get(conversation_id)
+
+    def save(self, conversation_id, data):
+        self.saved[conversation_id] = dict(data, turns=list(data["turns"]))
+
+
+def test_context_keeps_summary_and_recent_turns_within_window():
+    store = ConversationStore(window_tokens=60)
+    conv = store.create("c1", "u1")
+    conv.summary = "Kira artışı soruldu."
+
+    async def scenario():
+        for i in range(6):
+            await store.append(conv, f"Soru {i} " + "x" * 80, f"Yanıt {i} " + "y" * 80)
+
+    asyncio.run(scenario())
+    context = store.build_context(conv)
+    assert context.startswith("ÖNCEKİ KONUŞMA ÖZETİ:\nKira artışı soruldu.")
+    assert "Asistan: Yanıt 5" in context and "Soru 0" not in context
+
+
+def test_compact_folds_overflow_and_keeps_turns_added_meanwhile():
+    backend = _Backend()
+    store = ConversationStore(backend=backend, window_tokens=100)
+    conv = store.create("c1", "u1")
+    summarized = []
+
+    async def summarizer(summary, turns):
+        summarized.append([t["text"][:7] for t in turns])
+        # Özetleme sürerken yeni tur gelir
+        await store.append(conv, "Soru 9", "Yanıt 9")
+        return "  ÖZET  "
+
+    async def scenario():
+        for i in range(4):
+            await store.append(conv, f"Soru {i} " + "x" * 100, f"Yanıt {i} " + "y" * 100)
+        await store.schedule_compact(conv, summarizer)
+        await store.stop()
+
+    asyncio.run(scenario())
+    assert summarized == [["Soru 0 ", "Yanıt 0", "Soru 1 ", "Yanıt 1", "Soru 2 ", "Yanıt 2"]]
+    assert conv.summary == "ÖZET"
+    assert [t["text"][:7] for t in conv.turns] == ["Soru 3 ", "Yanıt 3", "Soru 9", "Yanıt 9"]
+    assert backend.saved["c1"]["summary"] == "ÖZET"
+    assert not store._tasks
+
+
+def test_failed_summary_keeps_turns():
+    store = ConversationStore(window_tokens=10)
+    conv = store.create("c1", "u1")
+
+    async def summarizer(summary, turns):
+        raise RuntimeError("Gemini kullanılamıyor")
+
+    async def scenario():
+        for i in range(3):
+            await store.append(conv, "x" * 100, "y" * 100)
+        await store.compact(conv, summarizer)
+
+    asyncio.run(scenario())
+    assert len(conv.turns) == 6 and conv.summary == ""
+
+
+def test_conversation_loaded_from_backend_only_for_owner():
+    backend = _Backend()
+    backend.saved["c1"] = {"user_id": "u1", "summary": "Özet", "turns": [], "updated": 0}
+    store = ConversationStore(backend=backend)
+
+    assert asyncio.run(store.get("c1", "u1")).summary == "Özet"
+    with pytest.raises(PermissionError):
+        asyncio.run(store.get("c1", "u2"))
+    assert asyncio.run(store.get("yok", "u1")) is None
@@ -0,0 +1,53 @@
+"""
+Dilekçe alanları: ayrı prompt'larla eşzamanlı üretilir; zaman aşımına uğrayan veya hata
+veren alan diğerlerini bekletmez ve sonuçtan çıkarılıp errors'ta raporlanır.
+"""
+import asyncio
+import time
+
+from fastapi import HTTPException
+
+
+def test_fields_are_generated_concurrently(main_module, monkeypatch):
+    prompts = []
+
+    async def fake_generate(prompt, priority=None, user_id=None, prefix=None):
+        prompts.append((prompt, prefix))
+        await asyncio.sleep(0.2)
+        return f"  {prompt.split(chr(10))[0][:20]}  "
+
+    monkeypatch.setattr(main_module, "generate_ai_content", fake_generate)
+    started = time.monotonic()
+    results, errors = asyncio.run(main_module.generate_dilekce_fields(
+        ["konu", "aciklamalar", "talepler", "konu"], {"konu": "Kira alacağı"}
+    ))
+
+    assert time.monotonic() - started < 0.5
+    assert set(results) == {"konu", "aciklamalar", "talepler"} and errors == {}
+    assert len(prompts) == 3 and all(prefix == "dilekce" for _, prefix in prompts)
+    assert all(value == value.strip() for value in results.values())
+
+
+def test_slow_and_failing_fields_return_partial_result(main_module, monkeypatch):
+    async def fake_generate(prompt, priority=None, user_id=None, prefix=None):
+        if prompt.startswith(main_module.DILEKCE_FIELD_PROMPTS["aciklamalar"]):
+            await asyncio.sleep(5)
+        if prompt.startswith(main_module.DILEKCE_FIELD_PROMPTS["talepler"]):
+            raise HTTPException(status_code=429, detail="Kota aşıldı")
+        return "Kira bedeli alacağı"
+
+    monkeypatch.setattr(main_module, "generate_ai_content", fake_generate)
+    results, errors = asyncio.run(main_module.generate_dilekce_fields(
+        ["konu", "aciklamalar", "talepler", "bilinmeyen"], {}, timeout=0.2
+    ))
+
+    assert results == {"konu": "Kira bedeli alacağı"}
+    assert errors == {
+        "aciklamalar": "Zaman aşımı", "talepler": "Kota aşıldı", "bilinmeyen": "Bilinmeyen alan"
+    }
+
+
+def test_bulk_template_prompt_keeps_placeholders(main_module):
+    prompt = main_module.build_field_prompt("aciklamalar", {"davaci_adi": "{davaci_adi}"})
+    assert "yer tutucuları olduğu gibi koru" in prompt
+    assert "yer tutucuları" not in main_module.build_field_prompt("aciklamalar", {"davaci_adi": "Ayşe"})
@@ -0,0 +1,91 @@
+"""
+MapReduceAnalyzer: tüm map çağrıları düşerse boş bulgularla rapor üretilmemeli; revize edilen
+belgede parçalama kararlı kalmalı ve değişmeyen parçaların bulguları tekrar kullanılmalı.
+"""
+import asyncio
+
+import pytest
+
+from services.document_analysis import (
+    ClauseHistory, DocumentAnalysisError, MapReduceAnalyzer, pack_chunks_stable, split_clauses
+)
+
+TEXT = "\n".join(f"MADDE {i} - " + "Kiracı kira bedelini her ayın ilk günü öder. " * 20 for i in range(1, 20))
+
+
+def test_all_chunks_failing_raises():
+    prompts = []
+
+    async def generate(prompt: str) -> str:
+        prompts.append(prompt)
+        raise RuntimeError("Gemini kullanılamıyor")
+
+    analyzer = MapReduceAnalyzer(chunk_chars=2000, history=ClauseHistory())
+    with pytest.raises(DocumentAnalysisError):
+        asyncio.run(analyzer.analyze(TEXT, generate, "FORMAT", "u1"))
+
+    # Reduce çağrısı yapılmadı, geçmişe boş sürüm yazılmadı
+    assert all("BÖLÜM NOTLARI" not in p for p in prompts)
+    assert "u1" not in analyzer.history._users
+
+
+def test_partial_failure_still_reduces():
+    calls = {"n": 0}
+
+    async def generate(prompt: str) -> str:
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise RuntimeError("geçici hata")
+        return "RAPOR" if "BÖLÜM NOTLARI" in prompt else "RİSK: -"
+
+    analyzer = MapReduceAnalyzer(chunk_chars=2000, concurrency=1)
+    assert asyncio.run(analyzer.analyze(TEXT, generate, "FORMAT")) == "RAPOR"
+
+
+def _clauses(edited: int = 0, inserted: bool = False):
+    clauses = [f"MADDE {i} - Kiracı {i}. yükümlülüğü her ay yerine getirir. " + "Ayrıntı metni. " * 30
+               for i in range(1, 40)]
+    if edited:
+        clauses[edited - 1] = clauses[edited - 1].replace("Kiracı", "Kiraya veren")
+    if inserted:
+        clauses.insert(20, "MADDE 20/A - Depozito iki aylık kira bedelidir. " + "Ek hüküm. " * 30)
+    return clauses
+
+
+def test_stable_chunking_localizes_edits():
+    base = pack_chunks_stable(_clauses(), 3000)
+    edited = pack_chunks_stable(_clauses(edited=30), 3000)
+    inserted = pack_chunks_stable(_clauses(inserted=True), 3000)
+
+    assert len(base) > 4
+    assert len(set(base) - set(edited)) == 1
+    # Araya eklenen madde sadece kendi parçasını (ve en fazla sonraki içerik sınırına kadarını) değiştirir
+    assert len(set(base) - set(inserted)) <= 2
+    assert "".join(base).replace("\n", "") == "".join(_clauses()).replace("\n", "")
+
+
+def test_revised_document_reuses_unchanged_findings():
+    map_prompts = []
+
+    async def generate(prompt: str) -> str:
+        if "BÖLÜM NOTLARI" in prompt:
+            return "RAPOR"
+        map_prompts.append(prompt)
+        return f"RİSK: bulgu {len(map_prompts)}"
+
+    analyzer = MapReduceAnalyzer(chunk_chars=3000, history=ClauseHistory())
+    first = "\n".join(_clauses())
+    revised = "\n".join(_clauses(edited=30))
+
+    assert asyncio.run(analyzer.analyze(first, generate, "FORMAT", "u1")) == "RAPOR"
+    total = len(map_prompts)
+    assert total == len(pack_chunks_stable(split_clauses(first), 3000))
+
+    asyncio.run(analyzer.analyze(revised, generate, "FORMAT", "u1"))
+    assert len(map_prompts) == total + 1
+    assert analyzer.stats == {"chunks_analyzed": total + 1, "chunks_reused": total - 1}
+
+    # Başka kullanıcının geçmişi kullanılmaz
+    asyncio.run(analyzer.analyze(revised, generate, "FORMAT", "u2"))
+    assert len(map_prompts) == 2 * total + 1
+
@@ -0,0 +1,103 @@
+"""
+Instrumentation: metrikler Prometheus metin formatında (kümülatif kovalar, etiket kaçışları)
+yazılır; timed hatalı çağrıları outcome="error" ile ayırır; /metrics toplayıcıları içerir.
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services import instrumentation as module
+from services.instrumentation import MetricsRegistry, record_llm_usage, timed
+
+
+def test_registry_renders_counters_gauges_and_histograms():
+    registry = MetricsRegistry(prefix="test")
+    requests = registry.counter("requests_total", "İstekler", ("route",))
+    in_flight = registry.gauge("in_flight", "Süren işler")
+    latency = registry.histogram("latency_seconds", "Gecikme", ("route",), buckets=(0.1, 1.0))
+
+    requests.inc(route='/api/"x"\n')
+    requests.inc(2, route='/api/"x"\n')
+    in_flight.inc()
+    in_flight.inc()
+    in_flight.dec()
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, route="/api/chat")
+
+    lines = registry.render().splitlines()
+    assert lines[:3] == [
+        "# HELP test_requests_total İstekler",
+        "# TYPE test_requests_total counter",
+        'test_requests_total{route="/api/\\"x\\"\\n"} 3',
+    ]
+    assert "test_in_flight 1" in lines
+    assert lines[-5:] == [
+        'test_latency_seconds_bucket{route="/api/chat",le="0.1"} 2',
+        'test_latency_seconds_bucket{route="/api/chat",le="1"} 3',
+        'test_latency_seconds_bucket{route="/api/chat",le="+Inf"} 4',
+        'test_latency_seconds_sum{route="/api/chat"} 3.65',
+        'test_latency_seconds_count{route="/api/chat"} 4',
+    ]
+    with pytest.raises(ValueError):
+        registry.counter("requests_total", "İkinci kayıt")
+
+
+def test_collectors_skip_missing_values_and_report_errors():
+    registry = MetricsRegistry(prefix="test")
+    registry.add_collector(lambda: [("cache_hit_ratio", "gauge", "Oran", [({"cache": "a"}, 0.5), ({"cache": "b"}, None)])])
+
+    def broken():
+        raise RuntimeError("servis yok")
+
+    registry.add_collector(broken)
+    assert registry.render().splitlines() == [
+        "# HELP test_cache_hit_ratio Oran",
+        "# TYPE test_cache_hit_ratio gauge",
+        'test_cache_hit_ratio{cache="a"} 0.5',
+        "# collector error: servis yok",
+    ]
+
+
+def test_timed_records_outcome_for_sync_and_async_calls():
+    labels = {"dependency": "test_dep", "target": "t"}
+
+    @timed("test_dep", "t")
+    async def ok():
+        return 1
+
+    @timed("test_dep", "t")
+    def fail():
+        raise RuntimeError("hata")
+
+    assert asyncio.run(ok()) == 1
+    with pytest.raises(RuntimeError):
+        fail()
+
+    assert module.DEPENDENCY_SECONDS.snapshot(**labels, outcome="ok")["count"] == 1
+    assert module.DEPENDENCY_SECONDS.snapshot(**labels, outcome="error")["count"] == 1
+    assert module.DEPENDENCY_IN_FLIGHT.value(dependency="test_dep") == 0
+
+
+def test_record_llm_usage_counts_tokens():
+    usage = SimpleNamespace(prompt_token_count=120, candidates_token_count=30, cached_content_token_count=None)
+    record_llm_usage(SimpleNamespace(usage_metadata=usage), "test_source")
+    record_llm_usage(SimpleNamespace(), "test_source")
+    assert module.LLM_TOKENS.value(source="test_source", kind="prompt") == 120
+    assert module.LLM_TOKENS.value(source="test_source", kind="output") == 30
+    assert module.LLM_TOKENS.value(source="test_source", kind="cached") == 0
+
+
+def test_metrics_endpoint_serves_prometheus_text(main_module):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(main_module.app)
+    client.get("/metrics")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert "# TYPE justlaw_http_request_duration_seconds histogram" in body
+    assert 'route="/metrics"' in body
+    assert "# TYPE justlaw_llm_queue_depth gauge" in body
+    assert "collector error" not in body
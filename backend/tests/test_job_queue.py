@@ -0,0 +1,101 @@
+"""
+JobQueue: geçici hatalar tekrar denenir, kalıcı hatalar denenmez; süresi dolan işler
+sonuç dosyalarıyla birlikte bellekten ve kalıcı katmandan silinir.
+"""
+import asyncio
+import os
+import time
+
+from services.job_queue import JobPermanentError, JobQueue, JobStatus, SQLiteJobBackend
+
+
+async def _wait_done(queue: JobQueue, job_id: str):
+    while not (await queue.get(job_id)).done:
+        await asyncio.sleep(0.01)
+    return await queue.get(job_id)
+
+
+def test_transient_errors_are_retried():
+    queue = JobQueue(workers=1, max_retries=2, retry_delay=0.01)
+    calls = []
+
+    async def flaky(job, report):
+        calls.append(job.attempts)
+        if len(calls) < 3:
+            raise RuntimeError("geçici hata")
+        job.result = {"ok": True}
+
+    async def scenario():
+        queue.start()
+        job = await _wait_done(queue, queue.submit("test", flaky).id)
+        await queue.stop()
+        return job
+
+    job = asyncio.run(scenario())
+    assert job.status == JobStatus.SUCCEEDED and job.result == {"ok": True}
+    assert calls == [1, 2, 3]
+    assert queue.stats["retried"] == 2
+
+
+def test_permanent_error_fails_without_retry():
+    queue = JobQueue(workers=1, max_retries=3, retry_delay=0.01)
+    finished = []
+
+    async def invalid(job, report):
+        raise JobPermanentError("Geçersiz dosya")
+
+    async def scenario():
+        queue.start()
+        job = await _wait_done(queue, queue.submit("test", invalid, on_finish=lambda: finished.append(1)).id)
+        await queue.stop()
+        return job
+
+    job = asyncio.run(scenario())
+    assert (job.status, job.attempts, job.error) == (JobStatus.FAILED, 1, "Geçersiz dosya")
+    assert finished == [1]
+
+
+def test_expired_job_removes_result_file(tmp_path):
+    backend = SQLiteJobBackend(str(tmp_path / "jobs.sqlite3"))
+    queue = JobQueue(workers=1, result_ttl=60, backend=backend)
+    result_path = tmp_path / "sonuc.pdf"
+
+    async def render(job, report):
+        result_path.write_bytes(b"%PDF-1.4")
+        job.file_path, job.file_name, job.media_type = str(result_path), "sonuc.pdf", "application/pdf"
+
+    async def scenario():
+        queue.start()
+        job = await _wait_done(queue, queue.submit("test", render).id)
+        await asyncio.sleep(0.05)
+        stored = backend.load(job.id)
+        assert stored.to_dict()["has_file"] and stored.file_path == str(result_path)
+
+        # TTL dolmadı: dosya yerinde
+        await queue._expire(time.time() - 60)
+        assert await queue.get(job.id) is not None and result_path.exists()
+
+        await queue._expire(time.time() + 1)
+        await queue.stop()
+        return job
+
+    job = asyncio.run(scenario())
+    assert not os.path.exists(result_path)
+    assert backend.load(job.id) is None
+
+
+def test_stop_without_backend_removes_result_files(tmp_path):
+    queue = JobQueue(workers=1)
+    result_path = tmp_path / "sonuc.pdf"
+
+    async def render(job, report):
+        result_path.write_bytes(b"%PDF-1.4")
+        job.file_path = str(result_path)
+
+    async def scenario():
+        queue.start()
+        await _wait_done(queue, queue.submit("test", render).id)
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert not result_path.exists()
@@ -0,0 +1,104 @@
+"""
+LLMScheduler: iptal edilen bekleyen istek, thread'de süren Gemini çağrısı bitmeden slotu bırakmamalı.
+"""
+import asyncio
+import threading
+import time
+
+from services.llm_scheduler import LLMDeadlineExceeded, LLMScheduler, Priority
+
+
+def test_cancelled_caller_keeps_slot_until_call_finishes():
+    scheduler = LLMScheduler(max_concurrency=2, reserved_interactive=0)
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow_call():
+        with lock:
+            running.append(1)
+            peak.append(len(running))
+        time.sleep(0.3)
+        with lock:
+            running.pop()
+        return "ok"
+
+    async def scenario():
+        # İki çağrı slotları doldurur; çağıranlar hemen vazgeçer ama thread'ler çalışmaya devam eder
+        for _ in range(2):
+            try:
+                await asyncio.wait_for(scheduler.run(slow_call, priority=Priority.INTERACTIVE), timeout=0.05)
+            except asyncio.TimeoutError:
+                pass
+        assert scheduler.metrics()["in_flight"] == 2
+
+        start = time.perf_counter()
+        assert await scheduler.run(slow_call, priority=Priority.INTERACTIVE) == "ok"
+        return time.perf_counter() - start
+
+    waited = asyncio.run(scenario())
+    assert max(peak) <= 2
+    # Üçüncü çağrı ilk ikisinin thread'i bitene kadar beklemeli (~0.25 sn) + kendi süresi (0.3 sn)
+    assert waited >= 0.45
+    assert scheduler.metrics()["in_flight"] == 0
+
+
+def test_token_refunded_when_cancelled_while_waiting_for_quota():
+    scheduler = LLMScheduler(max_concurrency=2, user_rate_per_minute=60, user_burst=1)
+
+    async def scenario():
+        assert await scheduler.run(lambda: "ok", user_id="u1") == "ok"
+        # Kova boş: ikinci çağrı ~1 sn token bekler, çağıran 0.1 sn sonra vazgeçer
+        try:
+            await asyncio.wait_for(scheduler.run(lambda: "ok", user_id="u1"), timeout=0.1)
+        except asyncio.TimeoutError:
+            pass
+        return scheduler._buckets["u1"].reserve()
+
+    # İade edilmeseydi bekleme ~1.9 sn olurdu
+    assert asyncio.run(scenario()) < 1.0
+
+
+def test_token_refunded_when_slot_deadline_passes():
+    scheduler = LLMScheduler(max_concurrency=1, reserved_interactive=0, user_rate_per_minute=6, user_burst=3)
+
+    def slow_call():
+        time.sleep(0.3)
+        return "ok"
+
+    async def scenario():
+        busy = asyncio.ensure_future(scheduler.run(slow_call, priority=Priority.INTERACTIVE))
+        await asyncio.sleep(0.01)
+        bucket_tokens = []
+        for _ in range(2):
+            try:
+                await scheduler.run(lambda: "ok", user_id="u1", timeout=0.05)
+            except LLMDeadlineExceeded:
+                pass
+            bucket_tokens.append(scheduler._buckets["u1"].tokens)
+        await busy
+        return bucket_tokens
+
+    tokens = asyncio.run(scenario())
+    # Slot alınamayan çağrılar kovadan düşmez
+    assert all(t >= 2.9 for t in tokens)
+    assert scheduler.metrics()["rejected"]["deadline"] == 2
+
+
+def test_bucket_follows_plan_limit_changes():
+    limits = {"u1": (120, 40)}
+    scheduler = LLMScheduler(user_rate_per_minute=30, user_burst=10, user_limits=lambda u: limits.get(u))
+
+    async def call():
+        return await scheduler.run(lambda: "ok", user_id="u1")
+
+    asyncio.run(call())
+    bucket = scheduler._buckets["u1"]
+    assert (bucket.rate, bucket.capacity) == (2.0, 40)
+
+    # Premium süresi doldu: profil TTL'i dolmadan bir sonraki çağrıda varsayılan kovaya iner
+    del limits["u1"]
+    asyncio.run(call())
+    assert scheduler._buckets["u1"] is bucket
+    assert (bucket.rate, bucket.capacity) == (0.5, 10)
+    assert bucket.tokens <= 10
@@ -0,0 +1,66 @@
+"""
+Payment queue: sadece pending/applied siparişler tekrar sayılır; failed sipariş
+yeni bildirimle yeniden açılıp uygulanabilmeli.
+"""
+import asyncio
+
+from services.payment_queue import PaymentQueue, PaymentStatus, SQLiteIdempotencyStore
+
+
+def test_claim_reopens_only_failed_orders():
+    store = SQLiteIdempotencyStore()
+    assert store.claim("o1", {"n": 1})
+    assert not store.claim("o1", {"n": 2})
+
+    store.mark("o1", PaymentStatus.FAILED, 6, "Firestore kullanılamıyor")
+    assert store.claim("o1", {"n": 3})
+    row = store.get("o1")
+    assert (row["status"], row["attempts"], row["error"]) == (PaymentStatus.PENDING, 0, None)
+    assert store.pending() == [("o1", {"n": 3}, 0)]
+
+    store.mark("o1", PaymentStatus.APPLIED, 1)
+    assert not store.claim("o1", {"n": 4})
+
+
+def test_failed_order_is_applied_on_redelivery():
+    queue = PaymentQueue(SQLiteIdempotencyStore(), max_retries=0, retry_delay=0.01)
+    outage = {"on": True}
+    applied = []
+
+    async def handler(order_id, payload):
+        if outage["on"]:
+            raise RuntimeError("geçici hata")
+        applied.append(order_id)
+
+    async def scenario():
+        queue.start(handler)
+        assert await queue.submit("o1", {})
+        await asyncio.sleep(0.05)
+        assert queue.store.get("o1")["status"] == PaymentStatus.FAILED
+
+        outage["on"] = False
+        assert await queue.submit("o1", {})
+        await asyncio.sleep(0.05)
+        assert not await queue.submit("o1", {})
+        await queue.stop()
+
+    asyncio.run(scenario())
+    assert applied == ["o1"]
+    assert queue.store.get("o1")["status"] == PaymentStatus.APPLIED
+    assert queue.stats["duplicates"] == 1
+
+
+def test_store_file_is_created_on_first_use(tmp_path):
+    path = tmp_path / "data" / "payments.sqlite3"
+    store = SQLiteIdempotencyStore(str(path))
+    assert not path.parent.exists()
+
+    assert store.claim("o1", {})
+    assert path.exists()
+    assert not SQLiteIdempotencyStore(str(path)).claim("o1", {})
+
+
+def test_invalid_signature_is_counted():
+    queue = PaymentQueue(SQLiteIdempotencyStore())
+    queue.record_invalid_signature()
+    assert queue.metrics()["invalid_signature"] == 1
@@ -0,0 +1,123 @@
+"""
+PDFTextExtractor: PDFium thread-safe değildir; to_thread'den eşzamanlı gelen inspect ve
+satır içi çıkarma çağrıları kilit altında sıralanmalı, metinler karışmamalı.
+Büyük belgeler süreç havuzunda sayfa gruplarıyla, sayfa sırası korunarak çıkarılır.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import io
+
+import pytest
+from reportlab.pdfgen import canvas
+
+from services import pdf_extractor as module
+from services.pdf_extractor import PDFTextExtractor
+
+
+def _make_pdf(path, label: str, pages: int = 3):
+    pdf = canvas.Canvas(str(path))
+    for i in range(pages):
+        pdf.drawString(72, 720, f"{label} sayfa {i + 1} kira bedeli her ay odenir")
+        pdf.showPage()
+    pdf.save()
+
+
+def test_concurrent_inline_extracts_are_serialized(tmp_path, monkeypatch):
+    paths = []
+    for n in range(6):
+        path = tmp_path / f"belge{n}.pdf"
+        _make_pdf(path, f"BELGE{n}")
+        paths.append(str(path))
+
+    active = []
+    peak = []
+    page_text = module._page_text
+
+    def tracked_page_text(document, index):
+        active.append(1)
+        peak.append(len(active))
+        try:
+            return page_text(document, index)
+        finally:
+            active.pop()
+
+    monkeypatch.setattr(module, "_page_text", tracked_page_text)
+    extractor = PDFTextExtractor(inline_max_pages=8)
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        results = list(pool.map(lambda p: extractor.extract(p), paths * 5))
+
+    for path, (text, pages) in zip(paths * 5, results):
+        label = path.rsplit("belge", 1)[1].split(".")[0]
+        assert pages == 3
+        assert text.count(f"BELGE{label} sayfa") == 3
+    assert max(peak) == 1
+    assert module._worker_reader == {}
+
+
+def test_scanned_pdf_rejected(tmp_path):
+    path = tmp_path / "bos.pdf"
+    pdf = canvas.Canvas(str(path))
+    pdf.showPage()
+    pdf.save()
+    with pytest.raises(module.ScannedPDFError):
+        PDFTextExtractor().extract(str(path))
+
+
+def test_pool_extraction_keeps_page_order(tmp_path):
+    path = tmp_path / "uzun.pdf"
+    _make_pdf(path, "UZUN", pages=11)
+    extractor = PDFTextExtractor(max_workers=2, batch_size=2, inline_max_pages=2)
+    try:
+        text, pages = extractor.extract(str(path))
+        assert extractor._pool is not None
+    finally:
+        extractor.shutdown()
+
+    assert pages == 11
+    positions = [text.index(f"UZUN sayfa {i} ") for i in range(1, 12)]
+    assert positions == sorted(positions)
+
+
+def test_char_budget_stops_extraction_early(tmp_path):
+    path = tmp_path / "uzun.pdf"
+    _make_pdf(path, "UZUN", pages=6)
+    text, pages = PDFTextExtractor(inline_max_pages=8).extract(str(path), char_budget=60)
+    assert pages < 6
+    assert "UZUN sayfa 1 " in text and "UZUN sayfa 6 " not in text
+
+
+def test_layout_normalization_joins_wrapped_lines():
+    text = (
+        "MADDE 1 - Kiracı kira bedelini her ayın ilk günü öde-\n"
+        "mekle yükümlüdür; gecikme halinde yasal faiz uygulanır\n"
+        "ve ihtar gönderilir.\n"
+        "MADDE 2 - Sözleşme süresi bir yıldır, yenilenebilir ve\n"
+        "a) taraflar yazılı olarak anlaşır"
+    )
+    assert module.normalize_layout(text).split("\n\n") == [
+        "MADDE 1 - Kiracı kira bedelini her ayın ilk günü ödemekle yükümlüdür; gecikme halinde yasal faiz uygulanır"
+        " ve ihtar gönderilir.",
+        "MADDE 2 - Sözleşme süresi bir yıldır, yenilenebilir ve",
+        "a) taraflar yazılı olarak anlaşır",
+    ]
+
+
+def test_spool_upload_streams_to_temp_file_with_digest():
+    class _Upload:
+        def __init__(self, data: bytes):
+            self.stream = io.BytesIO(data)
+
+        async def read(self, size: int = -1) -> bytes:
+            return self.stream.read(size)
+
+    data = b"%PDF-1.4 " * 100000
+    path, digest = asyncio.run(PDFTextExtractor.spool_upload(_Upload(data), chunk_size=4096, suffix=".udf"))
+    try:
+        assert path.endswith(".udf")
+        assert digest == hashlib.sha256(data).hexdigest()
+        with open(path, "rb") as f:
+            assert f.read() == data
+    finally:
+        module.os.remove(path)
@@ -0,0 +1,86 @@
+"""
+PDFGenerator: derlenmiş dilekçe şablonu thread başına bir kez kurulur; aynı metinler
+yeniden ölçülmez ve önbellekten gelen paragraflarla üretilen PDF'ler geçerli kalır.
+Fontlar süreç başına bir kez kaydedilir, stiller tüm üreticilerce paylaşılır.
+"""
+import io
+import threading
+
+from PyPDF2 import PdfReader
+
+from services import pdf_generator as module
+from services.pdf_generator import DILEKCE_LAYOUT, FontRegistry, MeasuredParagraph, PDFGenerator
+
+DATA = {
+    "mahkeme": "Ankara 3. İş Mahkemesi Hakimliğine",
+    "davaci_adi": "Ayşe Yılmaz",
+    "davali_adi": "Örnek Lojistik A.Ş.",
+    "konu": "Kıdem tazminatı",
+    "aciklamalar": "\n\n".join(f"Müvekkil {i}. dönemde çalışmıştır. " * 12 for i in range(1, 40)),
+    "talepler": "Davanın kabulüne karar verilmesini saygıyla arz ederim.",
+}
+
+
+def _text(pdf_bytes: bytes) -> str:
+    return "".join(page.extract_text() for page in PdfReader(io.BytesIO(pdf_bytes)).pages)
+
+
+def test_template_is_compiled_once_per_thread():
+    generator = PDFGenerator()
+    first = generator.template()
+    assert generator.template() is first
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(generator.template()))
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+
+
+def test_paragraphs_are_cached_by_text_and_style():
+    template = PDFGenerator().template()
+    paragraph = template.paragraph("KONU: Kira", "TurkishBody")
+    assert template.paragraph("KONU: Kira", "TurkishBody") is paragraph
+    assert template.paragraph("KONU: Kira", "TurkishRight") is not paragraph
+    assert isinstance(paragraph, MeasuredParagraph)
+
+
+def test_repeated_multi_page_renders_stay_identical():
+    generator = PDFGenerator()
+    texts = [_text(generator.create_dilekce({**DATA, "tarih": "01/01/2026"})) for _ in range(3)]
+    assert texts[0] == texts[1] == texts[2]
+    assert f"{DILEKCE_LAYOUT['davaci']}:" in texts[0] and f"{DILEKCE_LAYOUT['davali']}:" in texts[0]
+    assert "39. Müvekkil 39." in texts[0]
+
+
+def test_headings_do_not_depend_on_dilekce_turu():
+    generator = PDFGenerator()
+    text = _text(generator.create_dilekce({**DATA, "dilekce_turu": "Suç Duyurusu (Genel)", "tarih": "01/01/2026"}))
+    assert "DAVACI:" in text and "SONUÇ VE TALEP:" in text
+
+
+def test_font_registry_loads_once(monkeypatch):
+    registry = FontRegistry()
+    registrations = []
+    register = module.pdfmetrics.registerFont
+    monkeypatch.setattr(module.pdfmetrics, "registerFont", lambda font: registrations.append(font) or register(font))
+
+    assert registry.load() is registry
+    first = len(registrations)
+    registry.load()
+    assert len(registrations) == first
+    if registry.font_path:
+        assert registry.font_name == FontRegistry.FAMILY
+        assert registry.build_styles()["TurkishTitle"].fontName == registry.font_name_bold
+
+
+def test_font_registry_falls_back_to_helvetica(monkeypatch):
+    monkeypatch.setattr(module, "FONT_CANDIDATES", [("/yok/Font.ttf", "/yok/Font-Bold.ttf")])
+    monkeypatch.delenv("PDF_FONT_PATH", raising=False)
+    registry = FontRegistry().load()
+    assert (registry.font_name, registry.font_name_bold, registry.font_path) == ("Helvetica", "Helvetica-Bold", None)
+
+
+def test_generators_share_module_styles():
+    assert PDFGenerator().styles is PDFGenerator().styles is module.STYLES
+    assert PDFGenerator().font_name == module.font_registry.font_name
@@ -0,0 +1,83 @@
+"""
+PromptCacheManager: caches.create ağ çağrısı lock dışında ve önek başına tek sefer yapılmalı;
+model minimumunun altındaki önekler için önbellek hiç denenmemeli.
+"""
+import threading
+import time
+from types import SimpleNamespace
+
+from services.prompt_cache import PromptCacheManager
+
+
+class _Caches:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.created = []
+
+    def create(self, model, config):
+        self.created.append(config.display_name)
+        time.sleep(self.delay)
+        return SimpleNamespace(name=f"cachedContents/{config.display_name}")
+
+    def update(self, name, config):
+        pass
+
+
+class _Models:
+    def __init__(self, tokens: dict):
+        self.tokens = tokens
+        self.configs = []
+
+    def count_tokens(self, model, contents):
+        return SimpleNamespace(total_tokens=self.tokens[contents])
+
+    def generate_content(self, model, contents, config=None):
+        self.configs.append(config)
+        return SimpleNamespace(text="ok", usage_metadata=None)
+
+
+class _Client:
+    def __init__(self, tokens: dict, delay: float = 0.0):
+        self.caches = _Caches(delay)
+        self.models = _Models(tokens)
+
+
+def test_slow_create_does_not_block_other_prefixes():
+    client = _Client({"uzun": 5000, "diger": 5000}, delay=0.5)
+    manager = PromptCacheManager(client, "gemini-2.5-flash", wait_timeout=0.05)
+    manager.register("uzun", "uzun")
+    manager.register("diger", "diger")
+
+    creator = threading.Thread(target=manager.generate, args=("uzun", "soru"))
+    creator.start()
+    time.sleep(0.05)
+
+    # Aynı önek: ikinci create yapılmaz, kısa bekleyip system_instruction ile devam edilir
+    start = time.perf_counter()
+    manager.generate("uzun", "soru")
+    assert time.perf_counter() - start < 0.3
+    assert client.caches.created == ["justlaw-uzun"]
+    assert client.models.configs[-1].system_instruction == "uzun"
+
+    # Farklı önek "uzun"un create çağrısını beklemez (kendi create'i 0.5 sn sürer)
+    start = time.perf_counter()
+    manager.generate("diger", "soru")
+    assert time.perf_counter() - start < 0.9
+    creator.join()
+
+    manager.generate("uzun", "soru")
+    assert client.models.configs[-1].cached_content == "cachedContents/justlaw-uzun"
+    assert client.caches.created == ["justlaw-uzun", "justlaw-diger"]
+
+
+def test_prefix_below_minimum_is_never_cached():
+    client = _Client({"kisa": 300})
+    manager = PromptCacheManager(client, "gemini-2.5-flash")
+    manager.register("kisa", "kisa")
+
+    for _ in range(3):
+        manager.generate("kisa", "soru")
+
+    assert client.caches.created == []
+    assert all(config.system_instruction == "kisa" for config in client.models.configs)
+    assert manager.metrics()["prefixes"]["kisa"]["cacheable"] is False
@@ -0,0 +1,109 @@
+"""
+QueryPrewarmer: frekans sayımı (count-min sketch / top-K), TTL'li sonuç önbelleği ve boşta çalışma.
+"""
+import asyncio
+
+from services import query_prewarmer as module
+from services.query_prewarmer import CountMinSketch, QueryPrewarmer, SearchResultCache, TopKTracker
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_count_min_sketch_never_underestimates():
+    sketch = CountMinSketch(width=16, depth=3)
+    counts = {f"sorgu {i}": i % 5 + 1 for i in range(40)}
+    for key, count in counts.items():
+        for _ in range(count):
+            sketch.add(key)
+    for key, count in counts.items():
+        assert sketch.estimate(key) >= count
+
+    sketch.decay()
+    assert sketch.estimate("sorgu 4") >= counts["sorgu 4"] // 2
+
+
+def test_topk_keeps_most_frequent_queries():
+    tracker = TopKTracker(k=3)
+    for key, count in (("kira", 9), ("kıdem", 7), ("nafaka", 5), ("miras", 1), ("tapu", 2)):
+        for _ in range(count):
+            tracker.add(key)
+    assert [key for key, _ in tracker.top(3)] == ["kira", "kıdem", "nafaka"]
+
+    tracker.decay()
+    assert [key for key, _ in tracker.top(1)] == ["kira"]
+
+
+def test_record_normalizes_query_spelling():
+    prewarmer = QueryPrewarmer()
+    prewarmer.record("yargitay", "  İşe  İADE ", 10)
+    prewarmer.record("yargitay", "işe iade", 10)
+    assert prewarmer.tracker.top(1)[0][1] == 2
+
+
+def test_result_cache_ttl_expiry(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(module.time, "monotonic", clock)
+    cache = SearchResultCache(ttl=60)
+    cache.set("k", {"total": 1})
+
+    clock.now += 30
+    assert cache.get("k") == {"total": 1}
+    assert cache.is_fresh("k") and not cache.is_fresh("k", margin=40)
+
+    clock.now += 31
+    assert cache.get("k") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_warm_once_runs_only_when_idle(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(module.time, "monotonic", clock)
+    prewarmer = QueryPrewarmer(idle_seconds=10, max_calls_per_cycle=2)
+    warmed = []
+
+    async def warmer(query, limit):
+        warmed.append(query)
+        return {"total": 1, "results": [query]}
+
+    prewarmer.register("yargitay", warmer)
+    for query in ("kira", "kira", "kira", "tahliye", "tahliye", "miras"):
+        prewarmer.record("yargitay", query, 10)
+
+    # İstek sürüyor: hiç ısıtma yapılmaz
+    prewarmer.request_started()
+    clock.now += 60
+    assert not prewarmer.is_idle()
+    assert asyncio.run(prewarmer.warm_once()) == 0
+
+    # İstek bitti ama idle_seconds dolmadı
+    prewarmer.request_finished()
+    clock.now += 5
+    assert asyncio.run(prewarmer.warm_once()) == 0
+
+    # Boşta: en popüler sorgular, tur başına çağrı sınırı kadar
+    clock.now += 10
+    assert asyncio.run(prewarmer.warm_once()) == 2
+    assert warmed == ["kira", "tahliye"]
+    assert prewarmer.record("yargitay", "kira", 10) == {"total": 1, "results": ["kira"]}
+
+
+def test_warm_once_stops_at_wall_clock_budget(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(module.time, "monotonic", clock)
+    prewarmer = QueryPrewarmer(idle_seconds=0, max_calls_per_cycle=10, cycle_budget_seconds=5)
+
+    async def slow_warmer(query, limit):
+        clock.now += 3
+        return {"total": 1}
+
+    prewarmer.register("mevzuat", slow_warmer)
+    for query in ("a", "b", "c", "d"):
+        prewarmer.record("mevzuat", query, 10)
+
+    assert asyncio.run(prewarmer.warm_once()) == 2
@@ -0,0 +1,111 @@
+"""
+RenderService: belgeler ısıtılmış süreç havuzunda üretilir, bekleyen render sınırı aşılınca
+RenderBusy ile reddedilir, havuz bozulursa senkron üretime geçilir. Geçici dosyayı yanıt
+bitince yalnızca BackgroundTask siler (tek sahip); başarısız render geçici dosya bırakmaz.
+"""
+import asyncio
+import os
+
+import pytest
+from starlette.applications import Starlette
+from starlette.background import BackgroundTask
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from services import render_service as module
+from services.render_service import RenderBusy, RenderService, iter_file
+
+DATA = {"mahkeme": "Ankara 1. Asliye Hukuk Mahkemesine", "aciklamalar": "Açıklama", "talepler": "Talep"}
+
+
+def test_iter_file_streams_chunks_without_deleting(tmp_path):
+    path = tmp_path / "belge.pdf"
+    path.write_bytes(b"x" * 10)
+    assert list(iter_file(str(path), chunk_size=4)) == [b"xxxx", b"xxxx", b"xx"]
+    assert path.exists()
+
+
+def test_background_task_is_the_only_cleanup_owner(tmp_path):
+    path = tmp_path / "belge.pdf"
+    path.write_bytes(b"%PDF-1.4 " * 1000)
+    removed = []
+    remove_file = module.remove_file
+
+    def tracked_remove(p):
+        removed.append(p)
+        remove_file(p)
+
+    async def download(request):
+        return StreamingResponse(iter_file(str(path), chunk_size=1024),
+                                 background=BackgroundTask(tracked_remove, str(path)))
+
+    with TestClient(Starlette(routes=[Route("/", download)])) as client:
+        assert client.get("/").content == b"%PDF-1.4 " * 1000
+    assert removed == [str(path)]
+    assert not path.exists()
+
+
+def test_render_to_file_removes_partial_output_on_error(monkeypatch):
+    created = []
+    mkstemp = module.tempfile.mkstemp
+
+    def tracked_mkstemp(**kwargs):
+        fd, path = mkstemp(**kwargs)
+        created.append(path)
+        return fd, path
+
+    monkeypatch.setattr(module.tempfile, "mkstemp", tracked_mkstemp)
+    service = RenderService(workers=0)
+    with pytest.raises(ValueError):
+        asyncio.run(service.render_to_file("bilinmeyen", {}))
+    assert created and not os.path.exists(created[0])
+    assert service.stats["errors"] == 1
+
+
+def test_pool_renders_pdf_and_udf_to_file(tmp_path):
+    service = RenderService(workers=1)
+    service.start()
+    try:
+        pdf = asyncio.run(service.render_dilekce_pdf(DATA))
+        output = tmp_path / "dilekce.udf"
+        assert asyncio.run(service.render("udf_uyap", DATA, str(output))) is None
+    finally:
+        service.shutdown()
+
+    assert pdf.startswith(b"%PDF")
+    assert output.read_bytes()[:2] == b"PK"
+    assert service.stats["pool"] == 2 and service.stats["fallback"] == 0
+
+
+def test_pending_limit_rejects_with_render_busy(monkeypatch):
+    service = RenderService(workers=0, max_pending=1, queue_timeout=0.05)
+
+    def slow_render(kind, data, output=None):
+        import time
+        time.sleep(0.3)
+        return b"%PDF"
+
+    monkeypatch.setattr(module, "_render", slow_render)
+
+    async def scenario():
+        return await asyncio.gather(
+            service.render_dilekce_pdf(DATA), service.render_dilekce_pdf(DATA), return_exceptions=True
+        )
+
+    first, second = asyncio.run(scenario())
+    assert first == b"%PDF" and isinstance(second, RenderBusy)
+    assert service.stats["busy"] == 1 and service.metrics()["pending"] == 0
+
+
+def test_broken_pool_falls_back_to_sync_render():
+    class _BrokenPool:
+        def submit(self, *args):
+            raise module.BrokenProcessPool("worker öldü")
+
+    service = RenderService(workers=1)
+    service._pool = _BrokenPool()
+    pdf = asyncio.run(service.render_dilekce_pdf(DATA))
+    assert pdf.startswith(b"%PDF")
+    assert service._pool is None and service.stats["fallback"] == 1
+    assert service.metrics()["workers"] == 0
@@ -0,0 +1,80 @@
+"""
+Structured logging: route bazlı DEBUG sadece uygulama logger'larını açar; kök logger ve
+üçüncü parti kütüphaneler varsayılan seviyede kalır. Örnekleme istek kimliğine göre tutarlıdır.
+"""
+import io
+import json
+import logging
+
+import pytest
+
+from services.structured_logging import (
+    LoggingPipeline, SamplingFilter, parse_mapping, route_var
+)
+
+
+@pytest.fixture
+def pipeline():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    pipeline = LoggingPipeline()
+    yield pipeline
+    pipeline.stop()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+    for name in LoggingPipeline.APP_LOGGERS:
+        logging.getLogger(name).setLevel(logging.NOTSET)
+
+
+def _emit(logger_name: str, route: str, message: str):
+    token = route_var.set(route)
+    try:
+        logging.getLogger(logger_name).debug(message)
+    finally:
+        route_var.reset(token)
+
+
+def test_route_debug_level_does_not_enable_third_party_loggers(pipeline):
+    stream = io.StringIO()
+    pipeline.configure(level="INFO", route_levels={"/api/payment": "DEBUG"}, stream=stream)
+
+    assert logging.getLogger().level == logging.INFO
+    assert not logging.getLogger("httpx").isEnabledFor(logging.DEBUG)
+    assert logging.getLogger("services.payment_queue").isEnabledFor(logging.DEBUG)
+
+    _emit("services.payment_queue", "/api/payment/shopier/callback", "ödeme ayrıntısı")
+    _emit("services.payment_queue", "/api/chat", "sohbet ayrıntısı")
+    _emit("httpx", "/api/payment/shopier/callback", "kütüphane ayrıntısı")
+    pipeline.stop()
+
+    messages = [json.loads(line)["msg"] for line in stream.getvalue().splitlines()]
+    assert messages == ["ödeme ayrıntısı"]
+
+
+def test_reconfigure_resets_app_logger_levels(pipeline):
+    pipeline.configure(level="INFO", route_levels={"/api/payment": "DEBUG"}, stream=io.StringIO())
+    pipeline.configure(level="WARNING", stream=io.StringIO())
+    assert logging.getLogger("justlaw").getEffectiveLevel() == logging.WARNING
+    assert logging.getLogger().level == logging.WARNING
+
+
+def test_sampling_is_consistent_per_request():
+    sampler = SamplingFilter({"services.scraper": 0.5})
+    decisions = {}
+    for request_id in (f"istek-{i}" for i in range(200)):
+        records = [logging.LogRecord("services.scraper.yargitay", logging.DEBUG, "", 0, "x", None, None)
+                   for _ in range(3)]
+        for record in records:
+            record.request_id = request_id
+        decisions[request_id] = {sampler.filter(record) for record in records}
+
+    assert all(len(d) == 1 for d in decisions.values())
+    kept = sum(d == {True} for d in decisions.values())
+    assert 50 < kept < 150
+    assert sampler.rate_for("services.scraperx") == 1.0
+
+
+def test_parse_mapping():
+    assert parse_mapping(" /api/payment = DEBUG ,bozuk, /api/health=WARNING") == {
+        "/api/payment": "DEBUG", "/api/health": "WARNING"
+    }
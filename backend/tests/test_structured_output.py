@@ -0,0 +1,64 @@
+"""
+StructuredGenerator: response_schema'lar google-genai SDK'sının kendi dönüşümünden
+(_transformers.t_schema) geçebilmeli; aksi halde istek gönderilmeden ValueError alınır.
+"""
+import json
+
+import pytest
+from google import genai
+from google.genai import _transformers
+
+from services.structured_output import KararOzeti, MevzuatMaddesi, StructuredGenerator
+
+
+class _Response:
+    def __init__(self, text: str):
+        self.text = text
+        self.usage_metadata = None
+
+
+class _Models:
+    """generate_content'i SDK'nın şema dönüşümünü çalıştırarak taklit eder."""
+
+    def __init__(self, api_client, replies):
+        self.api_client = api_client
+        self.replies = list(replies)
+        self.schemas = []
+
+    def generate_content(self, model, contents, config):
+        self.schemas.append(_transformers.t_schema(self.api_client, config.response_schema))
+        return _Response(json.dumps(self.replies.pop(0), ensure_ascii=False))
+
+
+class _Client:
+    def __init__(self, replies):
+        self.models = _Models(genai.Client(api_key="test").models._api_client, replies)
+
+
+KARAR = {
+    "esas_no": "2023/1", "karar_no": "2024/2", "daire": "9. Hukuk Dairesi",
+    "tarih": "01.02.2024", "ozet": "Özet", "content": "Gerekçe",
+}
+
+
+@pytest.mark.parametrize("schema", [KararOzeti, MevzuatMaddesi])
+def test_list_schema_converts(schema):
+    client = _Client([[]])
+    assert StructuredGenerator(client).generate_list("prompt", schema) == []
+    assert client.models.schemas[0].type == "ARRAY"
+
+
+def test_generate_list_returns_items():
+    client = _Client([[KARAR, KARAR]])
+    items = StructuredGenerator(client).generate_list("prompt", KararOzeti)
+    assert [item.esas_no for item in items] == ["2023/1", "2023/1"]
+
+
+def test_repair_schema_converts_and_fills_invalid_fields():
+    broken = {**KARAR, "ozet": ""}
+    client = _Client([[KARAR, broken], [{"index": 1, "ozet": "Onarılmış özet"}]])
+    items = StructuredGenerator(client).generate_list("prompt", KararOzeti)
+
+    assert len(client.models.schemas) == 2
+    assert client.models.schemas[1].type == "ARRAY"
+    assert [item.ozet for item in items] == ["Özet", "Onarılmış özet"]
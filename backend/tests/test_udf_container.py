@@ -0,0 +1,56 @@
+"""
+UYAP UDF: write_udf_container ile yazılan dilekçe, okunurken alanlarına geri ayrılmalı.
+"""
+import io
+
+from services.udf_container import UDFContainer, write_udf_container
+from services.udf_generator import udf_generator
+
+DATA = {
+    "mahkeme": "ANKARA 3. İŞ MAHKEMESİ HAKİMLİĞİNE",
+    "davaci_adi": "Ayşe Yılmaz",
+    "davaci_tc": "12345678901",
+    "davaci_adres": "Çankaya / Ankara",
+    "davali_adi": "Örnek Lojistik A.Ş.",
+    "davali_adres": "Yenimahalle / Ankara",
+    "konu": "Kıdem ve ihbar tazminatı alacağı",
+    "aciklamalar": "Müvekkil 2019-2024 yılları arasında çalışmıştır.\n\n"
+                   "İş akdi haklı neden olmaksızın feshedilmiştir.\n\n"
+                   "4857 sayılı Kanun'un 17. maddesi gereğince ihbar süresi verilmemiştir.",
+    "talepler": "Yukarıda açıklanan nedenlerle;\n1. Davanın KABULÜNE,\n2. Yargılama giderlerinin davalıya yükletilmesine,",
+    "ekler": ["Bordro", "Fesih bildirimi"],
+}
+
+
+def _round_trip(data: dict) -> dict:
+    buffer = io.BytesIO()
+    write_udf_container(data, buffer)
+    buffer.seek(0)
+    with UDFContainer(buffer) as container:
+        return container.parse()
+
+
+def test_uyap_round_trip_restores_fields():
+    parsed = _round_trip({**DATA, "dilekce_turu": "Kıdem Tazminatı Dilekçesi"})
+
+    for key in ("mahkeme", "davaci_adi", "davaci_tc", "davaci_adres", "davali_adi",
+                "davali_adres", "konu", "aciklamalar", "talepler", "ekler"):
+        assert parsed[key] == DATA[key], key
+
+
+def test_empty_party_fields_round_trip_as_empty():
+    parsed = _round_trip({"mahkeme": "İSTANBUL 1. SULH HUKUK MAHKEMESİNE", "konu": "Tespit",
+                          "aciklamalar": "Tek paragraf.", "talepler": "Kabulüne"})
+    assert parsed["davaci_adi"] == parsed["davali_adres"] == ""
+    assert parsed["aciklamalar"] == "Tek paragraf."
+    assert parsed["talepler"] == "Kabulüne"
+
+
+def test_free_form_uyap_document_goes_to_aciklamalar():
+    content = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<template format_id="1.8"><content>Serbest metin\nİkinci paragraf\n</content></template>'
+    ).encode("utf-8")
+    parsed = udf_generator.parse_udf(content)
+    assert parsed["aciklamalar"] == "Serbest metin\n\nİkinci paragraf"
+    assert parsed["mahkeme"] == ""
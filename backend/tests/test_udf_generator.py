@@ -0,0 +1,116 @@
+"""
+UDFGenerator: XML ağaç kurulmadan akış olarak yazılır; bayt, dosya yolu ve dosya nesnesi
+çıktıları aynı belgeyi üretir ve parse_udf ile alanlarına geri ayrılır. Bozuk XML ve
+şemaya uymayan yapılar satır/sütun bilgisiyle UDFParseError olarak reddedilir.
+"""
+import io
+import zipfile
+
+import pytest
+
+from services.udf_generator import UDFParseError, iter_split, udf_generator
+
+DATA = {
+    "mahkeme": "ANKARA 3. İŞ MAHKEMESİ HAKİMLİĞİNE",
+    "davaci_adi": "Ayşe Yılmaz",
+    "davaci_tc": "12345678901",
+    "davaci_adres": "Çankaya / Ankara",
+    "davali_adi": "Örnek Lojistik A.Ş.",
+    "davali_adres": "Yenimahalle / Ankara",
+    "konu": "Kıdem tazminatı <alacağı> & faizi",
+    "aciklamalar": "Birinci paragraf.\n\nİkinci paragraf.",
+    "talepler": "Yukarıda açıklanan nedenlerle;\nDavanın KABULÜNE,\nYargılama giderlerinin davalıya yükletilmesine,",
+    "dilekce_turu": "dava",
+    "ekler": ["Bordro", "Fesih bildirimi"],
+}
+
+
+def test_streamed_udf_round_trips_fields():
+    content = udf_generator.create_udf(DATA)
+    assert content.startswith(b'<?xml version="1.0" encoding="utf-8"?>')
+    assert b"&lt;alaca" in content
+
+    parsed = udf_generator.parse_udf(content)
+    for key in ("mahkeme", "davaci_adi", "davaci_tc", "davaci_adres", "davali_adi",
+                "davali_adres", "konu", "aciklamalar", "ekler"):
+        assert parsed[key] == DATA[key], key
+    assert parsed["talepler"] == "Davanın KABULÜNE,\nYargılama giderlerinin davalıya yükletilmesine,"
+
+
+def test_output_path_and_file_object(tmp_path):
+    path = tmp_path / "dilekce.udf"
+    buffer = io.BytesIO()
+    assert udf_generator.create_udf(DATA, str(path)) is None
+    assert udf_generator.create_udf(DATA, buffer) is None
+    assert not buffer.closed
+
+    assert udf_generator.parse_udf(str(path)) == udf_generator.parse_udf(buffer.getvalue())
+
+
+def test_many_paragraphs_are_numbered_in_order():
+    aciklamalar = "\n\n".join(f"Madde metni {i}" for i in range(1, 501))
+    content = udf_generator.create_udf({**DATA, "aciklamalar": aciklamalar})
+    assert content.count(b"<Madde ") == 500
+    assert b'<Madde no="500">Madde metni 500</Madde>' in content
+    assert udf_generator.parse_udf(content)["aciklamalar"] == aciklamalar
+
+
+def test_iter_split_matches_str_split():
+    for text in ("", "a", "a\n\nb", "\n\na\n\n\n\nb\n\n"):
+        assert list(iter_split(text, "\n\n")) == text.split("\n\n")
+
+
+def _udf(body: str) -> bytes:
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n<UDF version="1.0">\n{body}\n</UDF>'.encode("utf-8")
+
+
+@pytest.mark.parametrize("content, message", [
+    (b"", "UDF dosyası boş"),
+    (_udf("<Icerik><Konu>Kira</Icerik>"), "Bozuk XML"),
+    (b"<Belge><Icerik/></Belge>", "Kök eleman <UDF> olmalı"),
+    (_udf("<Icerik/><Gizli/>"), "beklenmeyen eleman <Gizli>"),
+    (_udf("<Icerik><Konu>Kira<b>x</b></Konu></Icerik>"), "metin elemanı"),
+    (_udf("<Mahkeme><Ad>A</Ad><Ad>B</Ad></Mahkeme><Icerik/>"), "birden fazla kez"),
+    (_udf('<Icerik><Aciklamalar><Madde no="bir">x</Madde></Aciklamalar></Icerik>'), "no niteliği sayı olmalı"),
+    (_udf("<Icerik>serbest metin</Icerik>"), "eleman dışı metin"),
+    (_udf("<Mahkeme/>"), "zorunlu <Icerik> bölümü yok"),
+    (b'<!DOCTYPE UDF [<!ENTITY x "y">]><UDF><Icerik/></UDF>', "DTD/entity"),
+])
+def test_schema_violations_raise_parse_error(content, message):
+    with pytest.raises(UDFParseError, match=message):
+        udf_generator.parse_udf(content)
+
+
+def test_parse_error_reports_line_and_column():
+    with pytest.raises(UDFParseError) as info:
+        udf_generator.parse_udf(_udf("<Icerik/>\n  <Gizli/>"))
+    assert (info.value.line, info.value.column) == (4, 3)
+    assert "(satır 4, sütun 3)" in str(info.value)
+
+
+def test_repeated_elements_and_embedded_attachments_are_allowed():
+    parsed = udf_generator.parse_udf(_udf(
+        "<Icerik><Aciklamalar><Madde no=\"1\">Bir</Madde><Madde no=\"2\">İki</Madde></Aciklamalar></Icerik>"
+        "<Ekler><Ek><Ad>Bordro</Ad><Icerik>" + "QUJD" * 1000 + "</Icerik></Ek><Ek><Ad>Fesih</Ad></Ek></Ekler>"
+    ))
+    assert parsed["aciklamalar"] == "Bir\n\nİki"
+    assert parsed["ekler"] == ["Bordro", "Fesih"]
+
+
+def test_broken_uyap_archive_raises_parse_error():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("sign.sgn", b"")
+    with pytest.raises(UDFParseError, match="content.xml yok"):
+        udf_generator.parse_udf(buffer.getvalue())
+
+
+def test_malformed_udf_upload_is_rejected_with_400(main_module):
+    from fastapi.testclient import TestClient
+
+    response = TestClient(main_module.app).post(
+        "/api/sozlesme-analiz",
+        files={"file": ("sozlesme.udf", _udf("<Icerik><Gizli/></Icerik>"), "application/octet-stream")},
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"].startswith("UDF okunamadı: <Icerik> içinde beklenmeyen eleman <Gizli>")
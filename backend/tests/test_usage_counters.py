@@ -0,0 +1,75 @@
+"""
+UsageCounters: artışlar bellekte birleştirilir ve toplu yazılır; yazılamayanlar kaybolmaz,
+eşik dolunca erken, kapanışta da kalanlar yazılır.
+"""
+import asyncio
+
+from services.usage_counters import UsageCounters
+
+
+class _Backend:
+    def __init__(self):
+        self.writes = []
+        self.fail_users = set()
+        self.down = False
+
+    def write(self, updates):
+        if self.down:
+            raise RuntimeError("Firestore kullanılamıyor")
+        self.writes.append({user_id: dict(fields) for user_id, fields in updates.items()})
+        return {user_id: fields for user_id, fields in updates.items() if user_id in self.fail_users}
+
+
+def test_increments_are_merged_into_one_write():
+    backend = _Backend()
+    counters = UsageCounters(backend=backend)
+    for _ in range(3):
+        counters.increment("u1", "dilekce_count")
+    counters.increment("u1", "analiz_count", 2)
+    counters.increment("u2", "dilekce_count")
+    counters.increment("anonymous", "dilekce_count")
+
+    assert counters.metrics()["pending_counters"] == 3
+    assert asyncio.run(counters.flush()) == 2
+    assert backend.writes == [{"u1": {"dilekce_count": 3, "analiz_count": 2}, "u2": {"dilekce_count": 1}}]
+    assert asyncio.run(counters.flush()) == 0 and len(backend.writes) == 1
+
+
+def test_failed_writes_are_requeued():
+    backend = _Backend()
+    counters = UsageCounters(backend=backend)
+    counters.increment("u1", "dilekce_count")
+    counters.increment("u2", "dilekce_count")
+
+    backend.fail_users = {"u2"}
+    assert asyncio.run(counters.flush()) == 1
+    assert counters.metrics()["pending_users"] == 1
+
+    backend.down = True
+    counters.increment("u2", "dilekce_count")
+    assert asyncio.run(counters.flush()) == 0
+    assert counters.stats["errors"] == 1
+
+    backend.down, backend.fail_users = False, set()
+    assert asyncio.run(counters.flush()) == 1
+    assert backend.writes[-1] == {"u2": {"dilekce_count": 2}}
+    assert counters.metrics()["pending_counters"] == 0
+
+
+def test_threshold_wakes_flush_and_stop_writes_the_rest():
+    backend = _Backend()
+    counters = UsageCounters(backend=backend, flush_interval=60, max_pending=2)
+
+    async def scenario():
+        counters.start()
+        counters.increment("u1", "dilekce_count")
+        counters.increment("u2", "dilekce_count")
+        await asyncio.sleep(0.05)
+        assert len(backend.writes) == 1
+
+        counters.increment("u3", "dilekce_count")
+        await counters.stop()
+
+    asyncio.run(scenario())
+    assert backend.writes[-1] == {"u3": {"dilekce_count": 1}}
+    assert counters.stats["documents_written"] == 3
@@ -0,0 +1,70 @@
+"""
+UserProfileCache: okuma hatası "kullanıcı yok" olarak önbelleğe yazılmamalı; okuma task'ları tutulmalı;
+lookup istek yolunda Firestore'u beklememeli.
+"""
+import asyncio
+
+from services.user_profiles import UserProfileCache
+
+
+class _Backend:
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.loads = 0
+
+    def load(self, user_id: str):
+        self.loads += 1
+        if self.fail:
+            raise RuntimeError("Firestore kullanılamıyor")
+        return {"plan": "professional"} if user_id == "u1" else None
+
+
+def test_load_error_is_not_reported_as_missing_user():
+    backend = _Backend(fail=True)
+    cache = UserProfileCache(backend=backend, error_ttl=30)
+
+    async def scenario():
+        first, second = await asyncio.gather(cache.get("u1"), cache.get("u1"))
+        assert not cache._tasks
+        return first, second, await cache.get("u1")
+
+    first, second, cached = asyncio.run(scenario())
+    assert first is second is cached
+    assert first.load_error and not first.exists
+    # Hata error_ttl boyunca önbellekte; Firestore tekrar okunmaz
+    assert backend.loads == 1
+
+
+def test_missing_user_has_no_load_error():
+    cache = UserProfileCache(backend=_Backend())
+    missing = asyncio.run(cache.get("u2"))
+    assert not missing.exists and missing.load_error is None
+    assert asyncio.run(cache.get("u1")).effective_plan() == "professional"
+
+
+def test_lookup_does_not_wait_and_refreshes_in_background():
+    backend = _Backend()
+    cache = UserProfileCache(backend=backend)
+
+    async def scenario():
+        assert cache.lookup("u1") is None
+        assert cache.lookup("u1") is None
+        await asyncio.gather(*cache._tasks)
+        return cache.lookup("u1")
+
+    profile = asyncio.run(scenario())
+    assert profile.effective_plan() == "professional"
+    assert backend.loads == 1
+    assert cache.lookup("anonymous") is None
+
+
+def test_lookup_survives_load_errors():
+    cache = UserProfileCache(backend=_Backend(fail=True))
+
+    async def scenario():
+        assert cache.lookup("u1") is None
+        await asyncio.gather(*cache._tasks)
+        return cache.lookup("u1")
+
+    profile = asyncio.run(scenario())
+    assert profile.load_error and profile.limits() is None